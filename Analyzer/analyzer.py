@@ -2,13 +2,261 @@ import os
 import ast
 import json
 import sys
+import argparse
+from functools import lru_cache
+
+# Allow `python Analyzer/analyzer.py` as well as `python -m Analyzer.analyzer`
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 BASE_ERP_PATH = "erpnext/erpnext"
 OUTPUT_FOLDER = "output"
 
-functions_data = []
-classes_data = []
-calls_data = []
+
+def empty_result():
+    return {"functions": [], "classes": [], "calls": []}
+
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+# Calls whose first string argument names the doctype they load
+DOC_FACTORIES = {"frappe.get_doc", "frappe.new_doc", "frappe.get_cached_doc", "frappe.get_last_doc"}
+
+# Callee prefix for methods called on a document loaded by doctype name,
+# e.g. frappe.get_doc("Sales Invoice", name).submit(). Resolved globally
+# by Analyzer.callgraph once every controller class is known.
+DOCTYPE_PREFIX = "doctype:"
+
+
+@lru_cache(maxsize=None)
+def _is_package(directory):
+    return os.path.exists(os.path.join(directory, "__init__.py"))
+
+
+def module_name_for(file_path):
+    """Dotted module name, found by walking up through package directories."""
+    directory, filename = os.path.split(os.path.abspath(file_path))
+    parts = [] if filename == "__init__.py" else [os.path.splitext(filename)[0]]
+
+    while _is_package(directory):
+        directory, package = os.path.split(directory)
+        parts.append(package)
+
+    return ".".join(reversed(parts))
+
+
+def _doctype_arg(call):
+    if call.args and isinstance(call.args[0], ast.Constant) and isinstance(call.args[0].value, str):
+        return call.args[0].value
+    return None
+
+
+class ScopeVisitor(ast.NodeVisitor):
+    """
+    Extracts definitions and calls with qualified names (module.Class.method).
+
+    Visiting is depth-first with an explicit scope stack, so every call is
+    attributed to its innermost enclosing function. (ast.walk is
+    breadth-first, which attributes calls to whichever def was seen last.)
+    """
+
+    def __init__(self, file_path, module):
+        self.file_path = file_path
+        self.module = module
+        self.result = empty_result()
+
+        self.scope = []          # name parts below the module
+        self.functions = []      # enclosing function qualnames
+        self.classes = []        # enclosing class qualnames, for self/cls
+        self.frames = []         # nested defs visible in each enclosing function
+        self.top_level = {}
+        self.aliases = {}
+        self.class_methods = {}
+
+    def qualify(self, name):
+        return ".".join(p for p in (self.module, *self.scope, name) if p)
+
+    # ----------------------------
+    # Pre-pass: imports and module-level names, so forward references resolve
+    # ----------------------------
+
+    def _import_base(self, node):
+        if not node.level:
+            return node.module or ""
+
+        package = self.module.split(".")
+        if not self.file_path.endswith("__init__.py"):
+            package = package[:-1]
+        package = package[:len(package) - (node.level - 1)]
+        return ".".join(package + ([node.module] if node.module else []))
+
+    def collect(self, tree):
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        self.aliases[alias.asname] = alias.name
+                    else:
+                        top = alias.name.split(".")[0]
+                        self.aliases[top] = top
+
+            elif isinstance(node, ast.ImportFrom):
+                base = self._import_base(node)
+                for alias in node.names:
+                    if alias.name != "*":
+                        target = f"{base}.{alias.name}" if base else alias.name
+                        self.aliases[alias.asname or alias.name] = target
+
+        for node in tree.body:
+            if isinstance(node, FUNCTION_NODES + (ast.ClassDef,)):
+                self.top_level[node.name] = self.qualify(node.name)
+
+    # ----------------------------
+    # Name resolution
+    # ----------------------------
+
+    def resolve_name(self, name):
+        for frame in reversed(self.frames):
+            if name in frame:
+                return frame[name]
+        return self.top_level.get(name) or self.aliases.get(name)
+
+    def resolve_expr(self, expr):
+        """Qualified name for a dotted Name/Attribute chain, or None."""
+        if isinstance(expr, ast.Name):
+            return self.resolve_name(expr.id)
+        if isinstance(expr, ast.Attribute):
+            base = self.resolve_expr(expr.value)
+            return f"{base}.{expr.attr}" if base else None
+        return None
+
+    def resolve_call(self, func):
+        """Returns (simple callee name, qualified callee) or (None, None)."""
+        if isinstance(func, ast.Name):
+            return func.id, self.resolve_name(func.id) or func.id
+
+        if not isinstance(func, ast.Attribute):
+            return None, None
+
+        value = func.value
+
+        # self.x() / cls.x(): the enclosing class, or a base class once
+        # Analyzer.callgraph has the whole class hierarchy
+        if isinstance(value, ast.Name) and value.id in ("self", "cls") and self.classes:
+            return func.attr, f"{self.classes[-1]}.{func.attr}"
+
+        # frappe.get_doc("Sales Invoice", ...).submit()
+        if isinstance(value, ast.Call) and self.resolve_expr(value.func) in DOC_FACTORIES:
+            doctype = _doctype_arg(value)
+            if doctype:
+                return func.attr, f"{DOCTYPE_PREFIX}{doctype}.{func.attr}"
+
+        base = self.resolve_expr(value)
+        if base:
+            return func.attr, f"{base}.{func.attr}"
+
+        # Method on a value of unknown type (`items.append()`): recorded by
+        # its simple name only, so it stays out of the call graph instead of
+        # becoming one hub node shared by every `.append()` in the tree
+        return func.attr, None
+
+    # ----------------------------
+    # Visitors
+    # ----------------------------
+
+    def _visit_all(self, nodes):
+        for node in nodes:
+            self.visit(node)
+
+    def visit_FunctionDef(self, node):
+        qualname = self.qualify(node.name)
+        self.result["functions"].append({
+            "name": node.name,
+            "file": self.file_path,
+            "line": node.lineno,
+            "end_line": node.end_lineno,
+            "qualname": qualname
+        })
+
+        # Decorators and defaults are evaluated in the enclosing scope
+        self._visit_all(node.decorator_list)
+        self._visit_all(node.args.defaults + [d for d in node.args.kw_defaults if d])
+
+        if self.frames:
+            self.frames[-1][node.name] = qualname
+
+        self.scope.append(node.name)
+        self.functions.append(qualname)
+        self.frames.append({})
+        self._visit_all(node.body)
+        self.frames.pop()
+        self.functions.pop()
+        self.scope.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        qualname = self.qualify(node.name)
+        bases = [self.resolve_expr(b) or ast.unparse(b) for b in node.bases]
+        self.result["classes"].append({
+            "name": node.name,
+            "file": self.file_path,
+            "line": node.lineno,
+            "end_line": node.end_lineno,
+            "qualname": qualname,
+            "bases": ",".join(bases)
+        })
+
+        self._visit_all(node.decorator_list)
+
+        if self.frames:
+            self.frames[-1][node.name] = qualname
+
+        self.class_methods[qualname] = {n.name for n in node.body if isinstance(n, FUNCTION_NODES)}
+
+        self.scope.append(node.name)
+        self.classes.append(qualname)
+        self._visit_all(node.body)
+        self.classes.pop()
+        self.scope.pop()
+
+    def visit_Lambda(self, node):
+        # Calls inside a lambda belong to the enclosing function
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if self.functions:
+            callee, callee_qname = self.resolve_call(node.func)
+
+            if callee:
+                caller_qname = self.functions[-1]
+                record = {
+                    "caller": caller_qname.rsplit(".", 1)[-1],
+                    "callee": callee,
+                    "file": self.file_path,
+                    "line": node.lineno,
+                    "caller_qname": caller_qname,
+                    "callee_qname": callee_qname
+                }
+                if callee_qname in DOC_FACTORIES and _doctype_arg(node):
+                    record["doctype"] = _doctype_arg(node)
+                self.result["calls"].append(record)
+
+        self.generic_visit(node)
+
+
+def analyze_source(code, file_path):
+    """
+    Extracts functions, classes and call relationships from one file's source.
+    Pure function: results are returned, never accumulated globally, so it
+    can run inside a worker process.
+    """
+    tree = ast.parse(code)
+
+    visitor = ScopeVisitor(file_path, module_name_for(file_path))
+    visitor.collect(tree)
+    visitor.visit(tree)
+
+    return visitor.result
 
 
 def analyze_file(file_path):
@@ -16,83 +264,83 @@ def analyze_file(file_path):
         with open(file_path, "r", encoding="utf-8") as f:
             code = f.read()
 
-        tree = ast.parse(code)
+        return analyze_source(code, file_path)
     except Exception:
-        return
+        return empty_result()
 
-    current_function = None
 
-    for node in ast.walk(tree):
+def module_path_for(module_name):
+    """The whole ERPNext tree is indexed when no module is given."""
+    if not module_name:
+        return BASE_ERP_PATH
+    return os.path.join(BASE_ERP_PATH, module_name)
 
-        if isinstance(node, ast.FunctionDef):
-            functions_data.append({
-                "name": node.name,
-                "file": file_path,
-                "line": node.lineno
-            })
-            current_function = node.name
 
-        elif isinstance(node, ast.ClassDef):
-            classes_data.append({
-                "name": node.name,
-                "file": file_path,
-                "line": node.lineno
-            })
+def output_prefix(module_name):
+    return f"{module_name}_" if module_name else ""
 
-        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
-            if current_function:
-                calls_data.append({
-                    "caller": current_function,
-                    "callee": node.func.id,
-                    "file": file_path
-                })
 
+def analyze_module(module_name, workers=None, full=False):
+    from Analyzer.indexer import build_index
 
-def analyze_module(module_name):
-    module_path = os.path.join(BASE_ERP_PATH, module_name)
+    module_path = module_path_for(module_name)
 
     if not os.path.exists(module_path):
         print(f"Module not found: {module_name}")
         sys.exit(1)
 
-    print(f"\n🔍 Analyzing ERPNext module: {module_name}\n")
+    print(f"\n🔍 Analyzing ERPNext module: {module_name or 'all'}\n")
 
-    for root, _, files in os.walk(module_path):
-        for file in files:
-            if file.endswith(".py"):
-                analyze_file(os.path.join(root, file))
+    return build_index(module_path, module_name or "all", workers=workers, full=full)
 
 
-def save_output(module_name):
-    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+def save_output(module_name, data, formats=("json", "col")):
+    """
+    Writes each table as JSON (for existing consumers) and/or in the
+    columnar format read by Analyzer.store.load_table.
+    """
+    from Analyzer.store import save_table
 
-    with open(f"{OUTPUT_FOLDER}/{module_name}_functions.json", "w") as f:
-        json.dump(functions_data, f, indent=2)
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    prefix = output_prefix(module_name)
 
-    with open(f"{OUTPUT_FOLDER}/{module_name}_classes.json", "w") as f:
-        json.dump(classes_data, f, indent=2)
+    for kind in ("functions", "classes", "calls"):
+        if "json" in formats:
+            with open(f"{OUTPUT_FOLDER}/{prefix}{kind}.json", "w") as f:
+                json.dump(data[kind], f, indent=2)
 
-    with open(f"{OUTPUT_FOLDER}/{module_name}_calls.json", "w") as f:
-        json.dump(calls_data, f, indent=2)
+        if "col" in formats:
+            save_table(module_name, kind, data[kind], OUTPUT_FOLDER)
 
 
 if __name__ == "__main__":
 
-    if len(sys.argv) < 2:
-        print(" Please provide a module name")
-        print(" Example: python analyzer.py accounts")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="AST analyzer for ERPNext modules")
+    parser.add_argument("module", nargs="?", help="ERPNext module, e.g. accounts (default: whole tree)")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-parse every file")
+    parser.add_argument("--format", choices=["json", "col", "both"], default="both",
+                        help="Output format (default: both)")
+    args = parser.parse_args()
+
+    module = args.module
 
-    module = sys.argv[1]
+    data, stats = analyze_module(module, workers=args.workers, full=args.full)
+    save_output(module, data, ("json", "col") if args.format == "both" else (args.format,))
 
-    analyze_module(module)
-    save_output(module)
+    from Analyzer.callgraph import save_callgraph
+    graph, _ = save_callgraph(module, data)
 
     print("\n===================================")
     print(" Analysis Complete!")
-    print(" Module:", module)
-    print(" Functions found:", len(functions_data))
-    print(" Classes found:", len(classes_data))
-    print(" Call relationships:", len(calls_data))
+    print(" Module:", module or "all")
+    print(" Files scanned:", stats["files"])
+    print(" Files re-parsed:", stats["parsed"])
+    print(" Files reused from cache:", stats["reused"])
+    print(" Functions found:", len(data["functions"]))
+    print(" Classes found:", len(data["classes"]))
+    print(" Call relationships:", len(data["calls"]))
+    print(" Call graph:", len(graph.names), "nodes,", graph.edge_count, "edges")
+    print(f" Time: {stats['seconds']:.2f}s")
     print(" Output saved in /output folder")
     print("===================================")
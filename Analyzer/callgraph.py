@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Analyzer.analyzer import DOCTYPE_PREFIX, OUTPUT_FOLDER, output_prefix
+from Analyzer.store import MappedFile, open_table, table_path, write_arrays
+
+
+def callgraph_path(module_name, folder=OUTPUT_FOLDER):
+    return os.path.join(folder, f"{output_prefix(module_name)}callgraph.col")
+
+
+def _csr(sources, targets, n):
+    """Compressed sparse rows: targets of node i are indices[indptr[i]:indptr[i + 1]]."""
+    order = np.lexsort((targets, sources))
+    indices = targets[order].astype(np.int32)
+    counts = np.bincount(sources, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, indices
+
+
+class CallGraph(Mapping):
+    """
+    Call graph over qualified names with forward and reverse CSR adjacency.
+
+    Node ids index into the sorted `names` list. As a Mapping it reads like
+    a {caller: [callees]} dict, with each callee listed once, in name order,
+    so analyze_relationships can return it.
+    """
+
+    def __init__(self, names, fwd_indptr, fwd_indices, rev_indptr, rev_indices, source=None):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.fwd_indptr = fwd_indptr
+        self.fwd_indices = fwd_indices
+        self.rev_indptr = rev_indptr
+        self.rev_indices = rev_indices
+        self._source = source
+
+    @classmethod
+    def from_edges(cls, edges, nodes=()):
+        edges = set(edges)
+        names = sorted({n for edge in edges for n in edge} | set(nodes))
+        ids = {name: i for i, name in enumerate(names)}
+
+        sources = np.fromiter((ids[s] for s, _ in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((ids[t] for _, t in edges), dtype=np.int64, count=len(edges))
+
+        fwd_indptr, fwd_indices = _csr(sources, targets, len(names))
+        rev_indptr, rev_indices = _csr(targets, sources, len(names))
+        return cls(names, fwd_indptr, fwd_indices, rev_indptr, rev_indices)
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+
+    def save(self, path):
+        write_arrays(path, self.names, {
+            "fwd_indptr": self.fwd_indptr,
+            "fwd_indices": self.fwd_indices,
+            "rev_indptr": self.rev_indptr,
+            "rev_indices": self.rev_indices,
+        })
+
+    @classmethod
+    def load(cls, path):
+        """Adjacency arrays stay memory-mapped; only the names are decoded."""
+        source = MappedFile(path)
+        return cls(
+            source.strings(),
+            source.array("fwd_indptr"),
+            source.array("fwd_indices"),
+            source.array("rev_indptr"),
+            source.array("rev_indices"),
+            source=source,
+        )
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def _neighbours(self, name, indptr, indices):
+        i = self.ids.get(name)
+        if i is None:
+            return []
+        names = self.names
+        return [names[j] for j in indices[indptr[i]:indptr[i + 1]].tolist()]
+
+    def callees_of(self, name):
+        return self._neighbours(name, self.fwd_indptr, self.fwd_indices)
+
+    def callers_of(self, name):
+        return self._neighbours(name, self.rev_indptr, self.rev_indices)
+
+    @property
+    def edge_count(self):
+        return len(self.fwd_indices)
+
+    # Mapping interface: only nodes with outgoing edges are keys
+
+    def __getitem__(self, name):
+        callees = self.callees_of(name)
+        if not callees:
+            raise KeyError(name)
+        return callees
+
+    def __iter__(self):
+        counts = np.diff(self.fwd_indptr)
+        for i in np.nonzero(counts)[0].tolist():
+            yield self.names[i]
+
+    def __len__(self):
+        return int(np.count_nonzero(np.diff(self.fwd_indptr)))
+
+
+# ============================
+# Global resolution
+# ============================
+
+def scrub(doctype):
+    return doctype.strip().lower().replace(" ", "_").replace("-", "_")
+
+
+class Resolver:
+    """
+    Resolves callees that need the whole tree: methods inherited from base
+    classes (`self.x()` defined on a parent controller) and methods called
+    on documents loaded by doctype name.
+    """
+
+    def __init__(self, functions, classes):
+        self.functions = {fn["qualname"] for fn in functions if fn.get("qualname")}
+        self.bases = {}
+        self.doctypes = {}
+
+        for cls in classes:
+            qualname = cls.get("qualname")
+            if not qualname:
+                continue
+            self.bases[qualname] = [b for b in (cls.get("bases") or "").split(",") if b]
+
+            # Frappe controllers live in doctype/<scrubbed>/<scrubbed>.py
+            # and are named after the doctype without spaces
+            path = cls["file"].replace("\\", "/")
+            directory, filename = os.path.split(path)
+            stem = os.path.splitext(filename)[0]
+            if (os.path.basename(directory) == stem
+                    and "/doctype/" in path
+                    and cls["name"].lower() == stem.replace("_", "")):
+                self.doctypes[stem] = qualname
+
+    def find_method(self, cls, attr, seen=None):
+        seen = seen or set()
+        if cls in seen:
+            return None
+        seen.add(cls)
+
+        candidate = f"{cls}.{attr}"
+        if candidate in self.functions:
+            return candidate
+
+        for base in self.bases.get(cls, ()):
+            found = self.find_method(base, attr, seen)
+            if found:
+                return found
+        return None
+
+    def resolve(self, callee):
+        if callee in self.functions:
+            return callee
+
+        if callee.startswith(DOCTYPE_PREFIX):
+            doctype, _, attr = callee[len(DOCTYPE_PREFIX):].rpartition(".")
+            cls = self.doctypes.get(scrub(doctype))
+            return (cls and self.find_method(cls, attr)) or callee
+
+        owner, _, attr = callee.rpartition(".")
+        if owner in self.bases:
+            return self.find_method(owner, attr) or callee
+
+        return callee
+
+
+def build_callgraph(functions, classes, calls):
+    resolver = Resolver(functions, classes)
+
+    edges = set()
+    for call in calls:
+        caller, callee = call.get("caller_qname"), call.get("callee_qname")
+        if caller and callee:
+            edges.add((caller, resolver.resolve(callee)))
+
+    return CallGraph.from_edges(edges, resolver.functions)
+
+
+def save_callgraph(module_name, data, folder=OUTPUT_FOLDER):
+    graph = build_callgraph(data["functions"], data["classes"], data["calls"])
+    path = callgraph_path(module_name, folder)
+    graph.save(path)
+    return graph, path
+
+
+def _tables_mtime(module_name, folder):
+    """Newest modification time of the analyzer tables, 0 when there are none."""
+    mtimes = [
+        os.path.getmtime(path)
+        for kind in ("functions", "classes", "calls")
+        for path in (table_path(module_name, kind, folder) + ".col", table_path(module_name, kind, folder) + ".json")
+        if os.path.exists(path)
+    ]
+    return max(mtimes, default=0)
+
+
+def load_callgraph(module_name=None, folder=OUTPUT_FOLDER):
+    """
+    Opens the persisted graph. When it is missing or older than the
+    analyzer tables, it is rebuilt from those and saved again.
+    """
+    path = callgraph_path(module_name, folder)
+    if os.path.exists(path) and os.path.getmtime(path) >= _tables_mtime(module_name, folder):
+        return CallGraph.load(path)
+
+    data = {}
+    for kind in ("functions", "classes", "calls"):
+        with open_table(module_name, kind, folder) as table:
+            data[kind] = list(table)
+    graph, _ = save_callgraph(module_name, data, folder)
+    return graph
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("callers", "callees"):
+        print("Usage: python Analyzer/callgraph.py callers|callees <qualified.name> [module]")
+        print(" Example: python Analyzer/callgraph.py callers erpnext.accounts.general_ledger.make_gl_entries")
+        sys.exit(1)
+
+    query, name = sys.argv[1], sys.argv[2]
+    graph = load_callgraph(sys.argv[3] if len(sys.argv) > 3 else None)
+
+    started = time.perf_counter()
+    results = graph.callers_of(name) if query == "callers" else graph.callees_of(name)
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        print("  -", result)
+    print(f"\n{len(results)} {query} of {name} ({elapsed * 1e6:.0f} µs)")
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from Analyzer.analyzer import OUTPUT_FOLDER, analyze_source, empty_result
+
+CACHE_FOLDER = os.path.join(OUTPUT_FOLDER, ".cache")
+
+# Bump whenever analyze_source changes what it extracts, so stale
+# per-file results are never merged into a fresh index.
+MANIFEST_VERSION = 3
+
+# Below this many changed files a process pool costs more than it saves
+MIN_POOL_FILES = 16
+
+KINDS = ("functions", "classes", "calls")
+
+
+def manifest_path(name):
+    return os.path.join(CACHE_FOLDER, f"{name}_manifest.json")
+
+
+def iter_python_files(root_path):
+    for root, _, files in os.walk(root_path):
+        for file in files:
+            if file.endswith(".py"):
+                yield os.path.join(root, file)
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_manifest(path):
+    """
+    Returns {file: entry} from a previous run, or {} if missing or stale.
+    An entry holds mtime_ns, size, sha and the per-file analyzer result.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+
+    return manifest.get("files", {})
+
+
+def save_manifest(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write then rename so an interrupted run never leaves a torn manifest
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+    os.replace(tmp_path, path)
+
+
+def _parse_job(job):
+    """
+    Worker entry point. Hashes the file and only parses it when the
+    content differs from the sha recorded in the manifest.
+    """
+    file_path, known_sha = job
+
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return file_path, None, None
+
+    sha = file_digest(data)
+    if sha == known_sha:
+        return file_path, sha, None
+
+    try:
+        result = analyze_source(data.decode("utf-8"), file_path)
+    except Exception:
+        result = empty_result()
+
+    return file_path, sha, result
+
+
+def _run_jobs(jobs, workers):
+    if len(jobs) < MIN_POOL_FILES or workers == 1:
+        return [_parse_job(job) for job in jobs]
+
+    chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_parse_job, jobs, chunksize=chunksize))
+
+
+def merge_results(files):
+    """Flattens per-file entries into the analyzer's output lists."""
+    data = {kind: [] for kind in KINDS}
+
+    for file_path in sorted(files):
+        entry = files[file_path]
+        for kind in KINDS:
+            data[kind].extend(entry[kind])
+
+    return data
+
+
+def build_index(root_path, name, workers=None, full=False):
+    """
+    Incrementally indexes every Python file under root_path.
+
+    A file is reused from the manifest when its mtime and size are
+    unchanged, or when they changed but its sha256 did not. Everything
+    else is re-parsed in a process pool and merged back in.
+
+    Returns (data, stats) where data has the functions/classes/calls lists.
+    """
+    started = time.perf_counter()
+    path = manifest_path(name)
+
+    previous = {} if full else load_manifest(path)
+    files = {}
+    jobs = []
+    stats = {"files": 0, "reused": 0, "parsed": 0, "removed": 0}
+
+    for file_path in iter_python_files(root_path):
+        stats["files"] += 1
+
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            continue
+
+        entry = previous.get(file_path)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            files[file_path] = entry
+            stats["reused"] += 1
+            continue
+
+        jobs.append((file_path, entry["sha"] if entry else None))
+
+    for file_path, sha, result in _run_jobs(jobs, workers):
+        if sha is None:
+            continue
+
+        st = os.stat(file_path)
+
+        if result is None:
+            # Touched but identical content: refresh the stat fields only
+            entry = dict(previous[file_path], mtime_ns=st.st_mtime_ns, size=st.st_size)
+            stats["reused"] += 1
+        else:
+            entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha": sha, **result}
+            stats["parsed"] += 1
+
+        files[file_path] = entry
+
+    stats["removed"] = len(set(previous) - set(files))
+
+    save_manifest(path, files)
+
+    stats["seconds"] = time.perf_counter() - started
+    return merge_results(files), stats
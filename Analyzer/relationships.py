@@ -1,15 +1,15 @@
+from Analyzer.callgraph import CallGraph
+
+
 def analyze_relationships(nodes, edges):
     """
     Analyzes graph relationships.
+
+    Returns a CallGraph: a {source: [targets]} mapping backed by CSR
+    arrays, with each target listed once in name order, that also answers
+    reverse (callers_of) queries without a rescan.
     """
-    adjacency = {}
-    for edge in edges:
-        source, target = edge
-        if source not in adjacency:
-            adjacency[source] = []
-        adjacency[source].append(target)
-    
-    return adjacency
+    return CallGraph.from_edges(edges, nodes)
 
 def find_orphans(nodes, adjacency):
     orphans = []
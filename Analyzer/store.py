@@ -0,0 +1,317 @@
+"""
+Compact columnar store for analyzer output.
+
+Layout of a `.col` file (all integers little-endian):
+
+    MAGIC | uint64 header length | JSON header | padding | segments...
+
+String columns are dictionary-encoded against one interned string table per
+file (an offsets array plus a UTF-8 blob); integer columns are stored as raw
+int32 arrays. Every segment is 8-byte aligned so readers can map them
+straight out of an mmap with numpy, without parsing the whole file.
+"""
+
+import os
+import json
+import mmap
+import struct
+from contextlib import contextmanager
+
+import numpy as np
+
+MAGIC = b"ERPCOL1\n"
+ALIGN = 8
+OUTPUT_FOLDER = "output"
+
+# Column layout of each analyzer table. Missing integer fields are stored as -1.
+SCHEMAS = {
+    "functions": [("name", "str"), ("file", "str"), ("line", "int32"),
+                  ("end_line", "int32"), ("qualname", "str")],
+    "classes": [("name", "str"), ("file", "str"), ("line", "int32"),
+                ("end_line", "int32"), ("qualname", "str"), ("bases", "str")],
+    "calls": [("caller", "str"), ("callee", "str"), ("file", "str"), ("line", "int32"),
+              ("caller_qname", "str"), ("callee_qname", "str"), ("doctype", "str")],
+}
+
+_DTYPES = {"int32": "<i4", "offsets": "<u8"}
+
+
+def _pad(n):
+    return (-n) % ALIGN
+
+
+class StringInterner:
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        value = "" if value is None else str(value)
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = len(self.values)
+            self.ids[value] = idx
+            self.values.append(value)
+        return idx
+
+
+def write_file(path, header, strings, arrays):
+    """
+    Low-level writer shared by tables and raw array files.
+
+    strings is the interned string table, arrays maps segment names to
+    int32 sequences. The file is written to a temp name and renamed into
+    place so readers never observe a torn file.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=_DTYPES["offsets"])
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    segments = [("strings.offsets", offsets.tobytes(), "offsets", len(offsets)),
+                ("strings.blob", b"".join(encoded), "bytes", int(offsets[-1]))]
+    for name, values in arrays.items():
+        array = np.asarray(values, dtype=_DTYPES["int32"])
+        segments.append((name, array.tobytes(), "int32", len(array)))
+
+    # Segment offsets are relative to the aligned end of the header
+    layout = {}
+    cursor = 0
+    for name, payload, dtype, count in segments:
+        layout[name] = [cursor, count, dtype]
+        cursor += len(payload) + _pad(len(payload))
+
+    header = json.dumps(dict(header, segments=layout)).encode("utf-8")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        prefix = MAGIC + struct.pack("<Q", len(header)) + header
+        f.write(prefix + b"\0" * _pad(len(prefix)))
+        for _, payload, _, _ in segments:
+            f.write(payload + b"\0" * _pad(len(payload)))
+    os.replace(tmp_path, path)
+
+
+def write_table(path, records, schema):
+    """Writes records (an iterable of dicts) to path in columnar form."""
+    interner = StringInterner()
+    columns = {name: [] for name, _ in schema}
+    rows = 0
+
+    for record in records:
+        rows += 1
+        for name, kind in schema:
+            value = record.get(name)
+            if kind == "str":
+                columns[name].append(interner.intern(value))
+            else:
+                columns[name].append(-1 if value is None else int(value))
+
+    header = {"rows": rows, "columns": [[name, kind] for name, kind in schema]}
+    arrays = {f"col.{name}": columns[name] for name, _ in schema}
+    write_file(path, header, interner.values, arrays)
+
+
+def write_arrays(path, strings, arrays):
+    """Writes a string table plus named int32 arrays of any length."""
+    write_file(path, {"rows": 0, "columns": []},
+               strings, {f"arr.{name}": values for name, values in arrays.items()})
+
+
+class MappedFile:
+    """
+    Read-only mmap over a file produced by write_file.
+
+    Opening only reads the header; segments are numpy views into the mmap
+    and strings are decoded on first access.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else b""
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a columnar analyzer file: {path}")
+
+        (header_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(self._mm[start:start + header_len]))
+        self._base = start + header_len + _pad(start + header_len)
+
+        self.rows = header["rows"]
+        self.schema = [tuple(col) for col in header["columns"]]
+        self._segments = header["segments"]
+        self._arrays = {}
+        self._strings = {}
+        self._string_ids = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._arrays.clear()
+        if isinstance(self._mm, mmap.mmap):
+            try:
+                self._mm.close()
+            except BufferError:
+                # numpy views handed out to callers still reference the map
+                pass
+        self._file.close()
+
+    def _segment(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            offset, count, dtype = self._segments[name]
+            array = np.frombuffer(self._mm, dtype=_DTYPES.get(dtype, "u1"),
+                                  count=count, offset=self._base + offset)
+            self._arrays[name] = array
+        return array
+
+    def array(self, name):
+        """A named int32 array written by write_arrays."""
+        return self._segment(f"arr.{name}")
+
+    @property
+    def string_count(self):
+        return len(self._segment("strings.offsets")) - 1
+
+    def string(self, idx):
+        """Decodes one entry of the interned string table."""
+        value = self._strings.get(idx)
+        if value is None:
+            offsets = self._segment("strings.offsets")
+            blob_start = self._base + self._segments["strings.blob"][0]
+            start, end = int(offsets[idx]), int(offsets[idx + 1])
+            value = self._mm[blob_start + start:blob_start + end].decode("utf-8")
+            self._strings[idx] = value
+        return value
+
+    def strings(self):
+        """Decodes the whole interned string table in one pass."""
+        if len(self._strings) < self.string_count:
+            offsets = self._segment("strings.offsets").tolist()
+            blob_start = self._base + self._segments["strings.blob"][0]
+            blob = self._mm[blob_start:blob_start + offsets[-1]]
+            self._strings = {
+                i: blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+                for i in range(self.string_count)
+            }
+        return [self._strings[i] for i in range(self.string_count)]
+
+    def string_id(self, value):
+        """Reverse lookup in the string table; returns -1 if absent."""
+        if self._string_ids is None:
+            self._string_ids = {self.string(i): i for i in range(self.string_count)}
+        return self._string_ids.get(value, -1)
+
+
+class ColumnarTable(MappedFile):
+    """Lazy, read-only view over a `.col` table written by write_table."""
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def columns(self):
+        return [name for name, _ in self.schema]
+
+    def codes(self, name):
+        """Raw int32 column: string ids for str columns, values for int columns."""
+        return self._segment(f"col.{name}")
+
+    def column(self, name):
+        kind = dict(self.schema)[name]
+        codes = self.codes(name).tolist()
+        if kind == "str":
+            strings = self.strings()
+            return [strings[c] for c in codes]
+        return codes
+
+    def row(self, i):
+        if i < 0:
+            i += self.rows
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+
+        record = {}
+        for name, kind in self.schema:
+            value = int(self.codes(name)[i])
+            record[name] = self.string(value) if kind == "str" else value
+        return record
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def __iter__(self):
+        # Decode whole columns at once; per-row lookups are much slower
+        columns = self.to_columns()
+        names = self.columns
+        for values in zip(*(columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def to_columns(self):
+        """Materializes the table as {column: list}, e.g. for a dataframe."""
+        return {name: self.column(name) for name in self.columns}
+
+
+def table_path(module, kind, folder=OUTPUT_FOLDER):
+    prefix = f"{module}_" if module else ""
+    return os.path.join(folder, f"{prefix}{kind}")
+
+
+def save_table(module, kind, records, folder=OUTPUT_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    path = table_path(module, kind, folder) + ".col"
+    write_table(path, records, SCHEMAS[kind])
+    return path
+
+
+def load_table(module, kind, folder=OUTPUT_FOLDER):
+    """
+    Loader used in place of a raw `json.load` of analyzer output.
+
+    Prefers the columnar file and falls back to the JSON list when the
+    `.col` file is missing or older than the JSON one. Either way the
+    result supports len(), indexing and iteration over row dicts.
+    """
+    base = table_path(module, kind, folder)
+    col_path, json_path = base + ".col", base + ".json"
+
+    has_col = os.path.exists(col_path)
+    has_json = os.path.exists(json_path)
+
+    if has_col and (not has_json or os.path.getmtime(col_path) >= os.path.getmtime(json_path)):
+        return ColumnarTable(col_path)
+
+    if has_json:
+        with open(json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    raise FileNotFoundError(f"Analyzer output not found: {base}.col / {base}.json")
+
+
+@contextmanager
+def open_table(module, kind, folder=OUTPUT_FOLDER):
+    """load_table as a context manager: a columnar table is closed (file and mmap) on exit."""
+    table = load_table(module, kind, folder)
+    try:
+        yield table
+    finally:
+        if isinstance(table, ColumnarTable):
+            table.close()
+
+
+def convert_json(json_path, kind, col_path=None):
+    """Converts an existing analyzer JSON file to the columnar format."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    col_path = col_path or os.path.splitext(json_path)[0] + ".col"
+    write_table(col_path, records, SCHEMAS[kind])
+    return col_path
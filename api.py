@@ -1,62 +1,176 @@
-from flask import Flask, request, jsonify, Response
-from rag.rag_query import answer, stream_answer
+import json
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
 
-app = Flask(__name__)
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
-# Simple in-memory chat history
-chat_history = []
+from config import API_MAX_CONCURRENT, API_QUEUE_TIMEOUT
+from llm.async_client import AsyncLLMClient, LLMError
+from rag.answer_cache import get_answer_cache
+from rag.conversation import create_store
+from rag.rag_query import answer_async, stream_answer
+from rag.retriever import get_retriever
 
-@app.route("/ask", methods=["POST"])
-def ask():
-    data = request.json
-    question = data.get("question")
 
-    if not question:
-        return jsonify({"error": "No question provided"}), 400
+class Question(BaseModel):
+    question: str
+    # Used in index and chunk file paths, so only bare module names pass
+    module: str = Field(pattern=r"^[a-z_]+$")
+    # Omit to start a new conversation; the id is returned in X-Session-Id
+    session_id: str | None = None
 
-    # Store conversation history (last 5 messages)
-    chat_history.append({"role": "user", "content": question})
-    recent_history = chat_history[-5:]
 
-    # Build conversation context
-    context = "\n".join([msg["content"] for msg in recent_history])
+@asynccontextmanager
+async def lifespan(app):
+    # One pooled LLM client and one concurrency limit per worker process
+    app.state.llm = AsyncLLMClient()
+    app.state.slots = asyncio.Semaphore(API_MAX_CONCURRENT)
+    app.state.in_flight = 0
+    app.state.conversations = create_store()
+    app.state.answers = get_answer_cache()
+    yield
+    await app.state.llm.aclose()
+    get_retriever().close()
 
+
+app = FastAPI(title="ERPNext Code Intelligence AI Backend", lifespan=lifespan)
+
+
+async def acquire_slot(app):
+    """Waits briefly for a generation slot; answers 503 when the worker is saturated."""
     try:
-        response = answer(context)
+        await asyncio.wait_for(app.state.slots.acquire(), API_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Server busy, retry shortly",
+                            headers={"Retry-After": "1"})
+    app.state.in_flight += 1
+
+
+def release_slot(app):
+    app.state.in_flight -= 1
+    app.state.slots.release()
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    Streams while holding a generation slot and releases it however the
+    response ends. The body generator's own `finally` is not enough: it
+    never runs if the client is gone before the first chunk is pulled.
+    """
+
+    def __init__(self, content, app, **kwargs):
+        super().__init__(content, **kwargs)
+        self.app = app
 
-        chat_history.append({"role": "assistant", "content": response})
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            release_slot(self.app)
 
-        return jsonify({"answer": response})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
 
+# The conversation store may be SQLite (CONVERSATION_DB), whose calls block
+# on disk and locks, so it is only used off the event loop
 
-@app.route("/stream", methods=["POST"])
-def stream():
-    data = request.json
-    question = data.get("question")
+async def session_for(body):
+    session_id = body.session_id or uuid.uuid4().hex
+    return session_id, await asyncio.to_thread(app.state.conversations.history, session_id)
 
-    if not question:
-        return Response("No question provided", status=400)
 
-    def generate():
-        for token in stream_answer(question):
-            yield token
+def _append_turn(conversations, session_id, question, reply):
+    conversations.append(session_id, "user", question)
+    conversations.append(session_id, "assistant", reply)
 
-    return Response(generate(), mimetype="text/plain")
 
+async def append_turn(session_id, question, reply):
+    await asyncio.to_thread(_append_turn, app.state.conversations, session_id, question, reply)
 
-@app.route("/health", methods=["GET"])
-def health():
-    return jsonify({"status": "running"})
+
+def sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/ask")
+async def ask(body: Question, response: Response):
+    if not body.question.strip():
+        raise HTTPException(status_code=400, detail="No question provided")
+
+    session_id, history = await session_for(body)
+
+    await acquire_slot(app)
+    try:
+        reply = await answer_async(body.question, body.module, app.state.llm, history,
+                                   app.state.answers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except LLMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    finally:
+        release_slot(app)
+
+    await append_turn(session_id, body.question, reply)
+
+    response.headers["X-Session-Id"] = session_id
+    return {"answer": reply, "session_id": session_id}
+
+
+@app.post("/stream")
+async def stream(body: Question, request: Request):
+    """
+    Server-Sent Events: one `data: {"token": ...}` event per LLM token,
+    then `event: done` (or `event: error`). A client disconnect ends the
+    generator, which closes the upstream LLM stream.
+    """
+    if not body.question.strip():
+        raise HTTPException(status_code=400, detail="No question provided")
+
+    session_id, history = await session_for(body)
+
+    await acquire_slot(app)
+
+    async def events():
+        tokens = []
+        try:
+            async for token in stream_answer(body.question, body.module, app.state.llm, history,
+                                             app.state.answers):
+                if await request.is_disconnected():
+                    break
+                tokens.append(token)
+                yield sse({"token": token})
+            else:
+                # Only completed answers become part of the conversation
+                await append_turn(session_id, body.question, "".join(tokens))
+                yield sse({"session_id": session_id}, "done")
+        except Exception as e:
+            # Headers are already sent, so any failure ends the stream as an event
+            yield sse({"error": str(e)}, "error")
+
+    return SlotStreamingResponse(events(), app, media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                                          "X-Session-Id": session_id})
+
+
+@app.get("/health")
+async def health():
+    conversations = await asyncio.to_thread(lambda: app.state.conversations.stats)
+    return {"status": "running", "llm": app.state.llm.router.stats,
+            "free_slots": API_MAX_CONCURRENT - app.state.in_flight, "max_concurrent": API_MAX_CONCURRENT,
+            "conversations": conversations,
+            "answer_cache": app.state.answers.stats}
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     print("\n ERPNext Code Intelligence AI Backend")
     print(" Server running at: http://localhost:8000")
     print("📡 Endpoints:")
     print("   POST /ask     → Normal chat")
-    print("   POST /stream  → Streaming chat")
+    print("   POST /stream  → Streaming chat (Server-Sent Events)")
     print("   GET  /health  → Health check\n")
 
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    uvicorn.run("api:app", host="0.0.0.0", port=8000)
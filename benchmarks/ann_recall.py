@@ -0,0 +1,127 @@
+"""
+Recall / latency / memory benchmark for the ANN index types in
+rag.index_factory, measured against exact IndexFlatL2 search.
+
+Vectors come from an existing `vector_db/<module>.index`. Queries are
+stored vectors with small Gaussian noise added, so every query has true
+near neighbours without needing an embedding server. `--scale N` grows
+the collection to N vectors by jittering copies of the stored ones, to
+estimate behaviour at whole-tree size.
+
+Usage: python -m benchmarks.ann_recall [vector_db/buying.index ...]
+           [--k 10] [--queries 200] [--scale 200000] [--json]
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.index_factory import create_index, index_bytes, index_type_of
+
+BENCH_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+def load_vectors(path):
+    index = faiss.read_index(path)
+    return index.reconstruct_n(0, index.ntotal).astype(np.float32)
+
+
+def scale_vectors(vectors, n, rng):
+    if n <= len(vectors):
+        return vectors
+    rows = rng.integers(0, len(vectors), size=n - len(vectors))
+    spread = vectors.std(axis=0).mean() * 0.1
+    extra = vectors[rows] + rng.normal(0, spread, size=(len(rows), vectors.shape[1]))
+    return np.vstack([vectors, extra.astype(np.float32)])
+
+
+def make_queries(vectors, count, rng):
+    rows = rng.integers(0, len(vectors), size=count)
+    spread = vectors.std(axis=0).mean() * 0.05
+    noise = rng.normal(0, spread, size=(count, vectors.shape[1]))
+    return (vectors[rows] + noise).astype(np.float32)
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found.tolist(), truth.tolist()))
+    return hits / truth.size
+
+
+def bench_type(index_type, vectors, queries, truth, k):
+    started = time.perf_counter()
+    index = create_index(vectors, index_type)
+    build_seconds = time.perf_counter() - started
+
+    # One query at a time, as the retriever issues them
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, q in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        found[i] = ids[0]
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "type": index_type,
+        # Small collections fall back, e.g. ivf_pq -> ivf_flat
+        "built": index_type_of(index),
+        "recall": recall_at_k(found, truth),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "bytes": index_bytes(index),
+        "build_s": build_seconds,
+    }
+
+
+def bench_file(path, k, n_queries, scale, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = scale_vectors(load_vectors(path), scale, rng)
+    queries = make_queries(vectors, n_queries, rng)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    return {
+        "file": path,
+        "vectors": len(vectors),
+        "dim": vectors.shape[1],
+        "k": k,
+        "results": [bench_type(t, vectors, queries, truth, k) for t in BENCH_TYPES],
+    }
+
+
+def print_report(report):
+    print(f"\n{report['file']}: {report['vectors']} vectors x {report['dim']} dims, recall@{report['k']}")
+    print(f"  {'type':10} {'built':10} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'memory MB':>10} {'build s':>8}")
+    for r in report["results"]:
+        print(f"  {r['type']:10} {r['built']:10} {r['recall']:7.3f} {r['p50_ms']:8.3f} {r['p99_ms']:8.3f} "
+              f"{r['bytes'] / 1e6:10.2f} {r['build_s']:8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ANN recall/latency benchmark")
+    parser.add_argument("indexes", nargs="*", help="Index files (default: vector_db/*.index)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scale", type=int, default=0, help="Grow each collection to N vectors")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable results")
+    args = parser.parse_args()
+
+    paths = args.indexes or sorted(glob.glob("vector_db/*.index"))
+    reports = [bench_file(p, args.k, args.queries, args.scale) for p in paths]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            print_report(report)
@@ -0,0 +1,307 @@
+"""
+Offline retrieval quality and latency benchmark for the RAG pipeline.
+
+Questions with gold (file, function) answers live in
+benchmarks/rag_gold.json and cover accounts, buying and stock. Each run
+chunks the ERPNext sources with rag/chunker.py, embeds them with a
+deterministic hashing embedder (no embedding server, no network), builds
+the FAISS index and BM25 postings in a temporary directory and serves
+them through the real Retriever. The answer step uses llm/stub_llm.py.
+
+Reported per search mode:
+* recall@k: fraction of gold definitions found in the top k hits;
+* MRR: mean reciprocal rank of the first gold hit;
+* packed recall: gold definitions that survive rag/context.py packing,
+  with packed vs naive top-5 context tokens;
+* p50/p95/p99 latency of each stage (embed, ann, lexical, fuse,
+  hydrate, pack, generate) and end to end.
+
+The hashing embedder only captures identifier overlap, so absolute
+vector-mode recall is a floor; compare runs against each other when
+changing the chunker, the index type or the retriever.
+
+Usage: python -m benchmarks.rag_eval [--modules accounts buying stock]
+           [--modes hybrid vector lexical] [--index-type auto] [--k 10]
+           [--repeat 3] [--json] [--out results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import stub_llm
+from rag.chunker import CHUNK_TOKEN_BUDGET, chunk_file
+from rag.context import context_budget, pack_context
+from rag.index_factory import INDEX_TYPES, create_index, index_type_of
+from rag.lexical import LexicalIndex, lexical_path, tokenize
+from rag.rag_query import build_prompt
+from rag.retriever import SEARCH_MODES, Retriever
+from rag.tokens import estimate_tokens
+
+GOLD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rag_gold.json")
+SOURCE_ROOT = "erpnext/erpnext"
+
+# Dimensions of the hashing embedder
+HASH_DIM = 256
+
+# Context budget is computed as for this model
+EVAL_MODEL = "openai:gpt-4o-mini"
+
+RECALL_AT = (1, 5, 10)
+STAGES = ("embed", "ann", "lexical", "fuse", "hydrate", "pack", "generate", "total")
+
+
+def hash_embed(text, dim=HASH_DIM):
+    """
+    Deterministic stand-in for the embedding model: signed feature hashing
+    of the lexical tokenizer's terms, L2-normalized.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for term in tokenize(text):
+        digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def load_gold(path=GOLD_PATH, modules=None):
+    with open(path, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+    return [q for q in questions if modules is None or q["module"] in modules]
+
+
+def source_files(module, root=SOURCE_ROOT):
+    files = []
+    for directory, _, names in os.walk(os.path.join(root, module)):
+        files.extend(os.path.join(directory, n).replace("\\", "/") for n in names if n.endswith(".py"))
+    return sorted(files)
+
+
+# ============================
+# Corpus build
+# ============================
+
+def build_module(module, workdir, index_type="auto", budget=CHUNK_TOKEN_BUDGET):
+    """Chunks, embeds and indexes one module into workdir; returns build stats."""
+    stats = {"module": module}
+
+    started = time.perf_counter()
+    files = source_files(module)
+    chunks, seen = [], set()
+    for path in files:
+        for chunk in chunk_file((path, module, budget)):
+            if chunk["id"] not in seen:
+                seen.add(chunk["id"])
+                chunks.append(chunk)
+    stats["files"] = len(files)
+    stats["chunks"] = len(chunks)
+    stats["chunk_s"] = time.perf_counter() - started
+
+    with open(os.path.join(workdir, f"{module}_chunks.jsonl"), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk) + "\n")
+
+    started = time.perf_counter()
+    vectors = np.array([hash_embed(chunk["text"]) for chunk in chunks], dtype=np.float32)
+    stats["embed_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index = create_index(vectors, index_type, ids=[chunk["id"] for chunk in chunks])
+    faiss.write_index(index, os.path.join(workdir, f"{module}.index"))
+    stats["index"] = index_type_of(index)
+    stats["index_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    LexicalIndex.from_chunks(chunks).save(lexical_path(module, workdir))
+    stats["lexical_s"] = time.perf_counter() - started
+
+    return stats
+
+
+# ============================
+# Scoring
+# ============================
+
+def is_gold(hit, gold):
+    """A hit answers a gold entry when file and (qualified) name match."""
+    name = hit.get("name") or ""
+    return (hit.get("file", "").replace("\\", "/").endswith(gold["file"])
+            and (name == gold["name"] or name.endswith("." + gold["name"])))
+
+
+def gold_ranks(hits, golds):
+    """1-based rank of each gold definition's first hit, or None when missed."""
+    ranks = []
+    for gold in golds:
+        rank = next((i + 1 for i, hit in enumerate(hits) if is_gold(hit, gold)), None)
+        ranks.append(rank)
+    return ranks
+
+
+def recall_at(ranks, k):
+    return sum(1 for r in ranks if r is not None and r <= k) / len(ranks)
+
+
+def reciprocal_rank(ranks):
+    found = [r for r in ranks if r is not None]
+    return 1.0 / min(found) if found else 0.0
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+# ============================
+# Evaluation
+# ============================
+
+def run_question(retriever, question, mode, k):
+    """One retrieval + packing + stub generation; returns (hits, context, timings)."""
+    started = time.perf_counter()
+    hits, timings = retriever.search_with_timings(question["question"], question["module"], k, mode)
+
+    pack_started = time.perf_counter()
+    context = pack_context(hits, context_budget(EVAL_MODEL, question["question"]))
+    timings["pack"] = time.perf_counter() - pack_started
+
+    generate_started = time.perf_counter()
+    stub_llm.complete(build_prompt(question["question"], question["module"], context.text))
+    timings["generate"] = time.perf_counter() - generate_started
+
+    timings["total"] = time.perf_counter() - started
+    timings["ann"] = timings.pop("search", None)
+    return hits, context, timings
+
+
+def evaluate_mode(retriever, questions, mode, k=10, repeat=1):
+    samples = {stage: [] for stage in STAGES}
+    per_question = []
+
+    for question in questions:
+        for attempt in range(repeat):
+            hits, context, timings = run_question(retriever, question, mode, k)
+            for stage in STAGES:
+                if timings.get(stage) is not None:
+                    samples[stage].append(timings[stage])
+
+        ranks = gold_ranks(hits, question["gold"])
+        packed_ranks = gold_ranks(context.hits, question["gold"])
+        per_question.append({
+            "module": question["module"],
+            "question": question["question"],
+            "ranks": ranks,
+            "packed_found": [r is not None for r in packed_ranks],
+            "packed_tokens": context.tokens,
+            "top5_tokens": estimate_tokens("\n".join(hit["text"] for hit in hits[:5])),
+        })
+
+    def summary(rows):
+        ranks = [r["ranks"] for r in rows]
+        result = {f"recall@{n}": float(np.mean([recall_at(r, n) for r in ranks])) for n in RECALL_AT if n <= k}
+        result["mrr"] = float(np.mean([reciprocal_rank(r) for r in ranks]))
+        result["packed_recall"] = float(np.mean([np.mean(r["packed_found"]) for r in rows]))
+        result["packed_tokens"] = int(sum(r["packed_tokens"] for r in rows))
+        result["top5_tokens"] = int(sum(r["top5_tokens"] for r in rows))
+        result["questions"] = len(rows)
+        return result
+
+    modules = sorted({q["module"] for q in questions})
+    return {
+        "mode": mode,
+        "metrics": summary(per_question),
+        "modules": {m: summary([r for r in per_question if r["module"] == m]) for m in modules},
+        "stages": {stage: percentiles(s) for stage, s in samples.items() if s},
+        "misses": [r["question"] for r in per_question if all(rank is None for rank in r["ranks"])],
+    }
+
+
+def run(modules, modes=SEARCH_MODES, index_type="auto", k=10, repeat=1, gold_path=GOLD_PATH):
+    questions = load_gold(gold_path, modules)
+    if not questions:
+        raise ValueError(f"No gold questions for modules: {', '.join(modules)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        build = [build_module(module, workdir, index_type) for module in modules]
+
+        retriever = Retriever(data_dir=workdir, vector_dir=workdir, embed_fn=hash_embed)
+        retriever.warm(modules)
+
+        results = [evaluate_mode(retriever, questions, mode, k, repeat) for mode in modes]
+
+    return {
+        "config": {
+            "modules": list(modules),
+            "index_type": index_type,
+            "k": k,
+            "repeat": repeat,
+            "chunk_budget": CHUNK_TOKEN_BUDGET,
+            "embedder": f"hash-{HASH_DIM}",
+            "questions": len(questions),
+        },
+        "build": build,
+        "results": results,
+    }
+
+
+def print_report(report):
+    config = report["config"]
+    print(f"\n{config['questions']} questions over {', '.join(config['modules'])} "
+          f"({config['embedder']} embeddings, k={config['k']})")
+    for b in report["build"]:
+        print(f"  {b['module']:10} {b['files']:5} files {b['chunks']:6} chunks  {b['index']:8} "
+              f"chunk {b['chunk_s']:.1f}s embed {b['embed_s']:.1f}s index {b['index_s']:.1f}s")
+
+    for result in report["results"]:
+        m = result["metrics"]
+        recalls = "  ".join(f"{name} {value:.3f}" for name, value in m.items() if name.startswith("recall@"))
+        print(f"\n[{result['mode']}] {recalls}  MRR {m['mrr']:.3f}  "
+              f"packed recall {m['packed_recall']:.3f} ({m['packed_tokens']} vs {m['top5_tokens']} top-5 tokens)")
+        for module, mm in result["modules"].items():
+            print(f"  {module:10} recall@5 {mm.get('recall@5', 0):.3f}  MRR {mm['mrr']:.3f}")
+
+        print(f"  {'stage':10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for stage, p in result["stages"].items():
+            print(f"  {stage:10} {p['p50_ms']:9.3f} {p['p95_ms']:9.3f} {p['p99_ms']:9.3f}")
+
+        if result["misses"]:
+            print(f"  missed: {'; '.join(result['misses'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline RAG recall/latency benchmark")
+    parser.add_argument("--modules", nargs="+", default=["accounts", "buying", "stock"])
+    parser.add_argument("--modes", nargs="+", choices=SEARCH_MODES, default=list(SEARCH_MODES))
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="auto")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per question for latency percentiles")
+    parser.add_argument("--gold", default=GOLD_PATH)
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable results")
+    parser.add_argument("--out", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(args.modules, args.modes, args.index_type, args.k, args.repeat, args.gold)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
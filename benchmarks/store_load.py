@@ -0,0 +1,141 @@
+"""
+Compares load time and peak RSS of analyzer output as indent=2 JSON
+against the columnar `.col` format.
+
+Each measurement runs in a fresh interpreter so RSS numbers are not
+polluted by earlier loads; RSS is the resident-set growth across the load
+with the loaded object still alive.
+
+Usage: python -m benchmarks.store_load [output/accounts_calls.json ...]
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Analyzer.store import ColumnarTable, convert_json
+
+
+DEFAULT_FILES = [
+    "output/functions.json",
+    "output/classes.json",
+    "output/accounts_functions.json",
+    "output/accounts_calls.json",
+]
+
+MODES = ("json", "col_open", "col_scan")
+
+
+def kind_for(path):
+    name = os.path.basename(path)
+    for kind in ("functions", "classes", "calls"):
+        if name.endswith(f"{kind}.json"):
+            return kind
+    raise ValueError(f"Cannot infer table kind from {path}")
+
+
+def rss_kb():
+    """Current resident set size; falls back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() // 1024
+    except OSError:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_child(mode, path):
+    """Performs one load in this process and prints {seconds, rss_kb, rows}."""
+    before = rss_kb()
+    started = time.perf_counter()
+
+    if mode == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            loaded = json.load(f)
+        rows = len(loaded)
+    elif mode == "col_open":
+        loaded = ColumnarTable(path)
+        rows = len(loaded)
+    else:
+        loaded = list(ColumnarTable(path))
+        rows = len(loaded)
+
+    print(json.dumps({
+        "seconds": time.perf_counter() - started,
+        "rss_kb": rss_kb() - before,
+        "rows": rows,
+    }))
+
+
+def measure(mode, path, repeat=3):
+    best = None
+    for _ in range(repeat):
+        out = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.store_load", "--child", mode, path],
+            text=True,
+        )
+        result = json.loads(out)
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def bench_file(json_path, tmp_dir):
+    col_path = os.path.join(tmp_dir, os.path.basename(json_path)[:-5] + ".col")
+    convert_json(json_path, kind_for(json_path), col_path)
+
+    results = {
+        "file": json_path,
+        "json_bytes": os.path.getsize(json_path),
+        "col_bytes": os.path.getsize(col_path),
+    }
+
+    for mode in MODES:
+        target = json_path if mode == "json" else col_path
+        result = measure(mode, target)
+        results[mode] = {
+            "seconds": result["seconds"],
+            "rss_delta_kb": result["rss_kb"],
+            "rows": result["rows"],
+        }
+
+    return results
+
+
+def print_report(results):
+    print(f"{'file':40} {'size MB':>14} {'json ms':>9} {'open ms':>9} {'scan ms':>9} "
+          f"{'json RSS':>9} {'open RSS':>9} {'scan RSS':>9}")
+
+    for r in results:
+        size = f"{r['json_bytes'] / 1e6:.1f}->{r['col_bytes'] / 1e6:.1f}"
+        times = [r[m]["seconds"] * 1000 for m in MODES]
+        rss = [r[m]["rss_delta_kb"] / 1024 for m in MODES]
+        print(f"{r['file']:40} {size:>14} "
+              + " ".join(f"{t:9.1f}" for t in times) + " "
+              + " ".join(f"{m:7.1f}MB" for m in rss))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    if args[:1] == ["--child"]:
+        run_child(args[1], args[2])
+        sys.exit(0)
+
+    as_json = "--json" in args
+    files = [a for a in args if a != "--json"] or [f for f in DEFAULT_FILES if os.path.exists(f)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = [bench_file(path, tmp_dir) for path in files]
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
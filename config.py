@@ -2,10 +2,120 @@ import os
 
 OLLAMA_URL = "http://localhost:11434"
 
+# Seconds before an Ollama embedding call is abandoned
+EMBED_TIMEOUT = 60
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 OPENAI_MODEL = "gpt-4o-mini"
 
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
 EMBED_MODEL = "nomic-embed-text"
 
+# Tags every index and cached embedding: /api/embed returns normalized
+# vectors, unlike the /api/embeddings endpoint older indexes were built
+# with, so vectors from different models or endpoints never mix
+EMBED_VERSION = f"{EMBED_MODEL}@/api/embed"
+
+# Index builds: texts per /api/embed request and requests in flight
+EMBED_BATCH_SIZE = 32
+EMBED_CONCURRENCY = 4
+
+# On-disk embedding cache keyed by (EMBED_VERSION, sha256 of text)
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "vector_db/embeddings.sqlite")
+EMBED_CACHE_MAX_ENTRIES = 500_000
+
 LLM_MODEL = "llama3"
+
+# System message sent with every chat call, whichever provider answers
+SYSTEM_PROMPT = "You are an expert ERPNext codebase assistant."
+
+# Seconds any LLM provider may go without sending data (the reply, or the
+# next streamed token) before the call is abandoned
+LLM_TIMEOUT = 120
+
+# Pooled keep-alive connections shared by every request in an API worker
+LLM_POOL_SIZE = 64
+
+# Chats generating at once per API worker, and how long (seconds) a new
+# request waits for a free slot before it is answered 503
+API_MAX_CONCURRENT = 32
+API_QUEUE_TIMEOUT = 5
+
+# Per-session chat history: idle sessions expire after CONVERSATION_TTL
+# seconds, each keeps at most CONVERSATION_TOKEN_BUDGET tokens of recent
+# messages, and the least recently used sessions beyond the cap are evicted.
+# Set CONVERSATION_DB to a SQLite path to share history between workers.
+CONVERSATION_TTL = 3600
+CONVERSATION_TOKEN_BUDGET = 2000
+CONVERSATION_MAX_SESSIONS = 10_000
+CONVERSATION_DB = os.getenv("CONVERSATION_DB")
+
+# Answer cache in front of the LLM: entries live ANSWER_CACHE_TTL seconds
+# and at most ANSWER_CACHE_MAX_ENTRIES are kept. Exact matches only unless
+# ANSWER_CACHE_SIMILARITY is set (e.g. 0.97): then a question whose embedding
+# has cosine similarity >= it with a cached one reuses its answer, at the
+# cost of embedding questions the retriever answered without one
+ANSWER_CACHE_TTL = 24 * 3600
+ANSWER_CACHE_MAX_ENTRIES = 1024
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0)) or None
+
+# safe_generate tries providers in this order, failing over on errors
+# ("stub" is an offline provider for load tests)
+LLM_ROUTE = [p.strip() for p in os.getenv("LLM_ROUTE", "openai,groq,ollama").split(",") if p.strip()]
+
+# Attempts per provider after the first, before failing over
+LLM_RETRIES = 2
+
+# Per provider: (calls per second, calls in flight)
+LLM_LIMITS = {
+    "openai": (10, 8),
+    "groq": (5, 4),
+    "ollama": (20, 2),
+    "stub": (1000, 64),
+}
+
+# Simulated latency of the stub provider, per call and per token (seconds)
+STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0.05"))
+STUB_LLM_TOKEN_LATENCY = float(os.getenv("STUB_LLM_TOKEN_LATENCY", "0.002"))
+
+# Prompt tokens per model for instructions, history, question and retrieved
+# code together; rag/context.py packs retrieved chunks into what is left
+CONTEXT_TOKEN_BUDGETS = {
+    "gpt-4o-mini": 6000,
+    "llama-3.3-70b-versatile": 6000,
+    "llama3": 3000,
+    "default": 3000,
+}
+PROMPT_OVERHEAD_TOKENS = 64
+
+# Chunks retrieved per question; after deduplication the packer keeps
+# between CONTEXT_MIN_K and CONTEXT_MAX_K of them, dropping any past the
+# minimum whose relevance to the top hit is below CONTEXT_SCORE_CUTOFF
+CONTEXT_POOL_K = 12
+CONTEXT_MIN_K = 3
+CONTEXT_MAX_K = 5
+CONTEXT_SCORE_CUTOFF = 0.5
+
+# Batch migration (migrate/batch.py): files migrated concurrently, and where
+# the Go output tree and its resumable manifest are written
+MIGRATE_WORKERS = 8
+MIGRATE_OUTPUT_DIR = "migrations"
+
+# Function-level migration (migrate/units.py): units of one file migrated
+# concurrently, and extra attempts for a unit whose output fails validation
+MIGRATE_UNIT_WORKERS = 4
+MIGRATE_UNIT_RETRIES = 1
+
+# Go verification sandbox (migrate/go_sandbox.py): toolchain, shared build
+# cache for every job (unset = Go's default), compile-error fix rounds,
+# parallel differential runs, and per-step timeouts in seconds
+GO_BINARY = os.getenv("GO_BINARY", "go")
+GO_CACHE_DIR = os.getenv("GOCACHE")
+GO_FIX_ROUNDS = 3
+GO_VERIFY_WORKERS = os.cpu_count() or 1
+GO_BUILD_TIMEOUT = 120
+GO_RUN_TIMEOUT = 10
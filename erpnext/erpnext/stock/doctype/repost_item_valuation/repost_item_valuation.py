@@ -9,8 +9,9 @@ from frappe.desk.form.load import get_attachments
 from frappe.exceptions import QueryDeadlockError, QueryTimeoutError
 from frappe.model.document import Document
 from frappe.query_builder import DocType, Interval
-from frappe.query_builder.functions import CombineDatetime, Max, Now
-from frappe.utils import cint, get_link_to_form, get_weekday, getdate, now, nowtime
+from frappe.query_builder.functions import CombineDatetime, Count, IfNull, Max, Min, Now
+from frappe.utils import add_to_date, cint, flt, get_link_to_form, get_weekday, getdate, now, nowtime
+from frappe.utils.background_jobs import is_job_enqueued
 from frappe.utils.user import get_users_with_role
 from rq.timeouts import JobTimeoutException
 
@@ -22,9 +23,15 @@ from erpnext.stock.stock_ledger import (
 	get_items_to_be_repost,
 	repost_future_sle,
 )
+from erpnext.stock.utils import get_combine_datetime
 
 RecoverableErrors = (JobTimeoutException, QueryDeadlockError, QueryTimeoutError)
 
+# Parallel reposting: entry name -> id of the component job that owns it
+REPOSTING_JOBS_CACHE_KEY = "repost_item_valuation_jobs"
+REPOSTING_SCHEDULE_CACHE_KEY = "repost_item_valuation_schedule"
+REPOSTING_COMPONENT_TIMEOUT = 4 * 60 * 60
+
 
 class RepostItemValuation(Document):
 	# begin: auto-generated types
@@ -547,7 +554,7 @@ def get_recipients():
 
 
 def run_parallel_reposting():
-	# This function is called every 15 minutes via hooks.py
+	# This function is called every 30 minutes via hooks.py
 
 	if not frappe.db.get_single_value("Stock Reposting Settings", "enable_parallel_reposting"):
 		return
@@ -555,32 +562,240 @@ def run_parallel_reposting():
 	if not in_configured_timeslot():
 		return
 
-	items = set()
 	no_of_parallel_reposting = (
 		frappe.db.get_single_value("Stock Reposting Settings", "no_of_parallel_reposting") or 4
 	)
 
+	coalesce_repost_item_valuation_entries()
 	riv_entries = get_repost_item_valuation_entries()
 
+	stock_entries = []
 	for row in riv_entries:
-		if row.based_on != "Item and Warehouse" or row.repost_only_accounting_ledgers:
+		if row.repost_only_accounting_ledgers:
 			execute_reposting_entry(row.name)
 			continue
 
-		if row.item_code in items:
+		stock_entries.append(row)
+
+	components = get_reposting_components(stock_entries)
+	running_jobs = get_running_component_jobs([row.name for row in stock_entries])
+
+	free_workers = no_of_parallel_reposting - len(set(running_jobs.values()))
+	enqueued = 0
+	for names in components:
+		if any(name in running_jobs for name in names):
+			# a worker is already draining this component; new entries wait for it to finish
 			continue
 
-		items.add(row.item_code)
-		if len(items) > no_of_parallel_reposting:
+		if enqueued >= free_workers:
 			break
 
-		frappe.enqueue(
-			execute_reposting_entry,
-			name=row.name,
-			queue="long",
-			timeout=1800,
+		enqueue_reposting_component(names)
+		enqueued += 1
+
+	frappe.cache.set_value(
+		REPOSTING_SCHEDULE_CACHE_KEY,
+		{
+			"scheduled_at": now(),
+			"pending_entries": len(stock_entries),
+			"components": len(components),
+			"largest_component": max((len(names) for names in components), default=0),
+			"running_components": len(set(running_jobs.values())),
+			"enqueued_components": enqueued,
+			"workers": no_of_parallel_reposting,
+		},
+	)
+
+
+def get_reposting_components(riv_entries):
+	"""Partition pending stock reposts into independent groups.
+
+	Reposting an item-warehouse walks into every item-warehouse linked to it through
+	`dependant_sle_voucher_detail_no` after its posting date: source and target warehouse
+	of a transfer, raw materials and finished goods of a repack or manufacture. Entries
+	whose item-warehouses are connected through such links must run one after another;
+	separate components can run in parallel.
+
+	Returns a list of components, each a list of entry names in reposting order.
+	"""
+	if not riv_entries:
+		return []
+
+	item_warehouses = {row.name: get_item_warehouses_to_repost(row) for row in riv_entries}
+
+	from_datetime = min(get_combine_datetime(row.posting_date, row.posting_time) for row in riv_entries)
+	links = get_item_warehouse_links(from_datetime)
+
+	return partition_reposting_entries([row.name for row in riv_entries], item_warehouses, links)
+
+
+def partition_reposting_entries(names, item_warehouses, links):
+	"""Union-find over (item_code, warehouse) nodes.
+
+	names: entry names in reposting order
+	item_warehouses: entry name -> (item_code, warehouse) pairs it reposts
+	links: ((item_code, warehouse), (item_code, warehouse)) pairs that repost together
+	"""
+	parent = {}
+
+	def find(node):
+		parent.setdefault(node, node)
+		while parent[node] != node:
+			parent[node] = parent[parent[node]]
+			node = parent[node]
+		return node
+
+	def union(a, b):
+		root_a, root_b = find(a), find(b)
+		if root_a != root_b:
+			parent[root_b] = root_a
+
+	for a, b in links:
+		union(a, b)
+
+	for name in names:
+		nodes = item_warehouses.get(name) or [("", name)]
+		for node in nodes[1:]:
+			union(nodes[0], node)
+
+	components = {}
+	for name in names:
+		nodes = item_warehouses.get(name) or [("", name)]
+		components.setdefault(find(nodes[0]), []).append(name)
+
+	return list(components.values())
+
+
+def get_item_warehouses_to_repost(row):
+	if row.based_on == "Item and Warehouse":
+		return [(row.item_code, row.warehouse)]
+
+	sles = frappe.get_all(
+		"Stock Ledger Entry",
+		filters={"voucher_type": row.voucher_type, "voucher_no": row.voucher_no},
+		fields=["item_code", "warehouse"],
+		distinct=True,
+	)
+
+	return sorted({(sle.item_code, sle.warehouse) for sle in sles})
+
+
+def get_item_warehouse_links(from_datetime):
+	"""Pairs of item-warehouses connected by a dependant SLE posted on or after from_datetime."""
+	sle = frappe.qb.DocType("Stock Ledger Entry")
+	dependant_sle = frappe.qb.DocType("Stock Ledger Entry").as_("dependant_sle")
+
+	query = (
+		frappe.qb.from_(sle)
+		.inner_join(dependant_sle)
+		.on(
+			(dependant_sle.voucher_type == sle.voucher_type)
+			& (dependant_sle.voucher_no == sle.voucher_no)
+			& (dependant_sle.voucher_detail_no == sle.dependant_sle_voucher_detail_no)
+			& (dependant_sle.name != sle.name)
+		)
+		.select(
+			sle.item_code,
+			sle.warehouse,
+			dependant_sle.item_code.as_("dependant_item_code"),
+			dependant_sle.warehouse.as_("dependant_warehouse"),
+		)
+		.distinct()
+		.where(
+			(sle.dependant_sle_voucher_detail_no.isnotnull())
+			& (sle.dependant_sle_voucher_detail_no != "")
+			& (sle.posting_datetime >= from_datetime)
+			& (sle.is_cancelled == 0)
+			& (dependant_sle.is_cancelled == 0)
+		)
+	)
+
+	return [
+		((row.item_code, row.warehouse), (row.dependant_item_code, row.dependant_warehouse))
+		for row in query.run(as_dict=True)
+	]
+
+
+def get_running_component_jobs(names):
+	"""Entry name -> job id, for entries claimed by a component job that is still queued or running."""
+	running = {}
+	for name in names:
+		job_id = frappe.cache.hget(REPOSTING_JOBS_CACHE_KEY, name)
+		if not job_id:
+			continue
+
+		if is_job_enqueued(job_id):
+			running[name] = job_id
+		else:
+			# the worker died without releasing its entries
+			frappe.cache.hdel(REPOSTING_JOBS_CACHE_KEY, name)
+
+	return running
+
+
+def enqueue_reposting_component(names):
+	job_id = f"repost_item_valuation::{names[0]}"
+	for name in names:
+		frappe.cache.hset(REPOSTING_JOBS_CACHE_KEY, name, job_id)
+
+	frappe.enqueue(
+		execute_reposting_component,
+		names=names,
+		queue="long",
+		timeout=REPOSTING_COMPONENT_TIMEOUT,
+		job_id=job_id,
+	)
+
+
+def execute_reposting_component(names):
+	"""Repost the entries of one component in order, then release them for the scheduler."""
+	try:
+		for name in names:
+			execute_reposting_entry(name)
+	finally:
+		for name in names:
+			frappe.cache.hdel(REPOSTING_JOBS_CACHE_KEY, name)
+
+
+@frappe.whitelist()
+def get_reposting_metrics():
+	"""Backlog and throughput of Repost Item Valuation, with the last parallel schedule."""
+	frappe.has_permission("Repost Item Valuation", throw=True)
+
+	table = frappe.qb.DocType("Repost Item Valuation")
+	pending = (
+		frappe.qb.from_(table)
+		.select(table.status, Count(table.name).as_("count"), Min(table.creation).as_("oldest"))
+		.where((table.docstatus == 1) & (table.status.isin(["Queued", "In Progress"])))
+		.groupby(table.status)
+	).run(as_dict=True)
+
+	completed = {}
+	for hours in (1, 24):
+		completed[hours] = frappe.db.count(
+			"Repost Item Valuation",
+			{
+				"docstatus": 1,
+				"status": "Completed",
+				"modified": (">=", add_to_date(now(), hours=-hours)),
+			},
 		)
 
+	backlog = sum(row.count for row in pending)
+	oldest = min((row.oldest for row in pending), default=None)
+	per_hour = completed[24] / 24
+
+	return {
+		"backlog": backlog,
+		"queued": sum(row.count for row in pending if row.status == "Queued"),
+		"in_progress": sum(row.count for row in pending if row.status == "In Progress"),
+		"oldest_pending": oldest,
+		"completed_last_hour": completed[1],
+		"completed_last_24_hours": completed[24],
+		"hours_to_clear_backlog": flt(backlog / per_hour, 1) if per_hour else None,
+		"last_schedule": frappe.cache.get_value(REPOSTING_SCHEDULE_CACHE_KEY),
+	}
+
 
 def repost_entries():
 	# This function is called every hour via hooks.py
@@ -591,6 +806,7 @@ def repost_entries():
 	if not in_configured_timeslot():
 		return
 
+	coalesce_repost_item_valuation_entries()
 	riv_entries = get_repost_item_valuation_entries()
 
 	for row in riv_entries:
@@ -612,12 +828,119 @@ def execute_reposting_entry(name):
 		doc.deduplicate_similar_repost()
 
 
+def coalesce_repost_item_valuation_entries():
+	"""Merge queued reposts that would walk the same ledger into the earliest one.
+
+	Reposting an item-warehouse (or a voucher) replays every later SLE, so of several
+	queued reposts for the same item-warehouse, or for the same voucher, only the one
+	with the earliest posting datetime needs to run. The others are marked Skipped with
+	`reposting_reference` pointing to it, and their affected transactions are carried
+	over so their GL entries still get reposted.
+
+	Only entries that have not started (Queued, current_index 0) are merged. Returns the
+	number of entries skipped.
+	"""
+	groups = {}
+	for row in get_coalescable_repost_entries():
+		groups.setdefault(get_coalescing_key(row), []).append(row)
+
+	skipped = 0
+	for rows in groups.values():
+		if len(rows) < 2:
+			continue
+
+		# rows are ordered by posting datetime, the first one reposts from the earliest point
+		merge_repost_entries(rows[0], rows[1:])
+		skipped += len(rows) - 1
+
+	return skipped
+
+
+def get_coalescable_repost_entries():
+	doctype = frappe.qb.DocType("Repost Item Valuation")
+
+	query = (
+		frappe.qb.from_(doctype)
+		.select(
+			doctype.name,
+			doctype.based_on,
+			doctype.item_code,
+			doctype.warehouse,
+			doctype.voucher_type,
+			doctype.voucher_no,
+			doctype.allow_negative_stock,
+			doctype.allow_zero_rate,
+			doctype.via_landed_cost_voucher,
+			doctype.affected_transactions,
+			doctype.reposting_data_file,
+		)
+		.where(
+			(doctype.status == "Queued")
+			& (doctype.docstatus == 1)
+			& (doctype.repost_only_accounting_ledgers == 0)
+			& (doctype.recreate_stock_ledgers == 0)
+			& (IfNull(doctype.current_index, 0) == 0)
+		)
+		.orderby(CombineDatetime(doctype.posting_date, doctype.posting_time), order=frappe.qb.asc)
+		.orderby(doctype.creation, order=frappe.qb.asc)
+	)
+
+	return query.run(as_dict=True)
+
+
+def get_coalescing_key(row):
+	if row.based_on == "Item and Warehouse":
+		reposted = (row.item_code, row.warehouse)
+	else:
+		reposted = (row.voucher_type, row.voucher_no)
+
+	return (
+		row.based_on,
+		*reposted,
+		cint(row.allow_negative_stock),
+		cint(row.allow_zero_rate),
+		cint(row.via_landed_cost_voucher),
+	)
+
+
+def merge_repost_entries(target, entries):
+	affected_transactions = get_affected_transactions(target)
+	merged_transactions = set(affected_transactions)
+	for row in entries:
+		merged_transactions.update(get_affected_transactions(row))
+
+	if merged_transactions != affected_transactions:
+		frappe.db.set_value(
+			"Repost Item Valuation",
+			target.name,
+			"affected_transactions",
+			frappe.as_json(sorted(merged_transactions)),
+		)
+
+	for row in entries:
+		frappe.db.set_value(
+			"Repost Item Valuation",
+			row.name,
+			{"status": "Skipped", "reposting_reference": target.name},
+		)
+
+
 def get_repost_item_valuation_entries():
 	doctype = frappe.qb.DocType("Repost Item Valuation")
 
 	query = (
 		frappe.qb.from_(doctype)
-		.select(doctype.name, doctype.based_on, doctype.item_code, doctype.repost_only_accounting_ledgers)
+		.select(
+			doctype.name,
+			doctype.based_on,
+			doctype.item_code,
+			doctype.warehouse,
+			doctype.voucher_type,
+			doctype.voucher_no,
+			doctype.posting_date,
+			doctype.posting_time,
+			doctype.repost_only_accounting_ledgers,
+		)
 		.where(
 			(doctype.status.isin(["Queued", "In Progress"]))
 			& (doctype.creation <= now())
@@ -14,7 +14,10 @@ from erpnext.controllers.stock_controller import create_item_wise_repost_entries
 from erpnext.stock.doctype.item.test_item import make_item
 from erpnext.stock.doctype.purchase_receipt.test_purchase_receipt import make_purchase_receipt
 from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import (
+	coalesce_repost_item_valuation_entries,
+	get_item_warehouse_links,
 	in_configured_timeslot,
+	partition_reposting_entries,
 )
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
 from erpnext.stock.tests.test_utils import StockTestMixin
@@ -174,6 +177,79 @@ class TestRepostItemValuation(IntegrationTestCase, StockTestMixin):
 		riv4.set_status("Skipped")
 		riv3.set_status("Skipped")
 
+	def test_coalescing(self):
+		item_code = make_item("_Test Item Coalescing Repost", {"is_stock_item": 1}).name
+		riv_args = frappe._dict(
+			doctype="Repost Item Valuation",
+			item_code=item_code,
+			warehouse="_Test Warehouse - _TC",
+			based_on="Item and Warehouse",
+			posting_date="2021-01-03",
+			posting_time="00:01:00",
+		)
+
+		rivs = []
+		for posting_date, warehouse in (
+			("2021-01-03", "_Test Warehouse - _TC"),
+			("2021-01-01", "_Test Warehouse - _TC"),
+			("2021-01-05", "_Test Warehouse - _TC"),
+			("2021-01-02", "Stores - _TC"),
+		):
+			riv = frappe.get_doc(riv_args.update({"posting_date": posting_date, "warehouse": warehouse}))
+			riv.flags.dont_run_in_test = True
+			riv.submit()
+			rivs.append(riv)
+
+		frappe.db.set_value(
+			"Repost Item Valuation",
+			rivs[2].name,
+			"affected_transactions",
+			frappe.as_json([["Delivery Note", "_T-DN-1"]]),
+		)
+
+		coalesce_repost_item_valuation_entries()
+		for riv in rivs:
+			riv.load_from_db()
+
+		# the earliest repost of the item-warehouse runs, later ones point to it
+		self.assertEqual([riv.status for riv in rivs], ["Skipped", "Queued", "Skipped", "Queued"])
+		self.assertEqual(rivs[0].reposting_reference, rivs[1].name)
+		self.assertEqual(rivs[2].reposting_reference, rivs[1].name)
+		self.assertEqual(frappe.parse_json(rivs[1].affected_transactions), [["Delivery Note", "_T-DN-1"]])
+
+		# to avoid breaking other tests accidentaly
+		rivs[1].set_status("Skipped")
+		rivs[3].set_status("Skipped")
+
+	def test_partition_reposting_entries(self):
+		item_warehouses = {
+			"RIV-1": [("A", "Stores")],
+			"RIV-2": [("B", "Stores")],
+			"RIV-3": [("A", "Finished Goods")],
+			"RIV-4": [("C", "Stores"), ("D", "Stores")],
+			"RIV-5": [("D", "Stores")],
+			"RIV-6": [],
+		}
+		# A is transferred from Stores to Finished Goods
+		links = [(("A", "Stores"), ("A", "Finished Goods"))]
+
+		components = partition_reposting_entries(list(item_warehouses), item_warehouses, links)
+
+		self.assertEqual(components, [["RIV-1", "RIV-3"], ["RIV-2"], ["RIV-4", "RIV-5"], ["RIV-6"]])
+
+	def test_transfer_links_item_warehouses(self):
+		item_code = make_item("_Test Item Reposting Links", {"is_stock_item": 1}).name
+		make_stock_entry(item_code=item_code, target="_Test Warehouse - _TC", qty=10, basic_rate=100)
+		make_stock_entry(
+			item_code=item_code, source="_Test Warehouse - _TC", target="_Test Warehouse 1 - _TC", qty=5
+		)
+
+		links = get_item_warehouse_links(add_days(now(), -1))
+
+		self.assertIn(
+			((item_code, "_Test Warehouse - _TC"), (item_code, "_Test Warehouse 1 - _TC")), links
+		)
+
 	def test_stock_freeze_validation(self):
 		today = nowdate()
 
@@ -3,6 +3,7 @@
 
 import json
 import time
+from unittest.mock import patch
 from uuid import uuid4
 
 import frappe
@@ -1382,6 +1383,233 @@ class TestStockLedgerEntry(IntegrationTestCase, StockTestMixin):
 			item_code=item_code, source=warehouse, qty=470.84, rate=100, posting_date=add_days(today(), -1)
 		)
 
+	def test_batched_write_back_on_reposting(self):
+		"""Backdated receipt reposts plain receipts and deliveries in multi-row UPDATE chunks."""
+		item_code = make_item(properties={"valuation_method": "FIFO"}).name
+		warehouse = "_Test Warehouse - _TC"
+		dn_args = {
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"qty": 5,
+			"rate": 500,
+			"company": "_Test Company",
+			"expense_account": "Cost of Goods Sold - _TC",
+			"cost_center": "Main - _TC",
+		}
+
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=200, posting_date=add_days(today(), -1)
+		)
+		dns = [create_delivery_note(**dn_args), create_delivery_note(**dn_args)]
+		make_purchase_receipt(item_code=item_code, warehouse=warehouse, qty=10, rate=300)
+		dns.append(create_delivery_note(**dn_args))
+
+		# Chunks of two force several flushes within one item-warehouse repost
+		with patch("erpnext.stock.stock_ledger.SLE_WRITE_BACK_BATCH_SIZE", 2):
+			make_purchase_receipt(
+				item_code=item_code, warehouse=warehouse, qty=10, rate=100, posting_date=add_days(today(), -2)
+			)
+
+		sle_differences = [
+			frappe.db.get_value(
+				"Stock Ledger Entry",
+				{"voucher_no": dn.name, "is_cancelled": 0},
+				"stock_value_difference",
+			)
+			for dn in dns
+		]
+		self.assertEqual(sle_differences, [-500.0, -500.0, -1000.0])
+
+		last_sle = frappe.db.get_value(
+			"Stock Ledger Entry",
+			{"voucher_no": dns[-1].name, "is_cancelled": 0},
+			["qty_after_transaction", "stock_value", "stock_queue"],
+			as_dict=True,
+		)
+		self.assertEqual((last_sle.qty_after_transaction, last_sle.stock_value), (15.0, 4000.0))
+		self.assertEqual(json.loads(last_sle.stock_queue), [[5, 200], [10, 300]])
+
+		bin_qty, bin_value = frappe.db.get_value(
+			"Bin", {"item_code": item_code, "warehouse": warehouse}, ["actual_qty", "stock_value"]
+		)
+		self.assertEqual((bin_qty, bin_value), (15.0, 4000.0))
+
+	def test_return_is_not_deferred_on_reposting(self):
+		"""A return re-reads its delivery's rate, so the delivery must be written back first."""
+		item_code = make_item(properties={"valuation_method": "FIFO"}).name
+		warehouse = "_Test Warehouse - _TC"
+		dn_args = {
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"rate": 500,
+			"company": "_Test Company",
+			"expense_account": "Cost of Goods Sold - _TC",
+			"cost_center": "Main - _TC",
+		}
+
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=200, posting_date=add_days(today(), -1)
+		)
+		dn = create_delivery_note(qty=5, **dn_args)
+		return_dn = create_delivery_note(is_return=1, return_against=dn.name, qty=-2, **dn_args)
+
+		# The backdated receipt moves the delivery's rate from 200 to 100
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=100, posting_date=add_days(today(), -2)
+		)
+
+		dn_difference = frappe.db.get_value(
+			"Stock Ledger Entry", {"voucher_no": dn.name, "is_cancelled": 0}, "stock_value_difference"
+		)
+		incoming_rate, return_difference = frappe.db.get_value(
+			"Stock Ledger Entry",
+			{"voucher_no": return_dn.name, "is_cancelled": 0},
+			["incoming_rate", "stock_value_difference"],
+		)
+		self.assertEqual(dn_difference, -500.0)
+		self.assertEqual((incoming_rate, return_difference), (100.0, 200.0))
+
+	def test_reposting_stops_at_converged_checkpoint(self):
+		"""Reposting stops once the recomputed valuation matches the stored one."""
+		item_code = make_item(properties={"valuation_method": "FIFO"}).name
+		warehouse = "_Test Warehouse - _TC"
+		dn_args = {
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"qty": 1,
+			"rate": 500,
+			"company": "_Test Company",
+			"expense_account": "Cost of Goods Sold - _TC",
+			"cost_center": "Main - _TC",
+		}
+
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=100, posting_date=add_days(today(), -5)
+		)
+		reco = create_stock_reconciliation(
+			item_code=item_code, warehouse=warehouse, qty=5, rate=200, posting_date=add_days(today(), -3)
+		)
+		dns = [
+			create_delivery_note(posting_date=add_days(today(), -2), **dn_args),
+			create_delivery_note(posting_date=add_days(today(), -1), **dn_args),
+		]
+
+		def get_sle(voucher_no):
+			return frappe.db.get_value(
+				"Stock Ledger Entry",
+				{"voucher_no": voucher_no, "is_cancelled": 0},
+				["qty_after_transaction", "stock_value", "stock_value_difference", "modified"],
+				as_dict=True,
+			)
+
+		modified_before = [get_sle(dn.name).modified for dn in dns]
+
+		# The reconciliation resets the valuation, so the deliveries after it stay untouched
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=150, posting_date=add_days(today(), -4)
+		)
+
+		self.assertEqual(get_sle(reco.name).stock_value_difference, -1500.0)
+		self.assertEqual([get_sle(dn.name).modified for dn in dns], modified_before)
+
+		last_sle = get_sle(dns[-1].name)
+		self.assertEqual((last_sle.qty_after_transaction, last_sle.stock_value), (3.0, 600.0))
+
+		bin_qty, bin_value = frappe.db.get_value(
+			"Bin", {"item_code": item_code, "warehouse": warehouse}, ["actual_qty", "stock_value"]
+		)
+		self.assertEqual((bin_qty, bin_value), (3.0, 600.0))
+
+	def test_reposting_does_not_stop_before_pending_cancellation(self):
+		"""A converged repost still walks past a queued repost it makes redundant."""
+		from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import repost_entries
+
+		item_code = make_item(properties={"valuation_method": "FIFO"}).name
+		warehouse = "_Test Warehouse - _TC"
+		dn_args = {
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"qty": 1,
+			"rate": 500,
+			"company": "_Test Company",
+			"expense_account": "Cost of Goods Sold - _TC",
+			"cost_center": "Main - _TC",
+		}
+
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=100, posting_date=add_days(today(), -5)
+		)
+		create_stock_reconciliation(
+			item_code=item_code, warehouse=warehouse, qty=5, rate=200, posting_date=add_days(today(), -3)
+		)
+		dns = [
+			create_delivery_note(posting_date=add_days(today(), -2), **dn_args),
+			create_delivery_note(posting_date=add_days(today(), -1), **dn_args),
+		]
+
+		# Both reposts are queued; the backdated receipt's one converges at the reconciliation
+		frappe.flags.dont_execute_stock_reposts = True
+		try:
+			make_purchase_receipt(
+				item_code=item_code, warehouse=warehouse, qty=10, rate=150, posting_date=add_days(today(), -4)
+			)
+			dns[0].cancel()
+		finally:
+			frappe.flags.pop("dont_execute_stock_reposts", None)
+
+		repost_entries()
+
+		last_sle = frappe.db.get_value(
+			"Stock Ledger Entry",
+			{"voucher_no": dns[-1].name, "is_cancelled": 0},
+			["qty_after_transaction", "stock_value"],
+			as_dict=True,
+		)
+		self.assertEqual((last_sle.qty_after_transaction, last_sle.stock_value), (4.0, 800.0))
+
+		bin_qty, bin_value = frappe.db.get_value(
+			"Bin", {"item_code": item_code, "warehouse": warehouse}, ["actual_qty", "stock_value"]
+		)
+		self.assertEqual((bin_qty, bin_value), (4.0, 800.0))
+
+	def test_reposting_does_not_stop_before_return(self):
+		"""A return after a converged checkpoint re-reads the rate of a delivery before it."""
+		item_code = make_item(properties={"valuation_method": "FIFO"}).name
+		warehouse = "_Test Warehouse - _TC"
+		dn_args = {
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"rate": 500,
+			"company": "_Test Company",
+			"expense_account": "Cost of Goods Sold - _TC",
+			"cost_center": "Main - _TC",
+		}
+
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=100, posting_date=add_days(today(), -5)
+		)
+		dn = create_delivery_note(qty=2, posting_date=add_days(today(), -4), **dn_args)
+		create_stock_reconciliation(
+			item_code=item_code, warehouse=warehouse, qty=5, rate=200, posting_date=add_days(today(), -3)
+		)
+		return_dn = create_delivery_note(
+			is_return=1, return_against=dn.name, qty=-1, posting_date=add_days(today(), -2), **dn_args
+		)
+
+		# The delivery's rate drops to 50 while the reconciliation still resets the state
+		make_purchase_receipt(
+			item_code=item_code, warehouse=warehouse, qty=10, rate=50, posting_date=add_days(today(), -6)
+		)
+
+		return_sle = frappe.db.get_value(
+			"Stock Ledger Entry",
+			{"voucher_no": return_dn.name, "is_cancelled": 0},
+			["incoming_rate", "stock_value_difference", "qty_after_transaction", "stock_value"],
+			as_dict=True,
+		)
+		self.assertEqual((return_sle.incoming_rate, return_sle.stock_value_difference), (50.0, 50.0))
+		self.assertEqual((return_sle.qty_after_transaction, return_sle.stock_value), (6.0, 1050.0))
+
 
 def create_repack_entry(**args):
 	args = frappe._dict(args)
@@ -9,13 +9,14 @@ import frappe
 from frappe import _, bold, scrub
 from frappe.model.meta import get_field_precision
 from frappe.query_builder import Order
-from frappe.query_builder.functions import Sum
+from frappe.query_builder.functions import CombineDatetime, Max, Sum
 from frappe.utils import (
 	add_to_date,
 	cint,
 	cstr,
 	flt,
 	format_date,
+	get_datetime,
 	get_link_to_form,
 	getdate,
 	now,
@@ -43,7 +44,7 @@ from erpnext.stock.utils import (
 	get_stock_balance,
 	get_valuation_method,
 )
-from erpnext.stock.valuation import FIFOValuation, LIFOValuation, round_off_if_near_zero
+from erpnext.stock.valuation import FIFOValuation, LIFOValuation, dump_queue, round_off_if_near_zero
 
 
 class NegativeStockError(frappe.ValidationError):
@@ -54,6 +55,22 @@ class SerialNoExistsInFutureTransaction(frappe.ValidationError):
 	pass
 
 
+# Reposting writes recomputed SLEs back in multi-row UPDATEs of this many rows
+SLE_WRITE_BACK_BATCH_SIZE = 500
+
+# Fields process_sle recomputes for entries whose write-back is deferred
+DEFERRED_SLE_FIELDS = (
+	"qty_after_transaction",
+	"valuation_rate",
+	"stock_value",
+	"stock_queue",
+	"stock_value_difference",
+	"incoming_rate",
+	"outgoing_rate",
+	"modified",
+)
+
+
 def make_sl_entries(sl_entries, allow_negative_stock=False, via_landed_cost_voucher=False):
 	"""Create SL entries from SL entry dicts
 
@@ -568,9 +585,11 @@ class update_entries_after:
 		self.new_items_found = False
 		self.distinct_item_warehouses = args.get("distinct_item_warehouses", frappe._dict())
 		self.affected_transactions: set[tuple[str, str]] = set()
+		self.voucher_kinds: dict[tuple[str, str], str | None] = {}
 		self.reserved_stock = self.get_reserved_stock()
 
 		self.data = frappe._dict()
+		self.ledger_writes = SLEWriteBuffer()
 		self.initialize_previous_data(self.args)
 		self.build()
 
@@ -644,14 +663,17 @@ class update_entries_after:
 				self.update_bin()
 		else:
 			entries_to_fix = self.get_future_entries_to_fix()
+			converges_from = self.get_convergence_start(entries_to_fix)
+			last_sle_by_warehouse = {}
 
 			i = 0
 			while i < len(entries_to_fix):
 				sle = entries_to_fix[i]
 				i += 1
 
+				checkpoint = get_valuation_checkpoint(sle) if i > converges_from else None
 				self.process_sle(sle)
-				self.update_bin_data(sle)
+				last_sle_by_warehouse[sle.warehouse] = sle
 
 				if sle.dependant_sle_voucher_detail_no:
 					entries_to_fix = self.get_dependent_entries_to_fix(entries_to_fix, sle)
@@ -659,9 +681,121 @@ class update_entries_after:
 						# for repack entries, we need to repost both source and target warehouses
 						self.update_distinct_item_warehouses_for_repack(sle)
 
+				if checkpoint and i < len(entries_to_fix) and self.has_converged(checkpoint):
+					# Later entries were computed from this very state, so they are already correct
+					last_sle_by_warehouse[sle.warehouse] = entries_to_fix[-1]
+					break
+
+			# repost_future_sle commits current_index right after this, so the
+			# checkpoint never runs ahead of the ledger
+			self.ledger_writes.flush()
+			for sle in last_sle_by_warehouse.values():
+				self.update_bin_data(sle)
+
 		if self.exceptions:
 			self.raise_exceptions()
 
+	def get_convergence_start(self, entries):
+		"""
+		Index of the first entry at which reposting may stop early.
+
+		From there on every entry is self-contained (no serial / batch, adjustment,
+		dependent entries, returns or rates re-read from the transaction) and was last written
+		after the entry before it, i.e. its stored values were derived from the stored
+		values of its predecessor. If the recomputed state of such an entry matches
+		what is stored, the rest of the ledger would be recomputed to exactly what it
+		already is.
+
+		Cancelled entries are not part of the walk, so the entries after them still
+		carry their effect until the cancellation's own repost runs. Reposting never
+		stops before a pending repost of this item-warehouse, as deduplication and
+		coalescing skip those in favour of the one running.
+		"""
+		start = len(entries)
+		for idx in range(len(entries) - 1, 0, -1):
+			sle, previous_sle = entries[idx], entries[idx - 1]
+			if (
+				sle.serial_and_batch_bundle
+				or sle.serial_no
+				or sle.batch_no
+				or sle.is_adjustment_entry
+				or sle.dependant_sle_voucher_detail_no
+				or self.has_dynamic_rate(sle)
+				or self.get_voucher_kind(sle) == "return"
+				or not sle.modified
+				or not previous_sle.modified
+				or get_datetime(previous_sle.modified) > get_datetime(sle.modified)
+			):
+				break
+
+			start = idx - 1
+
+		if start < len(entries):
+			pending_repost_datetime = self.get_last_pending_repost_datetime()
+			while (
+				pending_repost_datetime
+				and start < len(entries)
+				and get_datetime(entries[start].posting_datetime) <= pending_repost_datetime
+			):
+				start += 1
+
+		return start
+
+	def get_last_pending_repost_datetime(self):
+		"""
+		Latest posting datetime of reposts that touch this item-warehouse and are still
+		queued, or were coalesced into a repost that is running now.
+		"""
+		riv = frappe.qb.DocType("Repost Item Valuation")
+		running = frappe.qb.DocType("Repost Item Valuation").as_("running")
+		sle = frappe.qb.DocType("Stock Ledger Entry")
+
+		running_reposts = (
+			frappe.qb.from_(running).select(running.name).where(running.status == "In Progress")
+		)
+
+		vouchers = (
+			frappe.qb.from_(sle)
+			.select(sle.voucher_no)
+			.where((sle.item_code == self.item_code) & (sle.warehouse == self.args.warehouse))
+		)
+
+		query = (
+			frappe.qb.from_(riv)
+			.select(Max(CombineDatetime(riv.posting_date, riv.posting_time)))
+			.where(
+				(riv.docstatus == 1)
+				& (
+					(riv.status == "Queued")
+					| ((riv.status == "Skipped") & (riv.reposting_reference.isin(running_reposts)))
+				)
+				& (
+					(
+						(riv.based_on == "Item and Warehouse")
+						& (riv.item_code == self.item_code)
+						& (riv.warehouse == self.args.warehouse)
+					)
+					| ((riv.based_on == "Transaction") & (riv.voucher_no.isin(vouchers)))
+				)
+			)
+		).run()
+
+		return get_datetime(query[0][0]) if query and query[0][0] else None
+
+	def has_converged(self, checkpoint):
+		"""True if the recomputed valuation matches the checkpoint stored on the entry"""
+		if (
+			flt(self.wh_data.qty_after_transaction, self.flt_precision)
+			!= flt(checkpoint.qty_after_transaction, self.flt_precision)
+			or flt(self.wh_data.stock_value, self.currency_precision)
+			!= flt(checkpoint.stock_value, self.currency_precision)
+			# valuation rate is stored with 9 decimals
+			or flt(self.wh_data.valuation_rate, 9) != flt(checkpoint.valuation_rate, 9)
+		):
+			return False
+
+		return (self.wh_data.stock_queue or []) == json.loads(checkpoint.stock_queue or "[]")
+
 	def update_distinct_item_warehouses_for_repack(self, sle):
 		sles = (
 			frappe.get_all(
@@ -814,10 +948,47 @@ class update_entries_after:
 				indicator="blue",
 			)
 
+	def can_defer_write(self, sle):
+		"""
+		While reposting, plain receipts and deliveries are written back in
+		batches. Anything whose valuation reads earlier ledger rows (serial /
+		batch entries, returns, stock entries, reconciliations, adjustment
+		entries) flushes the pending rows and is written directly.
+		"""
+		if self.args.get("sle_id"):
+			return False
+
+		if (
+			sle.serial_and_batch_bundle
+			or sle.serial_no
+			or sle.batch_no
+			or sle.is_adjustment_entry
+			or sle.recalculate_rate
+			or sle.dependant_sle_voucher_detail_no
+		):
+			return False
+
+		if sle.voucher_type not in ("Delivery Note", "Sales Invoice", "Purchase Receipt", "Purchase Invoice"):
+			return False
+
+		# A return's rate is read back from the original voucher's ledger entries
+		if self.get_voucher_kind(sle) == "return":
+			return False
+
+		if sle.voucher_type in ("Delivery Note", "Sales Invoice"):
+			return True
+
+		return sle.voucher_type in ("Purchase Receipt", "Purchase Invoice") and flt(sle.actual_qty) > 0
+
 	def process_sle(self, sle):
 		# previous sle data for this warehouse
 		self.wh_data = self.data[sle.warehouse]
 
+		defer_write = self.can_defer_write(sle)
+		if not defer_write:
+			# valuation below may read earlier entries of this item from the ledger
+			self.ledger_writes.flush()
+
 		self.validate_previous_sle_qty(sle)
 		self.affected_transactions.add((sle.voucher_type, sle.voucher_no))
 
@@ -920,7 +1091,7 @@ class update_entries_after:
 		sle.qty_after_transaction = flt(self.wh_data.qty_after_transaction, self.flt_precision)
 		sle.valuation_rate = self.wh_data.valuation_rate
 		sle.stock_value = self.wh_data.stock_value
-		sle.stock_queue = json.dumps(self.wh_data.stock_queue)
+		sle.stock_queue = dump_queue(self.wh_data.stock_queue)
 
 		sle.stock_value_difference = stock_value_difference
 		if (
@@ -942,7 +1113,10 @@ class update_entries_after:
 
 		sle.doctype = "Stock Ledger Entry"
 		sle.modified = now()
-		frappe.get_doc(sle).db_update()
+		if defer_write:
+			self.ledger_writes.add(sle)
+		else:
+			frappe.get_doc(sle).db_update()
 
 		if not self.args.get("sle_id") or (
 			sle.serial_and_batch_bundle and sle.auto_created_serial_and_batch_bundle
@@ -1190,11 +1364,7 @@ class update_entries_after:
 
 	def get_dynamic_incoming_outgoing_rate(self, sle):
 		# Get updated incoming/outgoing rate from transaction
-		if (
-			sle.recalculate_rate
-			or self.has_landed_cost_based_on_pi(sle)
-			or (sle.voucher_type == "Stock Entry" and sle.actual_qty > 0 and is_repack_entry(sle.voucher_no))
-		):
+		if self.has_dynamic_rate(sle):
 			rate = self.get_incoming_outgoing_rate_from_transaction(sle)
 
 			if flt(sle.actual_qty) >= 0:
@@ -1202,6 +1372,35 @@ class update_entries_after:
 			else:
 				sle.outgoing_rate = rate
 
+	def has_dynamic_rate(self, sle):
+		return bool(
+			sle.recalculate_rate
+			or self.has_landed_cost_based_on_pi(sle)
+			or (
+				sle.voucher_type == "Stock Entry"
+				and sle.actual_qty > 0
+				and self.get_voucher_kind(sle) == "repack"
+			)
+		)
+
+	def get_voucher_kind(self, sle):
+		"""
+		"return" for sales / purchase returns and "repack" for repack entries, whose
+		rates are re-read from other entries; None otherwise. Cached per voucher, as
+		the convergence scan asks for every entry of the ledger tail.
+		"""
+		key = (sle.voucher_type, sle.voucher_no)
+		if key not in self.voucher_kinds:
+			kind = None
+			if sle.voucher_type == "Stock Entry":
+				kind = "repack" if is_repack_entry(sle.voucher_no) else None
+			elif sle.voucher_type in ("Purchase Receipt", "Purchase Invoice", "Delivery Note", "Sales Invoice"):
+				if frappe.get_cached_value(sle.voucher_type, sle.voucher_no, "is_return"):
+					kind = "return"
+			self.voucher_kinds[key] = kind
+
+		return self.voucher_kinds[key]
+
 	def has_landed_cost_based_on_pi(self, sle):
 		if sle.voucher_type == "Purchase Receipt" and frappe.db.get_single_value(
 			"Buying Settings", "set_landed_cost_based_on_purchase_invoice_rate"
@@ -1646,6 +1845,7 @@ class update_entries_after:
 	def get_fallback_rate(self, sle) -> float:
 		"""When exact incoming rate isn't available use any of other "average" rates as fallback.
 		This should only get used for negative stock."""
+		self.ledger_writes.flush()
 		return get_valuation_rate(
 			sle.item_code,
 			sle.warehouse,
@@ -1667,6 +1867,7 @@ class update_entries_after:
 		return get_stock_ledger_entries(args, ">", "asc", for_update=True, check_serial_no=False)
 
 	def raise_exceptions(self):
+		self.ledger_writes.flush()
 		msg_list = []
 		for warehouse, exceptions in self.exceptions.items():
 			deficiency = min(e["diff"] for e in exceptions)
@@ -1735,6 +1936,44 @@ class update_entries_after:
 			frappe.db.set_value("Bin", bin_name, updated_values, update_modified=True)
 
 
+def get_valuation_checkpoint(sle):
+	"""Valuation state stored on a Stock Ledger Entry before it is recomputed"""
+	return frappe._dict(
+		{
+			"qty_after_transaction": sle.qty_after_transaction,
+			"stock_value": sle.stock_value,
+			"valuation_rate": sle.valuation_rate,
+			"stock_queue": sle.stock_queue,
+		}
+	)
+
+
+class SLEWriteBuffer:
+	"""
+	Recomputed Stock Ledger Entry values pending write-back, flushed with
+	frappe.db.bulk_update (one UPDATE ... CASE per chunk) instead of a
+	db_update per entry.
+	"""
+
+	def __init__(self, batch_size=None):
+		self.batch_size = batch_size or SLE_WRITE_BACK_BATCH_SIZE
+		self.pending = {}
+
+	def add(self, sle):
+		self.pending[sle.name] = {field: sle.get(field) for field in DEFERRED_SLE_FIELDS}
+		if len(self.pending) >= self.batch_size:
+			self.flush()
+
+	def flush(self):
+		if not self.pending:
+			return
+
+		frappe.db.bulk_update(
+			"Stock Ledger Entry", self.pending, chunk_size=self.batch_size, update_modified=False
+		)
+		self.pending = {}
+
+
 def get_previous_sle_of_current_voucher(args, operator="<", exclude_current_voucher=False):
 	"""get stock ledger entries filtered by specific posting datetime conditions"""
 
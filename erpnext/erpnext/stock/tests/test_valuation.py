@@ -8,7 +8,7 @@ from hypothesis import strategies as st
 
 from erpnext.stock.doctype.item.test_item import make_item
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
-from erpnext.stock.valuation import FIFOValuation, LIFOValuation, round_off_if_near_zero
+from erpnext.stock.valuation import FIFOValuation, LIFOValuation, dump_queue, round_off_if_near_zero
 
 qty_gen = st.floats(min_value=-1e6, max_value=1e6)
 value_gen = st.floats(min_value=1, max_value=1e6)
@@ -124,6 +124,28 @@ class TestFIFOValuation(IntegrationTestCase):
 		self.queue.add_stock(5, 17)
 		self.queue.add_stock(8, 11)
 
+	def test_remove_across_large_queue(self):
+		state = [[1, rate] for rate in range(1, 1001)]
+		self.queue = FIFOValuation(state)
+
+		consumed = self.queue.remove_stock(500.5)
+		self.assertEqual(consumed[:2], [[1, 1], [1, 2]])
+		self.assertEqual(consumed[-1], [0.5, 501])
+		self.assertEqual(len(consumed), 501)
+		# consumed bins are dropped from the caller's list too
+		self.assertIs(self.queue.state, state)
+		self.assertEqual(state[0], [0.5, 501])
+		self.assertEqual(len(state), 500)
+
+		self.queue.remove_stock(600, outgoing_rate=0)
+		self.assertEqual(self.queue, [[-100.5, 1000]])
+
+	def test_dump_queue_is_json(self):
+		self.queue.add_stock(1.5, 10)
+		self.queue.add_stock(2, 12.25)
+		self.assertEqual(dump_queue(self.queue.state), "[[1.5,10],[2,12.25]]")
+		self.assertEqual(json.loads(dump_queue(self.queue.state)), self.queue.state)
+
 	@given(stock_queue_generator)
 	def test_fifo_qty_hypothesis(self, stock_queue):
 		self.queue = FIFOValuation([])
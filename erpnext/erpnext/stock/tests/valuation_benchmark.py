@@ -0,0 +1,81 @@
+"""Microbenchmark for FIFO/LIFO queue operations at large queue sizes.
+
+Mirrors what update_entries_after.update_queue_values does per Stock Ledger Entry:
+total before, add_stock/remove_stock, total after and serialization of the queue.
+
+    bench --site <site> execute erpnext.stock.tests.valuation_benchmark.run
+    bench --site <site> execute erpnext.stock.tests.valuation_benchmark.run --kwargs "{'sizes': [100000]}"
+"""
+
+import json
+import time
+
+from erpnext.stock.valuation import FIFOValuation, LIFOValuation, dump_queue
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+
+def make_queue(size):
+	return [[1.0, 100.0 + i * 0.25] for i in range(size)]
+
+
+def timed(fn, repeat):
+	started = time.perf_counter()
+	for i in range(repeat):
+		fn(i)
+	return (time.perf_counter() - started) / repeat * 1e6
+
+
+def bench_method(valuation_class, size, repeat):
+	queue = valuation_class(make_queue(size))
+
+	def add(i):
+		queue.add_stock(1.0, 5_000.0 + i)
+
+	def remove_one_bin(i):
+		queue.remove_stock(1.0)
+		queue.add_stock(1.0, 7_000.0 + i)
+
+	def remove_many_bins(i):
+		# consumes 50 bins per call, then puts the stock back
+		queue.remove_stock(50.0)
+		for j in range(50):
+			queue.add_stock(1.0, 9_000.0 + i * 50 + j)
+
+	def totals(i):
+		queue.get_total_stock_and_value()
+
+	def serialize(i):
+		dump_queue(queue.state)
+
+	def serialize_json(i):
+		json.dumps(queue.state)
+
+	return {
+		"add_stock": timed(add, repeat),
+		"remove_stock (1 bin)": timed(remove_one_bin, repeat),
+		"remove_stock (50 bins)": timed(remove_many_bins, repeat),
+		"get_total_stock_and_value": timed(totals, repeat),
+		"dump_queue": timed(serialize, repeat),
+		"json.dumps": timed(serialize_json, repeat),
+		"stock_queue bytes": len(dump_queue(queue.state)),
+	}
+
+
+def run(sizes=DEFAULT_SIZES, repeat=200):
+	results = {}
+	for valuation_class in (FIFOValuation, LIFOValuation):
+		for size in sizes:
+			key = f"{valuation_class.__name__} ({size} bins)"
+			results[key] = bench_method(valuation_class, size, repeat)
+
+			print(key)
+			for name, value in results[key].items():
+				unit = "" if name == "stock_queue bytes" else " µs/op"
+				print(f"  {name:<28}{value:>14,.1f}{unit}")
+
+	return results
+
+
+if __name__ == "__main__":
+	run()
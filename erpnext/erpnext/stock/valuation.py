@@ -1,3 +1,4 @@
+import json
 from abc import ABC, abstractmethod, abstractproperty
 from collections.abc import Callable
 from typing import NewType
@@ -34,9 +35,19 @@ class BinWiseValuation(ABC):
 		total_qty = 0.0
 		total_value = 0.0
 
-		for qty, rate in self.state:
-			total_qty += flt(qty)
-			total_value += flt(qty) * flt(rate)
+		# Runs twice per SLE over the whole queue; plain float() gives the same sums as flt()
+		# for numeric bins at a fraction of the cost.
+		try:
+			for qty, rate in self.state:
+				qty = float(qty)
+				total_qty += qty
+				total_value += qty * float(rate)
+		except (TypeError, ValueError):
+			total_qty = 0.0
+			total_value = 0.0
+			for qty, rate in self.state:
+				total_qty += flt(qty)
+				total_value += flt(qty) * flt(rate)
 
 		return round_off_if_near_zero(total_qty), round_off_if_near_zero(total_value)
 
@@ -112,49 +123,64 @@ class FIFOValuation(BinWiseValuation):
 		        qty: quantity to remove
 		        rate: outgoing rate
 		        rate_generator: function to be called if queue is not found and rate is required.
+
+		Bins consumed from the front are skipped with a head index and dropped in one slice
+		at the end, so a removal spanning many bins doesn't shift the whole queue per bin.
 		"""
 		if not rate_generator:
 			rate_generator = lambda: 0.0  # noqa
 
+		queue = self.queue
+		head = 0
 		consumed_bins = []
-		while qty:
-			if not len(self.queue):
-				# rely on rate generator.
-				self.queue.append([0, rate_generator()])
-
-			index = None
-			if outgoing_rate > 0 or is_return_purchase_entry:
-				# Find the entry where rate matched with outgoing rate
-				for idx, fifo_bin in enumerate(self.queue):
-					if fifo_bin[RATE] == outgoing_rate:
-						index = idx
+		try:
+			while qty:
+				if head == len(queue):
+					# rely on rate generator.
+					del queue[:head]
+					head = 0
+					queue.append([0, rate_generator()])
+
+				index = None
+				if outgoing_rate > 0 or is_return_purchase_entry:
+					# Find the entry where rate matched with outgoing rate
+					for idx in range(head, len(queue)):
+						if queue[idx][RATE] == outgoing_rate:
+							index = idx
+							break
+
+					# If no entry found with outgoing rate, consume as per FIFO
+					if index is None:  # nosemgrep
+						index = head
+				else:
+					index = head
+
+				# select first bin or the bin with same rate
+				fifo_bin = queue[index]
+				if qty >= fifo_bin[QTY]:
+					# consume current bin
+					qty = round_off_if_near_zero(qty - fifo_bin[QTY])
+					if index == head:
+						head += 1
+					else:
+						queue.pop(index)
+					consumed_bins.append(list(fifo_bin))
+
+					if head == len(queue) and qty:
+						# stock finished, qty still remains to be withdrawn
+						# negative stock, keep in as a negative bin
+						del queue[:head]
+						head = 0
+						queue.append([-qty, outgoing_rate or fifo_bin[RATE]])
+						consumed_bins.append([qty, outgoing_rate or fifo_bin[RATE]])
 						break
-
-				# If no entry found with outgoing rate, consume as per FIFO
-				if index is None:  # nosemgrep
-					index = 0
-			else:
-				index = 0
-
-			# select first bin or the bin with same rate
-			fifo_bin = self.queue[index]
-			if qty >= fifo_bin[QTY]:
-				# consume current bin
-				qty = round_off_if_near_zero(qty - fifo_bin[QTY])
-				to_consume = self.queue.pop(index)
-				consumed_bins.append(list(to_consume))
-
-				if not self.queue and qty:
-					# stock finished, qty still remains to be withdrawn
-					# negative stock, keep in as a negative bin
-					self.queue.append([-qty, outgoing_rate or fifo_bin[RATE]])
-					consumed_bins.append([qty, outgoing_rate or fifo_bin[RATE]])
-					break
-			else:
-				# qty found in current bin consume it and exit
-				fifo_bin[QTY] = round_off_if_near_zero(fifo_bin[QTY] - qty)
-				consumed_bins.append([qty, fifo_bin[RATE]])
-				qty = 0
+				else:
+					# qty found in current bin consume it and exit
+					fifo_bin[QTY] = round_off_if_near_zero(fifo_bin[QTY] - qty)
+					consumed_bins.append([qty, fifo_bin[RATE]])
+					qty = 0
+		finally:
+			del queue[:head]
 
 		return consumed_bins
 
@@ -257,6 +283,15 @@ class LIFOValuation(BinWiseValuation):
 		return consumed_bins
 
 
+def dump_queue(state: list[StockBin]) -> str:
+	"""Serialize a FIFO/LIFO queue for `stock_queue`.
+
+	Still plain JSON (reports, bundles and tests parse it with json.loads), minus the
+	separator whitespace that is otherwise written for every bin of every SLE.
+	"""
+	return json.dumps(state, separators=(",", ":"))
+
+
 def round_off_if_near_zero(number: float, precision: int = 7) -> float:
 	"""Rounds off the number to zero only if number is close to zero for decimal
 	specified in precision. Precision defaults to 7.
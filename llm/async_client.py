@@ -0,0 +1,189 @@
+import json
+import time
+import asyncio
+
+import httpx
+
+from config import (GROQ_API_KEY, LLM_POOL_SIZE, LLM_TIMEOUT, OLLAMA_URL, OPENAI_API_KEY,
+                    SYSTEM_PROMPT)
+from llm.router import get_router
+from rag.tokens import estimate_tokens
+
+
+class LLMError(Exception):
+    pass
+
+
+class ProviderFailed(Exception):
+    """A provider failed before producing any token; the next attempt may take over."""
+
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
+
+async def _ollama_tokens(response, usage):
+    """Ollama /api/chat streams one JSON object per line; the last one carries the counts."""
+    async for line in response.aiter_lines():
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        if "error" in data:
+            raise LLMError(f"Ollama error: {data['error']}")
+
+        content = data.get("message", {}).get("content") or data.get("response")
+        if content:
+            yield content
+        if data.get("done"):
+            usage["prompt_tokens"] = data.get("prompt_eval_count", 0)
+            usage["completion_tokens"] = data.get("eval_count", 0)
+            return
+
+
+async def _sse_tokens(response, usage):
+    """OpenAI-compatible chat completions stream `data: {...}` events."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+
+        data = json.loads(payload)
+        # OpenAI sends usage in a final event; Groq puts it under x_groq
+        counts = data.get("usage") or (data.get("x_groq") or {}).get("usage")
+        if counts:
+            usage["prompt_tokens"] = counts.get("prompt_tokens", 0)
+            usage["completion_tokens"] = counts.get("completion_tokens", 0)
+
+        for choice in data.get("choices", []):
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+
+class AsyncLLMClient:
+    """
+    Streaming chat client over one pooled httpx.AsyncClient, so concurrent
+    chats reuse keep-alive connections instead of opening one per request.
+
+    Providers, their rate limits, concurrency caps, retries and statistics
+    come from the Router (llm/router.py), shared with safe_generate. A
+    provider that fails before its first token is retried and then failed
+    over like in Router.generate; once tokens have been sent, a failure
+    ends the answer with LLMError.
+
+    Leaving a stream early (or cancelling the task consuming it) closes the
+    upstream response, which stops generation on the provider side.
+    """
+
+    def __init__(self, router=None, timeout=LLM_TIMEOUT, pool_size=LLM_POOL_SIZE, transport=None):
+        self.router = router or get_router()
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
+
+    @property
+    def model(self):
+        """Model expected to answer (the primary provider's), used to look up cached answers."""
+        return self.router.model
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _request(self, provider, prompt):
+        """(url, headers, body, token parser) for a streaming chat call."""
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        model = provider.module.MODEL
+
+        if provider.name == "ollama":
+            body = {"model": model, "messages": messages, "stream": True}
+            return f"{OLLAMA_URL}/api/chat", {}, body, _ollama_tokens
+
+        if provider.name == "openai":
+            url, key = "https://api.openai.com/v1/chat/completions", OPENAI_API_KEY
+        else:
+            url, key = "https://api.groq.com/openai/v1/chat/completions", GROQ_API_KEY
+
+        if not key:
+            raise ProviderFailed(f"{provider.name.upper()}_API_KEY is not set", retry=False)
+
+        body = {"model": model, "messages": messages, "stream": True, "temperature": 0.2}
+        if provider.name == "openai":
+            body["stream_options"] = {"include_usage": True}
+        return url, {"Authorization": f"Bearer {key}"}, body, _sse_tokens
+
+    async def _tokens(self, provider, prompt, usage):
+        if provider.name == "stub":
+            async for token in provider.module.astream(prompt):
+                yield token
+            return
+
+        url, headers, body, parse = self._request(provider, prompt)
+        async with self._client.stream("POST", url, headers=headers, json=body) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+            async for token in parse(response, usage):
+                yield token
+
+    async def _stream_from(self, provider, prompt):
+        """Tokens from one provider; raises ProviderFailed if it fails before the first one."""
+        usage, produced = {}, 0
+
+        async with provider.slot():
+            started = time.perf_counter()
+            try:
+                async for token in self._tokens(provider, prompt, usage):
+                    produced += 1
+                    yield token
+            except (LLMError, httpx.HTTPError, ProviderFailed) as e:
+                provider.record_failure()
+                retry = getattr(e, "retry", True)
+                if produced:
+                    raise LLMError(f"{provider.name} failed mid-answer: {e}") from e
+                raise ProviderFailed(str(e), retry) from e
+
+        provider.record(time.perf_counter() - started, {
+            "prompt_tokens": usage.get("prompt_tokens") or estimate_tokens(prompt),
+            "completion_tokens": usage.get("completion_tokens") or produced,
+        })
+
+    async def stream(self, prompt, answered_by=None):
+        """
+        Yields answer tokens as the provider produces them. If given, the
+        dict answered_by gets the "model" that produced them.
+        """
+        errors = []
+
+        for provider in self.router.providers:
+            for attempt in range(self.router.retries + 1):
+                try:
+                    async for token in self._stream_from(provider, prompt):
+                        if answered_by is not None:
+                            answered_by["model"] = provider.model
+                        yield token
+                    return
+                except ProviderFailed as e:
+                    errors.append(f"{provider.name}: {e}")
+                    if not e.retry:
+                        break
+                    if attempt < self.router.retries:
+                        await asyncio.sleep(self.router.delay(attempt))
+
+        raise LLMError("All LLM providers failed: " + "; ".join(errors))
+
+    async def generate(self, prompt, answered_by=None):
+        return "".join([token async for token in self.stream(prompt, answered_by)])
@@ -1,16 +1,42 @@
 import requests
-from config import GROQ_API_KEY
+from config import GROQ_API_KEY, GROQ_MODEL, LLM_TIMEOUT, SYSTEM_PROMPT
 
-def generate(prompt):
-    response = requests.post(
+MODEL = GROQ_MODEL
+
+# Keep-alive connection pool shared by every chat call in the process
+_session = requests.Session()
+
+
+def complete(prompt):
+    """Returns (text, usage) where usage has prompt/completion token counts."""
+    if not GROQ_API_KEY:
+        from llm.router import ProviderUnavailable
+        raise ProviderUnavailable("GROQ_API_KEY is not set")
+
+    response = _session.post(
         "https://api.groq.com/openai/v1/chat/completions",
         headers={
             "Authorization": f"Bearer {GROQ_API_KEY}",
             "Content-Type": "application/json"
         },
         json={
-            "model": "llama-3.3-70b-versatile",
-            "messages": [{"role": "user", "content": prompt}]
-        }
+            "model": MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+        },
+        timeout=LLM_TIMEOUT
     )
-    return response.json()["choices"][0]["message"]["content"]
+    response.raise_for_status()
+
+    data = response.json()
+    usage = data.get("usage", {})
+    return data["choices"][0]["message"]["content"], {
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+    }
+
+
+def generate(prompt):
+    return complete(prompt)[0]
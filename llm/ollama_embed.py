@@ -1,12 +1,19 @@
 import requests
-from config import OLLAMA_URL, EMBED_MODEL
+from config import OLLAMA_URL, EMBED_TIMEOUT, EMBED_MODEL
+
+# Keep-alive connection pool shared by every embedding call in the process
+_session = requests.Session()
 
 def embed(text: str):
-    response = requests.post(
-        f"{OLLAMA_URL}/api/embeddings",
+    # Same endpoint as rag.embedder's batch pipeline, so query and index
+    # vectors (and their cache entries) are produced identically
+    response = _session.post(
+        f"{OLLAMA_URL}/api/embed",
         json={
             "model": EMBED_MODEL,
-            "prompt": text
-        }
+            "input": text
+        },
+        timeout=EMBED_TIMEOUT
     )
-    return response.json()["embedding"]
+    response.raise_for_status()
+    return response.json()["embeddings"][0]
@@ -1,23 +1,43 @@
 import requests
-from config import OLLAMA_URL, LLM_MODEL
+from config import OLLAMA_URL, LLM_TIMEOUT, LLM_MODEL, SYSTEM_PROMPT
 
-def generate(prompt: str) -> str:
-    response = requests.post(
+MODEL = LLM_MODEL
+
+# Keep-alive connection pool shared by every chat call in the process
+_session = requests.Session()
+
+
+def complete(prompt: str):
+    """Returns (text, usage) where usage has prompt/completion token counts."""
+    response = _session.post(
         f"{OLLAMA_URL}/api/chat",
         json={
-            "model": LLM_MODEL,
-            "messages": [{"role": "user", "content": prompt}],
+            "model": MODEL,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
             "stream": False
-        }
+        },
+        timeout=LLM_TIMEOUT
     )
+    response.raise_for_status()
 
     data = response.json()
+    usage = {
+        "prompt_tokens": data.get("prompt_eval_count", 0),
+        "completion_tokens": data.get("eval_count", 0),
+    }
 
     # Debug-friendly + safe handling
     if "message" in data and "content" in data["message"]:
-        return data["message"]["content"]
+        return data["message"]["content"], usage
 
     if "response" in data:  # fallback (older formats)
-        return data["response"]
+        return data["response"], usage
 
     raise RuntimeError(f"Ollama returned unexpected response: {data}")
+
+
+def generate(prompt: str) -> str:
+    return complete(prompt)[0]
@@ -1,18 +1,41 @@
 from openai import OpenAI
-from config import OPENAI_API_KEY, OPENAI_MODEL
+from config import OPENAI_API_KEY, OPENAI_MODEL, LLM_TIMEOUT, SYSTEM_PROMPT
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is not set")
+MODEL = OPENAI_MODEL
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+_client = None
 
-def generate(prompt: str) -> str:
-    response = client.chat.completions.create(
-        model=OPENAI_MODEL,
+
+def _get_client():
+    # Created on first call, so importing this module never needs the key
+    global _client
+
+    if _client is None:
+        from llm.router import ProviderUnavailable
+
+        if not OPENAI_API_KEY:
+            raise ProviderUnavailable("OPENAI_API_KEY is not set")
+        # Retries are the router's job; the SDK client keeps its own connection pool
+        _client = OpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT, max_retries=0)
+    return _client
+
+
+def complete(prompt: str):
+    """Returns (text, usage) where usage has prompt/completion token counts."""
+    response = _get_client().chat.completions.create(
+        model=MODEL,
         messages=[
-            {"role": "system", "content": "You are an expert ERPNext codebase assistant."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
         temperature=0.2
     )
-    return response.choices[0].message.content
+    usage = {
+        "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
+        "completion_tokens": response.usage.completion_tokens if response.usage else 0,
+    }
+    return response.choices[0].message.content, usage
+
+
+def generate(prompt: str) -> str:
+    return complete(prompt)[0]
@@ -0,0 +1,222 @@
+"""
+Routes LLM calls across providers.
+
+Providers are tried in LLM_ROUTE order. Each one is imported on first
+use, runs behind its own rate limit and concurrency cap, and is retried
+with jittered exponential backoff before the router fails over to the
+next provider. A provider that is not configured (no API key) is skipped
+immediately. Every call records latency and token counts per provider.
+
+The async API client (llm/async_client.py) streams through the same
+Provider objects, so both paths share the limits and the statistics.
+"""
+
+import time
+import random
+import asyncio
+import importlib
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+from config import LLM_LIMITS, LLM_RETRIES, LLM_ROUTE
+
+PROVIDER_MODULES = {
+    "openai": "llm.openai_llm",
+    "groq": "llm.groq_llm",
+    "ollama": "llm.ollama_llm",
+    "stub": "llm.stub_llm",
+}
+
+# Latency samples kept per provider for percentiles
+LATENCY_SAMPLES = 1000
+
+# Seconds between polls for a free concurrency slot on the async path
+SLOT_POLL_INTERVAL = 0.01
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised by a provider that cannot be used at all, e.g. a missing API key."""
+
+
+class LLMRouterError(RuntimeError):
+    pass
+
+
+class RateLimiter:
+    """Token bucket: `rate` calls per second with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token and returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class Provider:
+    """One provider's module (loaded lazily), limits and call statistics."""
+
+    def __init__(self, name, rate, concurrency):
+        if name not in PROVIDER_MODULES:
+            raise ValueError(f"Unknown LLM provider: {name}")
+
+        self.name = name
+        self.limiter = RateLimiter(rate)
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self._module = None
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    @property
+    def module(self):
+        if self._module is None:
+            self._module = importlib.import_module(PROVIDER_MODULES[self.name])
+        return self._module
+
+    @property
+    def model(self):
+        return f"{self.name}:{self.module.MODEL}"
+
+    def complete(self, prompt):
+        self.limiter.acquire()
+        with self.slots:
+            started = time.perf_counter()
+            try:
+                text, usage = self.module.complete(prompt)
+            except Exception:
+                self.record_failure()
+                raise
+            elapsed = time.perf_counter() - started
+
+        self.record(elapsed, usage)
+        return text
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Async counterpart of the rate limit and concurrency cap in complete().
+        The semaphore is shared with sync calls, so it is polled instead of
+        blocking the event loop.
+        """
+        await self.limiter.acquire_async()
+        while not self.slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+    def record(self, elapsed, usage):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+            self.latencies.append(elapsed)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    @property
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "p50_s": percentile(0.50),
+            "p95_s": percentile(0.95),
+        }
+
+
+class Router:
+
+    def __init__(self, route=LLM_ROUTE, limits=LLM_LIMITS, retries=LLM_RETRIES, backoff=0.5):
+        if not route:
+            raise ValueError("LLM route is empty")
+
+        self.providers = [Provider(name, *limits.get(name, (10, 4))) for name in route]
+        self.retries = retries
+        self.backoff = backoff
+
+    def delay(self, attempt):
+        """Jittered exponential backoff before retry number attempt + 1."""
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    @property
+    def model(self):
+        """Model expected to answer (the primary provider's), used to look up cached answers."""
+        return self.providers[0].model
+
+    def generate(self, prompt, answered_by=None):
+        """
+        Text from the first provider that answers. If given, the dict
+        answered_by gets the "model" that produced it.
+        """
+        errors = []
+
+        for provider in self.providers:
+            for attempt in range(self.retries + 1):
+                try:
+                    text = provider.complete(prompt)
+                    if answered_by is not None:
+                        answered_by["model"] = provider.model
+                    return text
+                except ProviderUnavailable as e:
+                    errors.append(f"{provider.name}: {e}")
+                    break
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+                    if attempt < self.retries:
+                        time.sleep(self.delay(attempt))
+
+        raise LLMRouterError("All LLM providers failed: " + "; ".join(errors))
+
+    @property
+    def stats(self):
+        return {provider.name: provider.stats for provider in self.providers}
+
+
+_default_router = None
+_default_lock = threading.Lock()
+
+
+def get_router():
+    global _default_router
+
+    if _default_router is None:
+        with _default_lock:
+            if _default_router is None:
+                _default_router = Router()
+    return _default_router
@@ -1,4 +1,5 @@
-from llm.openai_llm import generate as ollama_generate
+from llm.router import get_router
 
-def safe_generate(prompt: str) -> str:
-    return ollama_generate(prompt)
+def safe_generate(prompt: str, answered_by=None) -> str:
+    # First healthy provider in LLM_ROUTE answers; the rest are fallbacks
+    return get_router().generate(prompt, answered_by)
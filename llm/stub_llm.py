@@ -0,0 +1,43 @@
+"""
+Offline stand-in for an LLM provider, for load-testing the pipeline.
+
+Answers are deterministic (derived from the prompt's question) and each
+call sleeps STUB_LLM_LATENCY seconds plus STUB_LLM_TOKEN_LATENCY per
+generated token, so throughput and concurrency behaviour can be measured
+without a model or network.
+"""
+
+import time
+import asyncio
+import hashlib
+
+from config import STUB_LLM_LATENCY, STUB_LLM_TOKEN_LATENCY
+from rag.tokens import estimate_tokens
+
+MODEL = "stub"
+
+
+def _tokens(prompt):
+    question = prompt.strip().rsplit("## Question", 1)[-1].strip() or prompt.strip()
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    words = f"Stub answer {digest} for: {question[:200]}".split(" ")
+    return [w + " " for w in words[:-1]] + words[-1:]
+
+
+def complete(prompt):
+    tokens = _tokens(prompt)
+    time.sleep(STUB_LLM_LATENCY + STUB_LLM_TOKEN_LATENCY * len(tokens))
+    text = "".join(tokens)
+    return text, {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": len(tokens)}
+
+
+def generate(prompt):
+    return complete(prompt)[0]
+
+
+async def astream(prompt):
+    """Async token stream with the same pacing, for the async API server."""
+    await asyncio.sleep(STUB_LLM_LATENCY)
+    for token in _tokens(prompt):
+        await asyncio.sleep(STUB_LLM_TOKEN_LATENCY)
+        yield token
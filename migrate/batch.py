@@ -0,0 +1,262 @@
+"""
+Batch Python → Go migration of whole packages.
+
+Every .py file under a directory (or an ERPNext module such as
+`accounts`) is migrated with GoMigrationEngine on a bounded thread pool;
+the LLM router's per-provider limits still cap calls in flight. Output
+mirrors the package layout under MIGRATE_OUTPUT_DIR:
+
+    erpnext/erpnext/accounts/doctype/gl_entry/gl_entry.py
+    -> migrations/accounts/doctype/gl_entry/gl_entry.go
+
+A manifest next to the output records, per source file, its content
+hash, the PROMPT_VERSION it was migrated with and the outcome, and is
+checkpointed after every file. Re-running resumes: files whose hash and
+prompt version are unchanged (and whose output still exists) are
+skipped, failed ones are retried.
+
+With a sandbox (--verify), each file is also compiled in
+migrate/go_sandbox.py and compiler errors are fed back to the engine's
+fix_with_error; a file that still does not build counts as failed.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import GO_FIX_ROUNDS, MIGRATE_OUTPUT_DIR, MIGRATE_WORKERS
+from migrate.go_migrator import PROMPT_VERSION, GoMigrationEngine
+
+SOURCE_ROOT = "erpnext/erpnext"
+MANIFEST_NAME = "manifest.json"
+REPORT_NAME = "report.json"
+
+
+def source_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def resolve_target(target: str) -> Path:
+    """A file or directory path, or the name of an ERPNext module."""
+    path = Path(target)
+    if path.exists():
+        return path
+
+    module = Path(SOURCE_ROOT) / target
+    if module.is_dir():
+        return module
+    raise FileNotFoundError(f"No such file, directory or module: {target}")
+
+
+def collect_files(target: Path) -> list:
+    """Python files with code in them; empty `__init__.py` files have nothing to migrate."""
+    if target.is_file():
+        return [target]
+
+    files = []
+    for path in sorted(target.rglob("*.py")):
+        if "__pycache__" in path.parts or not path.read_text(encoding="utf-8").strip():
+            continue
+        files.append(path)
+    return files
+
+
+def output_path(source: Path, base: Path, out_dir: Path) -> Path:
+    return out_dir / source.relative_to(base).with_suffix(".go")
+
+
+def _write_atomic(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ============================
+# Manifest
+# ============================
+
+class Manifest:
+    """Per-file migration state, keyed by source path relative to the package base."""
+
+    def __init__(self, path: Path, prompt_version=None):
+        self.path = path
+        self.prompt_version = PROMPT_VERSION if prompt_version is None else prompt_version
+        self.entries = {}
+        if path.exists():
+            self.entries = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+
+    def is_current(self, key: str, digest: str, out_path: Path) -> bool:
+        entry = self.entries.get(key)
+        return bool(
+            entry
+            and entry["status"] == "ok"
+            and entry["source_hash"] == digest
+            and entry["prompt_version"] == self.prompt_version
+            and out_path.exists()
+        )
+
+    def record(self, key: str, entry: dict):
+        self.entries[key] = entry
+        self.save()
+
+    def save(self):
+        data = {"prompt_version": self.prompt_version, "files": self.entries}
+        _write_atomic(self.path, json.dumps(data, indent=2, sort_keys=True))
+
+
+# ============================
+# Batch run
+# ============================
+
+class BatchMigrator:
+
+    def __init__(self, engine=None, workers: int = MIGRATE_WORKERS, out_dir: str = MIGRATE_OUTPUT_DIR,
+                 sandbox=None, fix_rounds: int = GO_FIX_ROUNDS):
+        self.engine = engine or GoMigrationEngine()
+        self.workers = workers
+        # With a GoSandbox, every file is compiled and fixed before it is written
+        self.sandbox = sandbox
+        self.fix_rounds = fix_rounds
+        self.out_dir = Path(out_dir)
+        # Unit-level migration (migrate/units.py) has its own prompt version
+        self.prompt_version = getattr(self.engine, "prompt_version", PROMPT_VERSION)
+        self.manifest = Manifest(self.out_dir / MANIFEST_NAME, self.prompt_version)
+
+    def _migrate(self, source: Path, out_path: Path) -> dict:
+        started = time.perf_counter()
+        go_code = self.engine.migrate_file(str(source))
+
+        rounds = 0
+        if self.sandbox:
+            fixed = self.sandbox.compile_and_fix(go_code, self.engine.fix_with_error, self.fix_rounds)
+            go_code, rounds = fixed.code, fixed.rounds
+            if not fixed.result.ok:
+                # Keep the last attempt for inspection; the manifest marks it failed
+                _write_atomic(out_path, go_code)
+                first_error = fixed.result.errors.splitlines()[:3]
+                raise ValueError(f"go {fixed.result.stage} failed after {rounds} fix round(s): "
+                                 + " | ".join(first_error))
+
+        _write_atomic(out_path, go_code)
+        return {"seconds": time.perf_counter() - started, "fix_rounds": rounds}
+
+    def run(self, target: str, force: bool = False) -> dict:
+        target = resolve_target(target)
+        # Keep the package's own directory name in the output tree
+        base = target.parent
+        files = collect_files(target)
+
+        jobs, skipped = [], 0
+        for source in files:
+            key = source.relative_to(base).as_posix()
+            digest = source_hash(source)
+            out_path = output_path(source, base, self.out_dir)
+            if not force and self.manifest.is_current(key, digest, out_path):
+                skipped += 1
+                continue
+            jobs.append((source, key, digest, out_path))
+
+        print(f"Migrating {len(jobs)} of {len(files)} files from {target} "
+              f"({skipped} unchanged, {self.workers} workers)")
+
+        timings, failures = [], []
+        started = time.perf_counter()
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {pool.submit(self._migrate, source, out_path): (key, digest, out_path)
+                       for source, key, digest, out_path in jobs}
+
+            for done, future in enumerate(as_completed(futures), 1):
+                key, digest, out_path = futures[future]
+                entry = {"source_hash": digest, "prompt_version": self.prompt_version,
+                         "output": out_path.as_posix(), "finished_at": time.time()}
+                try:
+                    outcome = future.result()
+                    seconds = outcome["seconds"]
+                    entry.update(status="ok", seconds=round(seconds, 3), verified=bool(self.sandbox),
+                                 fix_rounds=outcome["fix_rounds"])
+                    print(f"✅ [{done}/{len(jobs)}] {key} ({seconds:.1f}s)")
+                except Exception as e:
+                    entry.update(status="failed", error=str(e))
+                    failures.append({"file": key, "error": str(e)})
+                    print(f"❌ [{done}/{len(jobs)}] {key}: {e}")
+
+                # Checkpoint after every file so an interrupted run resumes here
+                self.manifest.record(key, entry)
+                timings.append({"file": key, "status": entry["status"],
+                                "seconds": entry.get("seconds")})
+        finally:
+            # Ctrl-C: drop queued files, let in-flight calls finish
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        elapsed = time.perf_counter() - started
+        migrated = len(jobs) - len(failures)
+        report = {
+            "target": target.as_posix(),
+            "prompt_version": self.prompt_version,
+            "workers": self.workers,
+            "files": len(files),
+            "migrated": migrated,
+            "skipped": skipped,
+            "failed": len(failures),
+            "seconds": round(elapsed, 3),
+            "files_per_minute": round(migrated / elapsed * 60, 2) if elapsed else 0.0,
+            "verified": bool(self.sandbox),
+            "timings": sorted(timings, key=lambda t: -(t["seconds"] or 0)),
+            "failures": failures,
+        }
+        _write_atomic(self.out_dir / REPORT_NAME, json.dumps(report, indent=2))
+        return report
+
+
+def print_report(report: dict):
+    print(f"\n{report['target']}: {report['migrated']} migrated, {report['skipped']} unchanged, "
+          f"{report['failed']} failed in {report['seconds']:.1f}s "
+          f"({report['files_per_minute']:.1f} files/min, {report['workers']} workers)")
+
+    slowest = [t for t in report["timings"] if t["seconds"] is not None][:5]
+    if slowest:
+        print("Slowest files:")
+        for t in slowest:
+            print(f"  {t['seconds']:7.1f}s  {t['file']}")
+
+    if report["failures"]:
+        print("Failures:")
+        for f in report["failures"]:
+            print(f"  {f['file']}: {f['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch Python → Go migration of a package")
+    parser.add_argument("target", help="Directory, file or ERPNext module name (e.g. accounts)")
+    parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS)
+    parser.add_argument("--out", default=MIGRATE_OUTPUT_DIR, help="Output root for .go files and the manifest")
+    parser.add_argument("--force", action="store_true", help="Re-migrate files even if unchanged")
+    parser.add_argument("--units", action="store_true", help="Migrate function by function (migrate/units.py)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Compile each file with go build/vet and fix compiler errors (migrate/go_sandbox.py)")
+    args = parser.parse_args()
+
+    engine = None
+    if args.units:
+        from migrate.units import UnitCache, UnitMigrator
+        engine = UnitMigrator(cache=UnitCache(Path(args.out) / ".units"))
+
+    sandbox = None
+    if args.verify:
+        from migrate.go_sandbox import get_sandbox
+        sandbox = get_sandbox()
+
+    report = BatchMigrator(engine, workers=args.workers, out_dir=args.out, sandbox=sandbox).run(
+        args.target, args.force)
+    print_report(report)
+    sys.exit(1 if report["failed"] else 0)
@@ -1,15 +1,45 @@
 import sys
+import argparse
+from pathlib import Path
+
+from config import MIGRATE_OUTPUT_DIR, MIGRATE_WORKERS
+from migrate.batch import BatchMigrator, print_report
 from migrate.go_migrator import GoMigrationEngine
+from migrate.go_sandbox import get_sandbox
+from migrate.units import UnitCache, UnitMigrator
 
-if len(sys.argv) < 2:
-    print("Usage: python -m migrate.cli <python_file>")
-    sys.exit(1)
+parser = argparse.ArgumentParser(
+    prog="python -m migrate.cli",
+    description="Migrate one Python file (printed) or a whole package / ERPNext module (batch)",
+)
+parser.add_argument("target", help="Python file, directory or module name (e.g. accounts)")
+parser.add_argument("--workers", type=int, default=MIGRATE_WORKERS)
+parser.add_argument("--out", default=MIGRATE_OUTPUT_DIR)
+parser.add_argument("--force", action="store_true", help="Re-migrate unchanged files")
+parser.add_argument("--units", action="store_true",
+                    help="Migrate function by function in call-graph order (migrate/units.py)")
+parser.add_argument("--verify", action="store_true",
+                    help="Compile with go build/vet and fix compiler errors (migrate/go_sandbox.py)")
+args = parser.parse_args()
 
 engine = GoMigrationEngine()
-go_code, test_code = engine.migrate_full_file(sys.argv[1])
+if args.units:
+    engine = UnitMigrator(cache=UnitCache(Path(args.out) / ".units"))
+
+sandbox = get_sandbox() if args.verify else None
 
-print("=== GENERATED GO CODE ===")
-print(go_code)
+if Path(args.target).is_file():
+    go_code = engine.migrate_file(args.target)
 
-print("\n=== GENERATED TEST CODE ===")
-print(test_code)
+    print("=== GENERATED GO CODE ===")
+    if sandbox:
+        fixed = sandbox.compile_and_fix(go_code, engine.fix_with_error)
+        go_code = fixed.code
+        status = "passed" if fixed.result.ok else f"failed ({fixed.result.stage})"
+        print(f"// go build + vet {status} after {fixed.rounds} fix round(s)")
+    print(go_code)
+else:
+    report = BatchMigrator(engine, workers=args.workers, out_dir=args.out, sandbox=sandbox).run(
+        args.target, args.force)
+    print_report(report)
+    sys.exit(1 if report["failed"] else 0)
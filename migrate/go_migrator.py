@@ -3,7 +3,13 @@ import re
 from pathlib import Path
 from typing import Tuple
 
+from config import GO_FIX_ROUNDS
 from llm.safe_generate import safe_generate
+from migrate.go_sandbox import get_sandbox
+
+# Bump whenever build_prompt (or the cleaning it relies on) changes: batch
+# runs re-migrate every file migrated under an older version
+PROMPT_VERSION = 1
 
 
 class GoMigrationEngine:
@@ -80,6 +86,15 @@ Python code:
         return go_path
 
 
+    def migrate_and_verify(self, python_file: str, sandbox=None, rounds: int = GO_FIX_ROUNDS):
+        """
+        Migrates a file, then compiles it in the Go sandbox and feeds compiler
+        errors back through fix_with_error for up to `rounds` rounds.
+        Returns a FixResult(code, build result, rounds used).
+        """
+        go_code = self.migrate_file(python_file)
+        return (sandbox or get_sandbox()).compile_and_fix(go_code, self.fix_with_error, rounds)
+
     def migrate_and_save(self, python_file: str) -> Path:
         go_code = self.migrate_file(python_file)
         return self.save_go_file(python_file, go_code)
@@ -133,22 +148,18 @@ Python code:
                 f"Brace mismatch: {{={open_braces}, }}={close_braces}"
             )
 
-        # Very common LLM failure
-        if "..." in code:
-            raise ValueError("Variadic syntax (...) detected — invalid for migration")
-
         # Catch incomplete outputs
         if len(code.splitlines()) < 5:
             raise ValueError("Go code too short — likely truncated")
 
     # ============================
-    # Optional: Future Extension
+    # Compile-and-fix
     # ============================
 
     def fix_with_error(self, broken_code: str, compiler_error: str) -> str:
         """
-        (Optional future step)
         Given compiler errors, ask the LLM to fix the Go code.
+        Called by migrate/go_sandbox.py's compile-and-fix loop.
         """
         prompt = f"""
 Fix the following Go code using the compiler error.
@@ -0,0 +1,283 @@
+"""
+Go toolchain sandbox for verifying migrated code.
+
+Every check runs in its own temporary module directory (main.go +
+go.mod), so concurrent jobs never share a source file; all of them share
+one GOCACHE, so the standard library and repeated code compile once.
+Results are cached by a hash of the code and the Go version: the same
+code is never built twice, and a successful build keeps its binary for
+differential runs.
+
+check()           go build, then go vet
+compile_and_fix() feeds compiler errors to a fixer (normally
+                  GoMigrationEngine.fix_with_error) for up to GO_FIX_ROUNDS
+differential()    runs Python and Go side by side on a thread pool sized
+                  to the machine and compares their stdout
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (GO_BINARY, GO_BUILD_TIMEOUT, GO_CACHE_DIR, GO_FIX_ROUNDS, GO_RUN_TIMEOUT,
+                    GO_VERIFY_WORKERS, MIGRATE_OUTPUT_DIR)
+
+BUILD_CACHE_DIR = os.path.join(MIGRATE_OUTPUT_DIR, ".gobuild")
+
+_PACKAGE = re.compile(r"^package\s+\w+", re.MULTILINE)
+_MAIN_FUNC = re.compile(r"^func\s+main\s*\(\s*\)", re.MULTILINE)
+
+BuildResult = namedtuple("BuildResult", "ok stage errors binary cached")
+FixResult = namedtuple("FixResult", "code result rounds")
+DiffResult = namedtuple("DiffResult", "match python_output go_output error")
+
+
+class GoToolchainError(RuntimeError):
+    pass
+
+
+def library_package(code):
+    """
+    Migrated ERPNext files are rarely programs; without a main() they are
+    built as a library package so `go build` type-checks them.
+    """
+    if _MAIN_FUNC.search(code):
+        return code
+    if _PACKAGE.search(code):
+        return _PACKAGE.sub("package migrated", code, count=1)
+    return "package migrated\n\n" + code
+
+
+class GoSandbox:
+
+    def __init__(self, go=GO_BINARY, cache_dir=BUILD_CACHE_DIR, gocache=GO_CACHE_DIR,
+                 workers=GO_VERIFY_WORKERS, build_timeout=GO_BUILD_TIMEOUT, run_timeout=GO_RUN_TIMEOUT):
+        self.go = shutil.which(go) or go
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.build_timeout = build_timeout
+        self.run_timeout = run_timeout
+
+        self.env = {**os.environ, "GO111MODULE": "on", "GOFLAGS": "-mod=mod",
+                    "GOPROXY": "off", "GOTOOLCHAIN": "local"}
+        if gocache:
+            self.env["GOCACHE"] = os.path.abspath(gocache)
+
+        self._version = None
+        self._results = {}
+        self._lock = threading.Lock()
+
+        self.builds = 0
+        self.cache_hits = 0
+
+    # ============================
+    # Toolchain
+    # ============================
+
+    @property
+    def version(self):
+        """Go version, e.g. go1.21.6; part of every cache key."""
+        if self._version is None:
+            try:
+                out = subprocess.run([self.go, "env", "GOVERSION"], capture_output=True, text=True,
+                                     env=self.env, timeout=30)
+            except OSError as e:
+                raise GoToolchainError(f"Go toolchain not found ({self.go}): {e}")
+            if out.returncode != 0:
+                raise GoToolchainError(out.stderr.strip() or "go env failed")
+            self._version = out.stdout.strip()
+        return self._version
+
+    def _go_mod(self):
+        major_minor = ".".join(self.version.removeprefix("go").split(".")[:2])
+        return f"module sandbox\n\ngo {major_minor}\n"
+
+    def _go(self, args, cwd):
+        return subprocess.run([self.go, *args], cwd=cwd, capture_output=True, text=True,
+                              env=self.env, timeout=self.build_timeout)
+
+    # ============================
+    # Build cache
+    # ============================
+
+    def key(self, code):
+        return hashlib.sha256(f"{self.version}\0{code}".encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".bin"
+
+    def _cached(self, key):
+        result = self._results.get(key)
+        if result:
+            return result
+
+        meta, binary = self._paths(key)
+        if not os.path.exists(meta):
+            return None
+        with open(meta, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["ok"] and data["binary"] and not os.path.exists(binary):
+            return None
+        return BuildResult(data["ok"], data["stage"], data["errors"], binary if data["binary"] else None, True)
+
+    def _store(self, key, result, built_binary):
+        meta, binary = self._paths(key)
+        os.makedirs(os.path.dirname(meta), exist_ok=True)
+
+        if built_binary:
+            shutil.copy2(built_binary, binary + ".tmp")
+            os.replace(binary + ".tmp", binary)
+        with open(meta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ok": result.ok, "stage": result.stage, "errors": result.errors,
+                       "binary": bool(built_binary)}, f)
+        os.replace(meta + ".tmp", meta)
+
+        result = result._replace(binary=binary if built_binary else None)
+        self._results[key] = result
+        return result
+
+    # ============================
+    # Checks
+    # ============================
+
+    def check(self, code):
+        """BuildResult for go build + go vet of one Go file, cached by code hash."""
+        code = library_package(code)
+        key = self.key(code)
+
+        with self._lock:
+            cached = self._cached(key)
+            if cached:
+                self.cache_hits += 1
+                return cached._replace(cached=True)
+
+        workdir = tempfile.mkdtemp(prefix="go-sandbox-")
+        try:
+            with open(os.path.join(workdir, "go.mod"), "w", encoding="utf-8") as f:
+                f.write(self._go_mod())
+            with open(os.path.join(workdir, "main.go"), "w", encoding="utf-8") as f:
+                f.write(code)
+
+            is_program = bool(_MAIN_FUNC.search(code))
+            out = os.path.join(workdir, "prog")
+            result = BuildResult(True, "ok", "", None, False)
+
+            build = self._go(["build", "-o", out, "."] if is_program else ["build", "."], workdir)
+            if build.returncode != 0:
+                result = BuildResult(False, "build", build.stderr.strip(), None, False)
+            else:
+                vet = self._go(["vet", "."], workdir)
+                if vet.returncode != 0:
+                    result = BuildResult(False, "vet", vet.stderr.strip(), None, False)
+
+            with self._lock:
+                self.builds += 1
+                return self._store(key, result, out if result.ok and is_program else None)
+        except subprocess.TimeoutExpired:
+            return BuildResult(False, "timeout", f"go build exceeded {self.build_timeout}s", None, False)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def compile_and_fix(self, code, fix, rounds=GO_FIX_ROUNDS):
+        """
+        Checks code and, while it fails, asks fix(code, errors) for a
+        corrected version, up to `rounds` times. Returns FixResult with the
+        last code, its BuildResult and the number of fix rounds used.
+        """
+        result = self.check(code)
+        used = 0
+        while not result.ok and used < rounds:
+            used += 1
+            try:
+                code = fix(code, result.errors)
+            except ValueError as e:
+                # The fix itself was rejected (e.g. truncated); try again from the same code
+                result = result._replace(errors=f"{result.errors}\n\nfix rejected: {e}")
+                continue
+            result = self.check(code)
+        return FixResult(code, result, used)
+
+    def run(self, binary, stdin=None):
+        done = subprocess.run([binary], input=stdin, capture_output=True, text=True, timeout=self.run_timeout)
+        return done.stdout
+
+    # ============================
+    # Differential testing
+    # ============================
+
+    def compare(self, py_code, go_code, stdin=None):
+        """Runs the Python and the Go program once each and compares their output."""
+        try:
+            py = subprocess.run([sys.executable, "-c", py_code], input=stdin, capture_output=True,
+                                text=True, timeout=self.run_timeout)
+        except subprocess.TimeoutExpired:
+            return DiffResult(False, None, None, "Python run timed out")
+        if py.returncode != 0:
+            return DiffResult(False, py.stdout, None, f"Python failed: {py.stderr.strip()}")
+
+        result = self.check(go_code)
+        if not result.ok:
+            return DiffResult(False, py.stdout, None, f"Go {result.stage} failed: {result.errors}")
+        if not result.binary:
+            return DiffResult(False, py.stdout, None, "Go code has no main()")
+
+        try:
+            go_output = self.run(result.binary, stdin)
+        except subprocess.TimeoutExpired:
+            return DiffResult(False, py.stdout, None, "Go run timed out")
+
+        return DiffResult(py.stdout.strip() == go_output.strip(), py.stdout, go_output, None)
+
+    def differential(self, cases):
+        """compare() for each (py_code, go_code[, stdin]) case, in parallel."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(lambda case: self.compare(*case), cases))
+
+    @property
+    def stats(self):
+        return {"builds": self.builds, "cache_hits": self.cache_hits}
+
+
+_default_sandbox = None
+_default_lock = threading.Lock()
+
+
+def get_sandbox():
+    global _default_sandbox
+
+    if _default_sandbox is None:
+        with _default_lock:
+            if _default_sandbox is None:
+                _default_sandbox = GoSandbox()
+    return _default_sandbox
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m migrate.go_sandbox <file.go> [<file.py>]")
+        sys.exit(1)
+
+    sandbox = GoSandbox()
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        go_code = f.read()
+
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            diff = sandbox.compare(f.read(), go_code)
+        print("✅ Outputs match" if diff.match else f"❌ {diff.error or 'Outputs differ'}")
+        sys.exit(0 if diff.match else 1)
+
+    result = sandbox.check(go_code)
+    print("✅ go build + vet passed" if result.ok else f"❌ go {result.stage} failed:\n{result.errors}")
+    sys.exit(0 if result.ok else 1)
@@ -0,0 +1,446 @@
+"""
+Function-level Python → Go migration.
+
+Instead of one prompt per file, a file is split into units with the
+analyzer's AST pass:
+
+* module   - module-level constants and statements (imports excluded);
+* function - each top-level function, nested defs included;
+* class    - the class header and class attributes, as a Go struct
+             (classes nested in a class are class units of their own);
+* method   - each method, as a Go method on that struct.
+
+Unit dependencies come from the file's call graph (Analyzer.callgraph),
+plus method -> class and everything -> module. Units are migrated in
+topological order on a thread pool: a unit starts once its dependencies
+are done, and its prompt carries only their signatures (the Go signature
+once a dependency has been migrated, its Python signature otherwise).
+Cycles (recursion, mutual calls) are broken at one edge.
+
+Migrated units are cached by content, so re-running a file after a
+failure only sends the failed units again. The Go output of every unit
+is reassembled in source order into one file with merged imports.
+
+UnitMigrator.migrate_file has the same interface as
+GoMigrationEngine.migrate_file, so it plugs into migrate/batch.py.
+"""
+
+import os
+import re
+import ast
+import sys
+import hashlib
+import textwrap
+from pathlib import Path
+from graphlib import CycleError, TopologicalSorter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Analyzer.analyzer import FUNCTION_NODES, analyze_source, module_name_for
+from Analyzer.callgraph import build_callgraph
+from config import MIGRATE_OUTPUT_DIR, MIGRATE_UNIT_RETRIES, MIGRATE_UNIT_WORKERS
+from llm.safe_generate import safe_generate
+from migrate.go_migrator import GoMigrationEngine
+
+# Bump whenever build_unit_prompt changes; cached units are then re-migrated
+UNIT_PROMPT_VERSION = 1
+
+UNIT_CACHE_DIR = os.path.join(MIGRATE_OUTPUT_DIR, ".units")
+
+_GO_IMPORT = re.compile(r'^import\s+((?:[\w.]+\s+)?"[^"]+")\s*$')
+_GO_IMPORT_LINE = re.compile(r'^\s*((?:[\w.]+\s+)?"[^"]+")')
+
+
+class UnitMigrationError(RuntimeError):
+    """Some units of a file failed; the others are cached for the next attempt."""
+
+    def __init__(self, file_path, failures):
+        self.failures = failures
+        names = ", ".join(sorted(failures))
+        super().__init__(f"{len(failures)} unit(s) failed in {file_path}: {names}")
+
+
+class Unit:
+
+    def __init__(self, name, kind, start, end, source, signature, owner=None):
+        self.name = name            # qualified name, e.g. erpnext.x.PaymentEntry.validate
+        self.kind = kind            # module | function | class | method
+        self.start = start
+        self.end = end
+        self.source = source
+        self.signature = signature  # Python signature, for dependants' prompts
+        self.owner = owner          # class unit name, for methods
+        self.deps = set()
+
+    @property
+    def short_name(self):
+        return self.name.rsplit(".", 1)[-1]
+
+    def __repr__(self):
+        return f"Unit({self.kind} {self.name})"
+
+
+# ============================
+# Splitting
+# ============================
+
+def _lines(lines, start, end):
+    return textwrap.dedent("\n".join(lines[start - 1:end]))
+
+
+def _start(node):
+    return min([node.lineno] + [d.lineno for d in node.decorator_list])
+
+
+def _function_signature(node, name=None):
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {name or node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _class_signature(node, name=None):
+    bases = ", ".join(ast.unparse(b) for b in node.bases)
+    name = name or node.name
+    return f"class {name}({bases})" if bases else f"class {name}"
+
+
+def _class_header(node, lines):
+    """Class statement, docstring and class-level statements, without the methods and nested classes."""
+    rows = lines[_start(node) - 1:node.body[0].lineno - 1]
+    for stmt in node.body:
+        if not isinstance(stmt, FUNCTION_NODES + (ast.ClassDef,)):
+            rows.extend(lines[stmt.lineno - 1:stmt.end_lineno])
+    return textwrap.dedent("\n".join(rows))
+
+
+def split_units(code, file_path):
+    """The file's units in source order, with dependencies between them."""
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    module = module_name_for(file_path)
+    units = []
+
+    def qualify(*parts):
+        return ".".join(p for p in (module, *parts) if p)
+
+    def add_class(node, path):
+        path = path + [node.name]
+        class_name = qualify(*path)
+        class_unit = Unit(class_name, "class", _start(node), node.end_lineno,
+                          _class_header(node, lines), _class_signature(node, ".".join(path)))
+        units.append(class_unit)
+        for stmt in node.body:
+            if isinstance(stmt, FUNCTION_NODES):
+                units.append(Unit(qualify(*path, stmt.name), "method", _start(stmt), stmt.end_lineno,
+                                  _lines(lines, _start(stmt), stmt.end_lineno),
+                                  _function_signature(stmt, ".".join(path + [stmt.name])), owner=class_name))
+            elif isinstance(stmt, ast.ClassDef):
+                add_class(stmt, path).deps.add(class_name)
+        return class_unit
+
+    prelude = []
+    for i, node in enumerate(tree.body):
+        if isinstance(node, FUNCTION_NODES):
+            units.append(Unit(qualify(node.name), "function", _start(node), node.end_lineno,
+                              _lines(lines, _start(node), node.end_lineno), _function_signature(node)))
+
+        elif isinstance(node, ast.ClassDef):
+            add_class(node, [])
+
+        elif not isinstance(node, (ast.Import, ast.ImportFrom)):
+            # The module docstring is documentation, not code
+            if i == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+                continue
+            prelude.append(node)
+
+    if prelude:
+        source = "\n".join(_lines(lines, n.lineno, n.end_lineno) for n in prelude)
+        units.insert(0, Unit(qualify("<module>"), "module", prelude[0].lineno, prelude[-1].end_lineno,
+                             source, "module-level constants and variables"))
+
+    _link(units, analyze_source(code, file_path))
+    return units
+
+
+def _owner(units_by_name, qualname):
+    """The unit a (possibly nested) definition belongs to: the longest name prefix."""
+    while qualname:
+        if qualname in units_by_name:
+            return units_by_name[qualname]
+        qualname = qualname.rpartition(".")[0]
+    return None
+
+
+def _link(units, analysis):
+    by_name = {unit.name: unit for unit in units}
+    module_unit = next((u for u in units if u.kind == "module"), None)
+
+    graph = build_callgraph(analysis["functions"], analysis["classes"], analysis["calls"])
+    for caller in graph:
+        source = _owner(by_name, caller)
+        if not source:
+            continue
+        for callee in graph.callees_of(caller):
+            target = _owner(by_name, callee)
+            if target and target is not source:
+                source.deps.add(target.name)
+
+    for unit in units:
+        if unit.owner:
+            unit.deps.add(unit.owner)
+        if module_unit and unit is not module_unit:
+            unit.deps.add(module_unit.name)
+
+
+def break_cycles(units):
+    """Dependency map with one edge of every cycle removed; returns (deps, broken edges)."""
+    deps = {unit.name: set(unit.deps) for unit in units}
+    broken = set()
+    while True:
+        try:
+            tuple(TopologicalSorter(deps).static_order())
+            return deps, broken
+        except CycleError as e:
+            cycle = e.args[1]
+            # cycle[0] is a dependency of cycle[1]
+            deps[cycle[1]].discard(cycle[0])
+            broken.add((cycle[1], cycle[0]))
+
+
+# ============================
+# Prompts & Go assembly
+# ============================
+
+_KIND_RULES = {
+    "module": "Declare the module-level constants and variables only",
+    "function": "Declare this function (and any helpers nested in it) only",
+    "class": "Declare the struct type for this class (fields from its attributes) only; "
+             "its methods are migrated separately",
+    "method": "Declare this method on *{owner} only; the struct type already exists",
+}
+
+
+def build_unit_prompt(unit, file_path, dependencies):
+    rule = _KIND_RULES[unit.kind].format(owner=unit.owner.rsplit(".", 1)[-1] if unit.owner else "")
+    deps = "\n".join(dependencies) or "(none)"
+    return f"""
+You are a senior Go engineer migrating ERPNext Python code to Go, one unit at a time.
+
+STRICT RULES:
+- Output ONLY Go code: an import block if needed, then the declarations
+- {rule}
+- No package clause, no main(), no markdown, no explanations
+- Do not redeclare the dependencies below; use them as declared
+- Preserve all logic and edge cases
+- Use idiomatic Go and explicit error handling
+- Never omit logic
+
+Python file:
+{file_path}
+
+Unit: {unit.name} ({unit.kind})
+
+Dependencies (signatures only):
+{deps}
+
+Python code:
+----------------
+{unit.source}
+----------------
+"""
+
+
+def go_signatures(code):
+    """Top-level func/type declarations of migrated Go code, without bodies."""
+    signatures = []
+    for line in code.splitlines():
+        if line.startswith(("func ", "type ")):
+            signatures.append(line.rstrip().rstrip("{").rstrip())
+    return signatures
+
+
+def split_go(code):
+    """(imports, declarations) of one unit's Go output; package clauses are dropped."""
+    imports, body = set(), []
+    in_block = False
+
+    for line in code.splitlines():
+        stripped = line.strip()
+        if in_block:
+            if stripped == ")":
+                in_block = False
+            elif _GO_IMPORT_LINE.match(line):
+                imports.add(_GO_IMPORT_LINE.match(line).group(1))
+            continue
+
+        if stripped.startswith("package "):
+            continue
+        if stripped in ("import (", "import("):
+            in_block = True
+            continue
+        match = _GO_IMPORT.match(stripped)
+        if match:
+            imports.add(match.group(1))
+            continue
+        body.append(line)
+
+    return imports, "\n".join(body).strip()
+
+
+def assemble_go(parts, package="main"):
+    """One Go file from (imports, declarations) pairs, imports merged."""
+    imports = sorted(set().union(*(i for i, _ in parts)) if parts else ())
+    out = [f"package {package}"]
+    if imports:
+        out.append("import (\n" + "\n".join(f"\t{i}" for i in imports) + "\n)")
+    out.extend(body for _, body in parts if body)
+    return "\n\n".join(out) + "\n"
+
+
+def _validate_unit(code):
+    if not code.strip():
+        raise ValueError("Empty Go output")
+    if code.count("{") != code.count("}"):
+        raise ValueError(f"Brace mismatch: {{={code.count('{')}, }}={code.count('}')}")
+
+
+# ============================
+# Unit cache
+# ============================
+
+def unit_key(unit, file_path):
+    parts = [str(UNIT_PROMPT_VERSION), file_path.replace("\\", "/"), unit.name, unit.kind, unit.source]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class UnitCache:
+    """Migrated Go code per unit key, one small file each."""
+
+    def __init__(self, directory=UNIT_CACHE_DIR):
+        self.directory = Path(directory)
+
+    def get(self, key):
+        path = self.directory / key[:2] / f"{key}.go"
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def put(self, key, code):
+        path = self.directory / key[:2] / f"{key}.go"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(code, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+# ============================
+# Migration
+# ============================
+
+class UnitMigrator:
+    """Drop-in for GoMigrationEngine that migrates a file unit by unit."""
+
+    prompt_version = f"units-{UNIT_PROMPT_VERSION}"
+
+    def __init__(self, generate=safe_generate, workers=MIGRATE_UNIT_WORKERS,
+                 retries=MIGRATE_UNIT_RETRIES, cache=None):
+        self.generate = generate
+        self.workers = workers
+        self.retries = retries
+        self.cache = cache if cache is not None else UnitCache()
+        self.engine = GoMigrationEngine()
+
+    def _dependencies(self, unit, by_name, migrated):
+        signatures = []
+        for name in sorted(unit.deps):
+            dep = by_name[name]
+            go = migrated.get(name)
+            if go and go_signatures(go):
+                signatures.extend(go_signatures(go))
+            elif dep.kind != "module":
+                signatures.append(f"// not yet migrated, Python: {dep.signature}")
+        return signatures
+
+    def _migrate_unit(self, prompt):
+        error = None
+        for _ in range(self.retries + 1):
+            code = self.engine._clean_go_code(self.generate(prompt))
+            try:
+                _validate_unit(code)
+                return code
+            except ValueError as e:
+                error = e
+        raise error
+
+    def migrate_units(self, code, file_path):
+        """{unit name: Go code} for every unit; raises UnitMigrationError after partial failure."""
+        units = split_units(code, file_path)
+        by_name = {unit.name: unit for unit in units}
+        deps, _ = break_cycles(units)
+
+        sorter = TopologicalSorter(deps)
+        sorter.prepare()
+
+        migrated, failures = {}, {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {}
+            while sorter.is_active():
+                for name in sorter.get_ready():
+                    unit = by_name[name]
+                    key = unit_key(unit, file_path)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        migrated[name] = cached
+                        sorter.done(name)
+                        continue
+                    prompt = build_unit_prompt(unit, file_path, self._dependencies(unit, by_name, migrated))
+                    futures[pool.submit(self._migrate_unit, prompt)] = (name, key)
+
+                if not futures:
+                    continue
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = futures.pop(future)
+                    try:
+                        migrated[name] = future.result()
+                        self.cache.put(key, migrated[name])
+                    except Exception as e:
+                        # Dependants still run, against the Python signature
+                        failures[name] = str(e)
+                    sorter.done(name)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        if failures:
+            raise UnitMigrationError(file_path, failures)
+        return [(unit, migrated[unit.name]) for unit in units]
+
+    def fix_with_error(self, broken_code, compiler_error):
+        """Compiler errors in the assembled file are fixed whole-file, as in GoMigrationEngine."""
+        return self.engine.fix_with_error(broken_code, compiler_error)
+
+    def migrate_file(self, python_file):
+        python_file = Path(python_file)
+        if not python_file.exists():
+            raise FileNotFoundError(f"File not found: {python_file}")
+
+        results = self.migrate_units(python_file.read_text(encoding="utf-8"), str(python_file))
+        go_code = assemble_go([split_go(code) for _, code in results])
+        _validate_unit(go_code)
+        return go_code
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m migrate.units <python_file>")
+        sys.exit(1)
+
+    units = split_units(Path(sys.argv[1]).read_text(encoding="utf-8"), sys.argv[1])
+    deps, broken = break_cycles(units)
+    order = list(TopologicalSorter(deps).static_order())
+    print(f"🔍 {len(units)} units, {sum(len(d) for d in deps.values())} dependencies, "
+          f"{len(broken)} cycle edges broken")
+    for name in order:
+        unit = next(u for u in units if u.name == name)
+        print(f"  {unit.kind:8} {unit.short_name:40} lines {unit.start}-{unit.end}  deps {len(deps[name])}")
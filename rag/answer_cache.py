@@ -0,0 +1,171 @@
+"""
+Answer cache in front of the LLM call in rag/rag_query.py.
+
+An exact hit needs the same (module, normalized question, retrieved chunk
+ids, model): the same question asked against the same context. With a
+similarity threshold set, a miss then falls back to the closest cached
+question for the same module and model whose embedding has cosine
+similarity above it, so rephrasings of a popular question skip the LLM
+too.
+
+The cache remembers the generation (file stamp) of each module's index;
+the first lookup after a rebuild drops that module's entries. Entries also expire after a TTL and are evicted LRU past
+max_entries.
+"""
+
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question):
+    """Case, punctuation and whitespace-insensitive form of a question."""
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def chunk_key(hit):
+    """Stable id of a retrieved chunk; legacy chunks without ids use their text."""
+    if hit.get("id") is not None:
+        return str(hit["id"])
+    return hashlib.sha256(hit["text"].encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerCache:
+    """In-process TTL/LRU cache of LLM answers with hit-rate counters."""
+
+    def __init__(self, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 similarity=ANSWER_CACHE_SIMILARITY, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.clock = clock
+
+        # key -> {"answer", "vector", "expires"}; module -> index generation
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(module, question, hits, model):
+        chunks = ",".join(chunk_key(hit) for hit in hits)
+        return (module, normalize_question(question), chunks, model)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+            "entries": len(self),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _check_generation(self, module, generation):
+        """Drops a module's entries once its index has been rebuilt."""
+        if self._generations.get(module) == generation:
+            return
+        if module in self._generations:
+            stale = [key for key in self._entries if key[0] == module]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        self._generations[module] = generation
+
+    def invalidate(self, module=None):
+        with self._lock:
+            stale = [key for key in self._entries if module is None or key[0] == module]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def _similar(self, module, model, vector, now):
+        best, best_score = None, self.similarity
+        for key, entry in self._entries.items():
+            if key[0] != module or key[3] != model or entry["vector"] is None or entry["expires"] < now:
+                continue
+            score = float(np.dot(entry["vector"], vector))
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def get(self, key, generation, vector=None):
+        """Cached answer for key (or a similar question when vector is given), else None."""
+        module, _, _, model = key
+        now = self.clock()
+
+        with self._lock:
+            self._check_generation(module, generation)
+
+            entry = self._entries.get(key)
+            if entry and entry["expires"] < now:
+                del self._entries[key]
+                entry = None
+
+            if entry:
+                self.exact_hits += 1
+            elif self.similarity and vector is not None:
+                similar = self._similar(module, model, _unit(vector), now)
+                if similar:
+                    key, entry = similar, self._entries[similar]
+                    self.similar_hits += 1
+
+            if not entry:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return entry["answer"]
+
+    def put(self, key, generation, answer, vector=None):
+        with self._lock:
+            self._check_generation(key[0], generation)
+            self._entries[key] = {
+                "answer": answer,
+                "vector": _unit(vector) if vector is not None else None,
+                "expires": self.clock() + self.ttl,
+            }
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_answer_cache():
+    global _default_cache
+
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = AnswerCache()
+    return _default_cache
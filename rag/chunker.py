@@ -1,38 +1,366 @@
+import ast
 import json
 import sys
 import os
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Analyzer.analyzer import module_name_for
+from Analyzer.store import open_table
+from rag.tokens import estimate_tokens
 
 OUTPUT_DIR = "output"
 DATA_DIR = "data"
 
-def build_chunks(module):
-    input_file = f"{OUTPUT_DIR}/{module}_functions.json"
+# Upper bound on estimated tokens per chunk; longer definitions are split
+# on statement boundaries
+CHUNK_TOKEN_BUDGET = 512
+
+# Chunk ids are FAISS ids: signed 64-bit, so keep 63 bits
+_ID_MASK = (1 << 63) - 1
+
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+def chunk_id(name, body):
+    """
+    Stable id derived from (qualified name, body hash): unchanged chunks
+    keep their id across analyzer runs, even when edits elsewhere in the
+    file shift their lines; edited ones get a new id.
+    """
+    content = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    key = "\0".join((name, content))
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") & _ID_MASK
+
+
+# ============================
+# Chunk files
+# ============================
+
+def chunk_path(module, data_dir=DATA_DIR):
+    """The module's chunk file: streamed JSONL, or a legacy JSON list."""
+    jsonl = f"{data_dir}/{module}_chunks.jsonl"
+    if os.path.exists(jsonl) or not os.path.exists(f"{data_dir}/{module}_chunks.json"):
+        return jsonl
+    return f"{data_dir}/{module}_chunks.json"
+
+
+def read_chunk_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def load_chunks(module, data_dir=DATA_DIR):
+    return read_chunk_file(chunk_path(module, data_dir))
+
+
+def diff_chunks(old_chunks, new_chunks):
+    """
+    Compares two chunk snapshots by id.
+    Returns (added chunks, removed ids, number unchanged).
+    """
+    old_ids = {c["id"] for c in old_chunks}
+    new_ids = {c["id"] for c in new_chunks}
+    added = [c for c in new_chunks if c["id"] not in old_ids]
+    return added, sorted(old_ids - new_ids), len(old_ids & new_ids)
+
+
+# ============================
+# Source slicing
+# ============================
+
+def _span(lines, start, end):
+    """1-based inclusive line range as text."""
+    return "\n".join(lines[start - 1:end])
+
+
+def _node_start(node):
+    """First line of a definition, including its decorators."""
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+def _cut_points(stmts, lines, budget):
+    """
+    Lines where a chunk may start: every statement in the body, and inside
+    any compound statement too large to fit the budget on its own.
+    """
+    points = []
+    for stmt in stmts:
+        points.append(stmt.lineno)
+        if estimate_tokens(_span(lines, stmt.lineno, stmt.end_lineno)) > budget:
+            children = [c for c in ast.iter_child_nodes(stmt) if isinstance(c, ast.stmt)]
+            points.extend(_cut_points(children, lines, budget))
+    return points
+
+
+def split_body(node, lines, budget):
+    """
+    Splits a definition's source into (start, end) line ranges that fit the
+    budget. The signature stays with the first range; ranges only break at
+    statement starts, or at arbitrary lines inside a single oversized one.
+    """
+    start, end = _node_start(node), node.end_lineno
+    if estimate_tokens(_span(lines, start, end)) <= budget:
+        return [(start, end)]
+
+    points = sorted({p for p in _cut_points(node.body, lines, budget) if start < p <= end})
+    points = [p for p in points if p > node.body[0].lineno] if points else []
+    bounds = [start] + points + [end + 1]
+    segments = [(bounds[i], bounds[i + 1] - 1) for i in range(len(bounds) - 1)]
+
+    ranges = []
+    current = None
+    for seg_start, seg_end in segments:
+        if current and estimate_tokens(_span(lines, current[0], seg_end)) <= budget:
+            current = (current[0], seg_end)
+            continue
+
+        if current:
+            ranges.append(current)
+        current = (seg_start, seg_end)
+
+        # A segment with no inner statement boundary: fall back to lines
+        while estimate_tokens(_span(lines, current[0], current[1])) > budget and current[0] < current[1]:
+            cut = current[0]
+            while cut < current[1] and estimate_tokens(_span(lines, current[0], cut + 1)) <= budget:
+                cut += 1
+            ranges.append((current[0], cut))
+            current = (cut + 1, current[1])
+
+    if current:
+        ranges.append(current)
+    return ranges
+
+
+def _signature(node, lines):
+    """Decorators and `def ...:` lines of a definition."""
+    body_start = node.body[0].lineno
+    return _span(lines, _node_start(node), max(node.lineno, body_start - 1)).rstrip()
+
 
-    if not os.path.exists(input_file):
+def _doctype_of(file_path):
+    parts = file_path.replace("\\", "/").split("/")
+    if len(parts) >= 3 and parts[-3] == "doctype" and parts[-2] == os.path.splitext(parts[-1])[0]:
+        return parts[-2]
+    return None
+
+
+class FileChunker:
+    """Turns one Python source file into code-bearing chunks."""
+
+    def __init__(self, file_path, module, budget=CHUNK_TOKEN_BUDGET):
+        self.file_path = file_path
+        self.module = module
+        self.budget = budget
+        self.doctype = _doctype_of(file_path)
+        self.chunks = []
+
+    def emit(self, kind, name, start, end, body, part=0, parts=1):
+        label = name if parts == 1 else f"{name}#{part + 1}"
+        suffix = "" if parts == 1 else f" (part {part + 1}/{parts})"
+        # File and lines stay out of the embedded text (they are metadata,
+        # rendered by rag/context.py), so a shifted chunk is not re-embedded
+        text = f"{kind.capitalize()} {name}{suffix}\n{body}"
+
+        chunk = {
+            "id": chunk_id(label, body),
+            "text": text,
+            "file": self.file_path,
+            "module": self.module,
+            "kind": kind,
+            "name": name,
+            "line": start,
+            "end_line": end,
+            "tokens": estimate_tokens(text),
+        }
+        if parts > 1:
+            chunk["part"] = part + 1
+            chunk["parts"] = parts
+        if self.doctype:
+            chunk["doctype"] = self.doctype
+        self.chunks.append(chunk)
+
+    def header_tokens(self, name):
+        """Room taken by the "<Kind> <name> (part i/n) in <file> at lines a-b" line of the prompt."""
+        return estimate_tokens(f"Function {name} in {self.file_path} at lines 00000-00000 (part 00/00)\n")
+
+    def function(self, node, qualname, kind, lines):
+        signature = _signature(node, lines)
+        # Later parts repeat the signature, so leave room for it in every part
+        budget = self.budget - self.header_tokens(qualname) - estimate_tokens(signature + "\n    ...\n")
+        ranges = split_body(node, lines, max(budget, 1))
+
+        for part, (start, end) in enumerate(ranges):
+            body = _span(lines, start, end)
+            if part:
+                body = f"{signature}\n    ...\n{body}"
+            self.emit(kind, qualname, start, end, body, part, len(ranges))
+
+    def packed(self, kind, name, start, end, title, rows):
+        """Emits title + rows, starting a new part whenever the budget would overflow."""
+        budget = self.budget - self.header_tokens(name)
+        groups, current = [], []
+        for row in rows:
+            if current and estimate_tokens("\n".join([title] + current + [row])) > budget:
+                groups.append(current)
+                current = []
+            current.append(row)
+        groups.append(current)
+
+        for part, group in enumerate(groups):
+            self.emit(kind, name, start, end, "\n".join([title] + group), part, len(groups))
+
+    def klass(self, node, qualname, lines):
+        """Class header: signature, docstring and class-level statements, plus method signatures."""
+        rows = []
+        methods = []
+
+        for stmt in node.body:
+            if isinstance(stmt, FUNCTION_NODES):
+                methods.append(lines[stmt.lineno - 1].rstrip())
+            elif not isinstance(stmt, ast.ClassDef):
+                rows.extend(_span(lines, stmt.lineno, stmt.end_lineno).splitlines())
+
+        if methods:
+            indent = methods[0][:len(methods[0]) - len(methods[0].lstrip())]
+            rows.append(f"{indent}# methods:")
+            rows.extend(methods)
+
+        self.packed("class", qualname, _node_start(node), node.end_lineno, _signature(node, lines), rows)
+
+    def visit(self, body, prefix, lines, in_class=False):
+        for node in body:
+            if isinstance(node, FUNCTION_NODES):
+                self.function(node, f"{prefix}.{node.name}", "method" if in_class else "function", lines)
+            elif isinstance(node, ast.ClassDef):
+                qualname = f"{prefix}.{node.name}"
+                self.klass(node, qualname, lines)
+                self.visit(node.body, qualname, lines, in_class=True)
+
+    def run(self, code):
+        tree = ast.parse(code)
+        lines = code.splitlines()
+        prefix = module_name_for(self.file_path)
+
+        docstring = ast.get_docstring(tree)
+        if docstring:
+            self.emit("module", prefix, 1, tree.body[0].end_lineno, docstring)
+
+        self.visit(tree.body, prefix, lines)
+        self.doctype_fields()
+        return self.chunks
+
+    def doctype_fields(self):
+        """Field list from the doctype JSON that sits next to its controller."""
+        if not self.doctype:
+            return
+
+        json_path = os.path.splitext(self.file_path)[0] + ".json"
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        rows = []
+        for field in meta.get("fields", []):
+            if not field.get("fieldname"):
+                continue
+            row = f"{field['fieldname']} ({field.get('fieldtype', 'Data')})"
+            if field.get("label"):
+                row += f" - {field['label']}"
+            if field.get("options") and field.get("fieldtype") in ("Link", "Table", "Table MultiSelect"):
+                row += f" -> {field['options']}"
+            rows.append(row)
+
+        if not rows:
+            return
+
+        name = meta.get("name", self.doctype)
+        self.packed("doctype", name, 1, 1, f"DocType {name} (module {meta.get('module', '')}) fields:", rows)
+
+
+def chunk_file(job):
+    """Worker entry point: (file_path, module, budget) -> list of chunks."""
+    file_path, module, budget = job
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            code = f.read()
+        return FileChunker(file_path, module, budget).run(code)
+    except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+        return []
+
+
+# ============================
+# Module build
+# ============================
+
+def module_files(module):
+    """Source files that the analyzer found definitions in."""
+    try:
+        with open_table(module, "functions", OUTPUT_DIR) as functions, \
+                open_table(module, "classes", OUTPUT_DIR) as classes:
+            files = {row["file"].replace("\\", "/") for row in functions}
+            files.update(row["file"].replace("\\", "/") for row in classes)
+    except FileNotFoundError:
         raise Exception(f"Analyzer output not found for module: {module}")
 
-    with open(input_file, "r", encoding="utf-8") as f:
-        functions = json.load(f)
+    return sorted(f for f in files if os.path.exists(f))
 
-    chunks = []
 
-    for fn in functions:
-        chunks.append({
-            "text": f"Function {fn['name']} in {fn['file']} at line {fn['line']}",
-            "file": fn["file"],
-            "module": module
-        })
+def build_chunks(module, budget=CHUNK_TOKEN_BUDGET, workers=None):
+    """
+    Chunks every file of a module in a process pool and streams the
+    results to data/<module>_chunks.jsonl as they arrive.
+    """
+    jobs = [(path, module, budget) for path in module_files(module)]
 
     os.makedirs(DATA_DIR, exist_ok=True)
+    path = f"{DATA_DIR}/{module}_chunks.jsonl"
+
+    count = 0
+    seen = set()
+    with open(path + ".tmp", "w", encoding="utf-8") as out:
+        if workers == 1 or len(jobs) < 2:
+            results = map(chunk_file, jobs)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(chunk_file, jobs, chunksize=8)
+
+        try:
+            for chunks in results:
+                for chunk in chunks:
+                    # Identical definitions (e.g. re-declared in one file) share an id
+                    if chunk["id"] in seen:
+                        continue
+                    seen.add(chunk["id"])
+                    out.write(json.dumps(chunk) + "\n")
+                    count += 1
+        finally:
+            if pool:
+                pool.shutdown()
+
+    os.replace(path + ".tmp", path)
+
+    # BM25 postings follow the chunk file they were built from
+    from rag.lexical import build_lexical
+    build_lexical(module, DATA_DIR)
 
-    with open(f"{DATA_DIR}/{module}_chunks.json", "w", encoding="utf-8") as f:
-        json.dump(chunks, f, indent=2)
+    print(f"Created {count} chunks from {len(jobs)} files for module: {module}")
+    return path
 
-    print(f"Created {len(chunks)} chunks for module: {module}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python module_chunker.py <module>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Code-body chunker for analyzed ERPNext modules")
+    parser.add_argument("module")
+    parser.add_argument("--budget", type=int, default=CHUNK_TOKEN_BUDGET, help="Max estimated tokens per chunk")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
 
-    build_chunks(sys.argv[1])
+    build_chunks(args.module, args.budget, args.workers)
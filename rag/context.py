@@ -0,0 +1,245 @@
+"""
+Context assembly for RAG prompts.
+
+Retrieval returns a pool of candidate chunks best-first. pack_context
+turns that pool into the prompt's context section:
+
+* exact duplicates (same chunk id or text) are dropped, as are chunks
+  whose line span lies inside another chunk already kept from the same file;
+* consecutive spans from one file (e.g. the parts of a split function)
+  are merged into one block with a single header;
+* k is adaptive: of the remaining chunks at most CONTEXT_MAX_K are kept,
+  and past the first CONTEXT_MIN_K any whose relevance falls below
+  CONTEXT_SCORE_CUTOFF are left out (see _relevance);
+* blocks keep the rank of their best chunk, and are added best-first
+  while they fit the model's token budget.
+
+Deduplicating before choosing k lets the pool backfill slots that
+duplicates would otherwise waste.
+"""
+
+from config import (CONTEXT_MAX_K, CONTEXT_MIN_K, CONTEXT_SCORE_CUTOFF, CONTEXT_TOKEN_BUDGETS,
+                    PROMPT_OVERHEAD_TOKENS)
+from rag.tokens import estimate_tokens
+
+# Part continuation marker written by rag/chunker.py after the repeated signature
+_CONTINUATION = "    ..."
+
+
+def context_budget(model, *prompt_parts):
+    """Tokens left for retrieved code once the other prompt parts are counted."""
+    name = model.split(":", 1)[-1]
+    total = CONTEXT_TOKEN_BUDGETS.get(name, CONTEXT_TOKEN_BUDGETS["default"])
+    used = PROMPT_OVERHEAD_TOKENS + sum(estimate_tokens(part) for part in prompt_parts)
+    return max(0, total - used)
+
+
+def _span(hit):
+    line, end = hit.get("line"), hit.get("end_line")
+    if hit.get("file") and isinstance(line, int) and isinstance(end, int) and hit.get("kind") != "doctype":
+        return line, end
+    return None
+
+
+def _body(hit, continues):
+    """Chunk text without its header line (and repeated signature when merged)."""
+    header, _, body = hit["text"].partition("\n")
+    if not body:
+        return header
+    if continues and hit.get("part", 1) > 1:
+        lines = body.split("\n")
+        if _CONTINUATION in lines:
+            body = "\n".join(lines[lines.index(_CONTINUATION) + 1:])
+    return body
+
+
+class Block:
+    """One or more adjacent chunks from the same file, rendered together."""
+
+    def __init__(self, hit, rank, rendered=None):
+        self.hits = [hit]
+        self.rank = rank
+        self.span = _span(hit)
+        # Fixed text for a block cut down to fit the budget
+        self.rendered = rendered
+
+    @property
+    def file(self):
+        return self.hits[0].get("file")
+
+    def absorb(self, hit, rank):
+        span = _span(hit)
+        self.hits.append(hit)
+        self.hits.sort(key=lambda h: _span(h)[0])
+        self.span = (min(self.span[0], span[0]), max(self.span[1], span[1]))
+        self.rank = min(self.rank, rank)
+
+    @property
+    def text(self):
+        if self.rendered is not None:
+            return self.rendered
+
+        if len(self.hits) == 1:
+            hit = self.hits[0]
+            if not self.span:
+                return hit["text"]
+            # Chunk text carries no location; the prompt gets it from the metadata
+            header, _, body = hit["text"].partition("\n")
+            return f"{header} in {self.file} at lines {self.span[0]}-{self.span[1]}\n{body}"
+
+        names = []
+        for hit in self.hits:
+            if hit.get("name") and hit["name"] not in names:
+                names.append(hit["name"])
+
+        header = f"{', '.join(names)} in {self.file} at lines {self.span[0]}-{self.span[1]}"
+        bodies = [_body(hit, i > 0 and hit.get("name") == self.hits[i - 1].get("name"))
+                  for i, hit in enumerate(self.hits)]
+        return "\n".join([header] + bodies)
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+class PackedContext:
+
+    def __init__(self, blocks, candidates):
+        self.blocks = blocks
+        self.candidates = candidates
+
+    @property
+    def hits(self):
+        """Chunks that made it into the prompt, in rank order."""
+        return sorted((hit for block in self.blocks for hit in block.hits), key=lambda h: h.get("rank", 0))
+
+    @property
+    def texts(self):
+        return [block.text for block in self.blocks]
+
+    @property
+    def text(self):
+        return "\n\n".join(self.texts)
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+def _relevance(hits):
+    """
+    Each hit's score as a 0..1 relevance relative to the top hit, by the
+    score_kind the retriever set:
+
+    * "distance" (L2, lower is better): top distance / distance;
+    * "rank" (reciprocal-rank fusion, no absolute scale): position between
+      the lowest and the top score of the retrieved pool;
+    * "similarity" (BM25, cosine; the default): score / top score.
+
+    None where a hit has no score or the top score gives no scale.
+    """
+    scores = [hit.get("score") for hit in hits]
+    top, kind = scores[0], hits[0].get("score_kind", "similarity")
+    if top is None:
+        return [None] * len(hits)
+
+    if kind == "rank":
+        floor = min(s for s in scores if s is not None)
+        span = top - floor
+        return [(s - floor) / span if span and s is not None else None for s in scores]
+
+    if kind == "distance":
+        return [top / s if s else None for s in scores] if top > 0 else [None] * len(hits)
+
+    return [s / top if top and s is not None else None for s in scores]
+
+
+def _kept(hits, min_k, max_k, cutoff):
+    """Adaptive k: the first min_k hits, then only those close enough to the top one."""
+    if not hits:
+        return []
+
+    kept = []
+    for i, (hit, relevance) in enumerate(zip(hits[:max_k], _relevance(hits))):
+        if i >= min_k and relevance is not None and relevance < cutoff:
+            break
+        kept.append(hit)
+    return kept
+
+
+def _dedupe(hits):
+    seen_ids, seen_texts, kept = set(), set(), []
+
+    for hit in hits:
+        key = hit.get("id")
+        if (key is not None and key in seen_ids) or hit["text"] in seen_texts:
+            continue
+
+        span = _span(hit)
+        contained = span and any(
+            _span(other) and other["file"] == hit["file"] and other.get("kind") != "class"
+            and _span(other)[0] <= span[0] and span[1] <= _span(other)[1]
+            for other in kept
+        )
+        # A class header spans its methods without containing their bodies
+        if contained and hit.get("kind") != "class":
+            continue
+
+        kept.append(hit)
+        seen_texts.add(hit["text"])
+        if key is not None:
+            seen_ids.add(key)
+
+    return kept
+
+
+def _blocks(hits):
+    blocks = []
+    by_file = {}
+
+    for rank, hit in enumerate(hits):
+        span = _span(hit)
+        if span and hit.get("kind") != "class":
+            for block in by_file.get(hit["file"], ()):
+                if block.span[0] - 1 <= span[1] and span[0] <= block.span[1] + 1:
+                    block.absorb(hit, rank)
+                    break
+            else:
+                block = Block(hit, rank)
+                blocks.append(block)
+                by_file.setdefault(hit["file"], []).append(block)
+        else:
+            blocks.append(Block(hit, rank))
+
+    return sorted(blocks, key=lambda b: b.rank)
+
+
+def _truncate(block, budget):
+    """Cuts a lone oversized block down to whole lines that fit the budget."""
+    lines, kept = block.text.split("\n"), []
+    for line in lines:
+        if estimate_tokens("\n".join(kept + [line])) > budget:
+            break
+        kept.append(line)
+    return Block(block.hits[0], block.rank, rendered="\n".join(kept))
+
+
+def pack_context(hits, token_budget, min_k=CONTEXT_MIN_K, max_k=CONTEXT_MAX_K, cutoff=CONTEXT_SCORE_CUTOFF):
+    """
+    Packs retrieved hits (best first) into at most token_budget tokens.
+    Returns a PackedContext; .text is ready to paste into the prompt.
+    """
+    candidates = _kept(_dedupe(hits), min_k, max_k, cutoff)
+
+    packed, used = [], 0
+    for block in _blocks(candidates):
+        cost = block.tokens + (1 if packed else 0)
+        if used + cost > token_budget:
+            if not packed and token_budget > 0:
+                packed.append(_truncate(block, token_budget))
+                used = packed[0].tokens
+            continue
+        packed.append(block)
+        used += cost
+
+    return PackedContext(packed, candidates)
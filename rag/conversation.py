@@ -0,0 +1,227 @@
+"""
+Per-session conversation history with bounded memory.
+
+Every session keeps only its most recent messages, up to a token budget;
+sessions idle for longer than the TTL expire, and once more than
+max_sessions are live the least recently used ones are evicted. Memory is
+therefore bounded by max_sessions x token budget no matter how long the
+API runs.
+
+ConversationStore keeps sessions in process; SQLiteConversationStore has
+the same interface over a SQLite file, so several API workers can share
+one history.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+
+from config import (CONVERSATION_DB, CONVERSATION_MAX_SESSIONS, CONVERSATION_TOKEN_BUDGET,
+                    CONVERSATION_TTL)
+from rag.tokens import estimate_tokens
+
+
+class ConversationStore:
+    """In-process store: an LRU-ordered dict of per-session message deques."""
+
+    def __init__(self, ttl=CONVERSATION_TTL, token_budget=CONVERSATION_TOKEN_BUDGET,
+                 max_sessions=CONVERSATION_MAX_SESSIONS, clock=time.time):
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.evicted = 0
+        self.expired = 0
+        # session id -> [messages deque, token total, last seen]
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @property
+    def stats(self):
+        return {"sessions": len(self), "evicted": self.evicted, "expired": self.expired}
+
+    def _expire(self, now):
+        # Oldest sessions sit at the front, so stop at the first live one
+        while self._sessions:
+            session_id, (_, _, seen) = next(iter(self._sessions.items()))
+            if now - seen <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def append(self, session_id, role, content):
+        now = self.clock()
+        tokens = estimate_tokens(content)
+
+        with self._lock:
+            self._expire(now)
+
+            session = self._sessions.pop(session_id, None) or [deque(), 0, now]
+            messages = session[0]
+            messages.append({"role": role, "content": content, "tokens": tokens})
+            session[1] += tokens
+            session[2] = now
+
+            # Drop the oldest turns, but always keep the newest message
+            while session[1] > self.token_budget and len(messages) > 1:
+                session[1] -= messages.popleft()["tokens"]
+
+            self._sessions[session_id] = session
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+
+    def history(self, session_id):
+        """The session's retained messages, oldest first ([] if unknown or expired)."""
+        now = self.clock()
+
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            session[2] = now
+            self._sessions.move_to_end(session_id)
+            return [{"role": m["role"], "content": m["content"]} for m in session[0]]
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteConversationStore:
+    """Same interface, persisted in SQLite (WAL) and shareable between processes."""
+
+    def __init__(self, path=CONVERSATION_DB, ttl=CONVERSATION_TTL, token_budget=CONVERSATION_TOKEN_BUDGET,
+                 max_sessions=CONVERSATION_MAX_SESSIONS, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.evicted = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session TEXT PRIMARY KEY,
+                tokens INTEGER NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_lru ON sessions (last_seen);
+            CREATE TABLE IF NOT EXISTS messages (
+                session TEXT NOT NULL REFERENCES sessions (session) ON DELETE CASCADE,
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_session ON messages (session, seq);
+        """)
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return count
+
+    @property
+    def stats(self):
+        return {"sessions": len(self), "evicted": self.evicted, "expired": self.expired}
+
+    def _expire(self, now):
+        cursor = self._db.execute("DELETE FROM sessions WHERE last_seen < ?", (now - self.ttl,))
+        self.expired += cursor.rowcount
+
+    def append(self, session_id, role, content):
+        now = self.clock()
+        tokens = estimate_tokens(content)
+
+        with self._lock:
+            self._expire(now)
+            self._db.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?) ON CONFLICT (session) "
+                "DO UPDATE SET tokens = tokens + excluded.tokens, last_seen = excluded.last_seen",
+                (session_id, tokens, now),
+            )
+            self._db.execute(
+                "INSERT INTO messages (session, role, content, tokens) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, tokens),
+            )
+            self._trim(session_id)
+
+            (count,) = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            excess = count - self.max_sessions
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM sessions WHERE session IN "
+                    "(SELECT session FROM sessions ORDER BY last_seen LIMIT ?)",
+                    (excess,),
+                )
+                self.evicted += excess
+            self._db.commit()
+
+    def _trim(self, session_id):
+        """Deletes the oldest messages over the budget, always keeping the newest."""
+        (total,) = self._db.execute("SELECT tokens FROM sessions WHERE session = ?", (session_id,)).fetchone()
+        if total <= self.token_budget:
+            return
+
+        rows = self._db.execute(
+            "SELECT seq, tokens FROM messages WHERE session = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+
+        drop = []
+        for seq, tokens in rows[:-1]:
+            if total <= self.token_budget:
+                break
+            drop.append((seq,))
+            total -= tokens
+
+        self._db.executemany("DELETE FROM messages WHERE seq = ?", drop)
+        self._db.execute("UPDATE sessions SET tokens = ? WHERE session = ?", (total, session_id))
+
+    def history(self, session_id):
+        now = self.clock()
+
+        with self._lock:
+            self._expire(now)
+            updated = self._db.execute(
+                "UPDATE sessions SET last_seen = ? WHERE session = ?", (now, session_id)
+            ).rowcount
+            rows = self._db.execute(
+                "SELECT role, content FROM messages WHERE session = ? ORDER BY seq", (session_id,)
+            ).fetchall() if updated else []
+            self._db.commit()
+
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def clear(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session = ?", (session_id,))
+            self._db.commit()
+
+
+def create_store():
+    """SQLite-backed when CONVERSATION_DB is set (shared by workers), else in-process."""
+    if CONVERSATION_DB:
+        return SQLiteConversationStore(CONVERSATION_DB)
+    return ConversationStore()
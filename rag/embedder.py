@@ -0,0 +1,165 @@
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import OLLAMA_URL, EMBED_TIMEOUT, EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_CONCURRENCY
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+class EmbeddingPipeline:
+    """
+    Batched, concurrent client for Ollama's /api/embed endpoint.
+
+    Texts are sent in batches over one pooled keep-alive session, with at
+    most `concurrency` requests in flight. Failed batches are retried with
+    exponential backoff and jitter. Vectors are written straight into a
+    preallocated float32 array in input order.
+
+    With an EmbeddingCache, only texts missing from the cache are sent,
+    and their vectors are added to it.
+    """
+
+    def __init__(self, url=OLLAMA_URL, model=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE,
+                 concurrency=EMBED_CONCURRENCY, retries=3, backoff=0.5,
+                 timeout=EMBED_TIMEOUT, progress=True, cache=None):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.progress = progress
+        self.cache = cache
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.stats = {"requests": 0, "retries": 0, "texts": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def embed_batch(self, texts):
+        """One /api/embed round-trip with retry; returns a list of vectors."""
+        for attempt in range(self.retries + 1):
+            self._count("requests")
+            try:
+                response = self.session.post(
+                    f"{self.url}/api/embed",
+                    json={"model": self.model, "input": list(texts)},
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                vectors = response.json()["embeddings"]
+
+                if len(vectors) != len(texts):
+                    raise EmbeddingError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                return vectors
+
+            except (requests.RequestException, KeyError, ValueError, EmbeddingError) as e:
+                if attempt == self.retries:
+                    raise EmbeddingError(f"Embedding batch failed after {attempt + 1} attempts: {e}") from e
+
+                self._count("retries")
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def embed_all(self, texts):
+        """Embeds every text; returns a (len(texts), dim) float32 array."""
+        texts = list(texts)
+        if self.cache is None:
+            return self._embed_uncached(texts)
+
+        cached = self.cache.get_many(texts)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        fresh = self._embed_uncached([texts[i] for i in missing])
+
+        if missing:
+            self.cache.put_many([texts[i] for i in missing], fresh)
+
+        if not texts:
+            return fresh
+
+        dim = fresh.shape[1] if missing else len(next(iter(cached.values())))
+        vectors = np.empty((len(texts), dim), dtype=np.float32)
+        for i, vector in cached.items():
+            vectors[i] = vector
+        if missing:
+            vectors[missing] = fresh
+        return vectors
+
+    def _embed_uncached(self, texts):
+        started = time.perf_counter()
+        batches = [(start, texts[start:start + self.batch_size])
+                   for start in range(0, len(texts), self.batch_size)]
+
+        vectors = None
+        done = 0
+        report = self._reporter(len(texts))
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = {}
+            queue = iter(batches)
+
+            # Sliding window: never more than `concurrency` batches queued
+            for start, batch in queue:
+                pending[pool.submit(self.embed_batch, batch)] = start
+                if len(pending) >= self.concurrency:
+                    break
+
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    start = pending.pop(future)
+                    rows = np.asarray(future.result(), dtype=np.float32)
+
+                    if vectors is None:
+                        vectors = np.empty((len(texts), rows.shape[1]), dtype=np.float32)
+                    vectors[start:start + len(rows)] = rows
+
+                    done += len(rows)
+                    report(done)
+
+                    nxt = next(queue, None)
+                    if nxt:
+                        pending[pool.submit(self.embed_batch, nxt[1])] = nxt[0]
+
+        self._count("texts", len(texts))
+        self._count("seconds", time.perf_counter() - started)
+
+        if vectors is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return vectors
+
+    def _reporter(self, total):
+        if not self.progress or not total:
+            return lambda done: None
+
+        try:
+            from tqdm import tqdm
+        except ImportError:
+            def report(done):
+                print(f"\r Embedded {done}/{total}", end="\n" if done == total else "", file=sys.stderr)
+            return report
+
+        bar = tqdm(total=total, desc="Embedding", unit="chunk")
+
+        def report(done):
+            bar.update(done - bar.n)
+            if done == total:
+                bar.close()
+        return report
@@ -0,0 +1,159 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+from config import EMBED_VERSION, EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES
+
+# A hit refreshes last_used only once it is this old, so reads rarely write
+TOUCH_INTERVAL_NS = 24 * 3600 * 10**9
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache in SQLite.
+
+    Rows are keyed by (model, sha256(text)), where model is the embedding
+    version (model and endpoint), and hold the float32 vector as a blob.
+    Hits refresh a last_used older than TOUCH_INTERVAL_NS, and once the table
+    grows past max_entries the least recently used rows are evicted.
+    """
+
+    def __init__(self, path=EMBED_CACHE_PATH, model=EMBED_VERSION, max_entries=EMBED_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (model, hash)
+            ) WITHOUT ROWID
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_used)")
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @property
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def get_many(self, texts):
+        """Returns {position: vector} for the texts already cached."""
+        hashes = [text_hash(t) for t in texts]
+        found = {}
+
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT hash, vector, last_used FROM embeddings WHERE model = ? "
+                    f"AND hash IN ({','.join('?' * len(chunk))})",
+                    [self.model, *chunk],
+                ).fetchall()
+                found.update((h, (vector, last_used)) for h, vector, last_used in rows)
+
+            now = time.time_ns()
+            stale = [h for h, (_, last_used) in found.items() if now - last_used >= TOUCH_INTERVAL_NS]
+            if stale:
+                self._db.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, self.model, h) for h in stale],
+                )
+                self._db.commit()
+
+            result = {}
+            for i, h in enumerate(hashes):
+                if h in found:
+                    result[i] = np.frombuffer(found[h][0], dtype=np.float32)
+            self.hits += len(result)
+            self.misses += len(hashes) - len(result)
+
+        return result
+
+    def put_many(self, texts, vectors):
+        now = time.time_ns()
+        rows = [
+            (self.model, text_hash(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE (model, hash) IN "
+                "(SELECT model, hash FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def get(self, text):
+        return self.get_many([text]).get(0)
+
+    def put(self, text, vector):
+        self.put_many([text], [vector])
+
+
+def cached(embed_fn, cache):
+    """Wraps a single-text embed function so repeated texts hit the cache."""
+    def embed(text):
+        vector = cache.get(text)
+        if vector is None:
+            vector = np.asarray(embed_fn(text), dtype=np.float32)
+            cache.put(text, vector)
+        return vector
+    return embed
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache():
+    global _default_cache
+
+    if _default_cache is None:
+        with _default_lock:
+            if _default_cache is None:
+                _default_cache = EmbeddingCache()
+    return _default_cache
@@ -0,0 +1,220 @@
+"""
+One combined vector index over every module, with a metadata side table.
+
+Chunks are stored module by module, so each module owns one contiguous id
+range. Filters become FAISS ID selectors: a range per module, a batch of
+ids per doctype. Any subset of modules is then answered by a single
+filtered search instead of one load and search per module.
+"""
+
+import os
+import re
+import sys
+import glob
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Analyzer.callgraph import scrub
+from Analyzer.store import ColumnarTable, write_table
+from rag.chunker import load_chunks
+from rag.retriever import DATA_DIR, VECTOR_DIR, _stamp, read_index
+from rag.index_factory import INDEX_TYPES, check_index_version, create_index, index_type_of, save_index
+
+GLOBAL_NAME = "global"
+
+# Side table columns; row i describes vector id i
+METADATA_SCHEMA = [
+    ("module", "str"),
+    ("file", "str"),
+    ("kind", "str"),
+    ("name", "str"),
+    ("line", "int32"),
+    ("doctype", "str"),
+    ("text", "str"),
+]
+
+_LEGACY_TEXT = re.compile(r"^Function (?P<name>\S+) in .* at line (?P<line>\d+)$")
+_DOCTYPE_DIR = re.compile(r"[\\/]doctype[\\/](?P<doctype>[^\\/]+)[\\/]")
+
+
+def chunk_metadata(chunk, module):
+    """Side-table row for a chunk, filling gaps from its text and path."""
+    text = chunk["text"]
+    file_path = chunk.get("file", "")
+    name, line = chunk.get("name"), chunk.get("line")
+
+    legacy = _LEGACY_TEXT.match(text)
+    if legacy:
+        name = name or legacy["name"]
+        line = line if line is not None else int(legacy["line"])
+
+    doctype = chunk.get("doctype")
+    if not doctype:
+        match = _DOCTYPE_DIR.search(file_path)
+        doctype = match["doctype"] if match else ""
+
+    return {
+        "module": module,
+        "file": file_path,
+        "kind": chunk.get("kind", "function"),
+        "name": name or "",
+        "line": line,
+        "doctype": scrub(doctype),
+        "text": text,
+    }
+
+
+def available_modules(data_dir=DATA_DIR):
+    modules = set()
+    for suffix in ("_chunks.json", "_chunks.jsonl"):
+        modules.update(
+            os.path.basename(p)[:-len(suffix)]
+            for p in glob.glob(os.path.join(data_dir, f"*{suffix}"))
+            if not os.path.basename(p).startswith(GLOBAL_NAME)
+        )
+    return sorted(modules)
+
+
+def global_paths(data_dir=DATA_DIR, vector_dir=VECTOR_DIR):
+    return (
+        os.path.join(vector_dir, f"{GLOBAL_NAME}.index"),
+        os.path.join(data_dir, f"{GLOBAL_NAME}_chunks.col"),
+    )
+
+
+def build_global_index(modules=None, index_type="auto", data_dir=DATA_DIR,
+                       vector_dir=VECTOR_DIR, pipeline=None):
+    """
+    Embeds every module's chunks into one index plus side table.
+    Embeddings come through the shared cache, so modules that already have
+    their own index are not re-embedded.
+    """
+    if pipeline is None:
+        from rag.embedder import EmbeddingPipeline
+        from rag.embedding_cache import get_cache
+        pipeline = EmbeddingPipeline(cache=get_cache())
+
+    rows = []
+    for module in modules or available_modules(data_dir):
+        rows.extend(chunk_metadata(chunk, module) for chunk in load_chunks(module, data_dir))
+
+    vectors = pipeline.embed_all(row["text"] for row in rows)
+    index = create_index(vectors, index_type)
+
+    index_path, table_path = global_paths(data_dir, vector_dir)
+    os.makedirs(vector_dir, exist_ok=True)
+
+    write_table(table_path, rows, METADATA_SCHEMA)
+    save_index(index, index_path)
+
+    return index, rows
+
+
+class GlobalIndex:
+    """Loaded global index: FAISS index, side table and filter lookups."""
+
+    def __init__(self, name, index_path, table_path):
+        self.name = name
+        self.stamp = _stamp(index_path, table_path)
+        check_index_version(index_path)
+        self.index = read_index(index_path)
+        self.table = ColumnarTable(table_path)
+
+        if self.index.ntotal != len(self.table):
+            raise ValueError(
+                f"Global index/table mismatch: {self.index.ntotal} vectors vs {len(self.table)} rows"
+            )
+
+        # Each module occupies one contiguous id range
+        self.module_ranges = {}
+        codes = self.table.codes("module")
+        for code in np.unique(codes).tolist():
+            ids = np.flatnonzero(codes == code)
+            self.module_ranges[self.table.string(code)] = (int(ids[0]), int(ids[-1]) + 1)
+
+        # Doctype -> sorted ids, grouped in one pass
+        codes = self.table.codes("doctype")
+        order = np.argsort(codes, kind="stable").astype(np.int64)
+        values, starts = np.unique(codes[order], return_index=True)
+        ends = list(starts[1:]) + [len(order)]
+        self.doctype_index = {
+            self.table.string(int(code)): order[start:end]
+            for code, start, end in zip(values.tolist(), starts.tolist(), ends)
+        }
+
+    @property
+    def modules(self):
+        return sorted(self.module_ranges)
+
+    def close(self):
+        self.table.close()
+
+    def doctype_ids(self, doctypes):
+        groups = [self.doctype_index.get(scrub(d)) for d in doctypes]
+        groups = [g for g in groups if g is not None]
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+        return np.ascontiguousarray(np.sort(np.concatenate(groups)))
+
+    def selector(self, modules=None, doctypes=None):
+        """
+        Returns (selector, keep) for the filter; selector is None when
+        unfiltered. SWIG selectors hold raw pointers into the objects in
+        `keep`, which must outlive the search.
+        """
+        keep = []
+
+        if modules:
+            ranges = [faiss.IDSelectorRange(*self.module_ranges[m]) for m in modules if m in self.module_ranges]
+            if not ranges:
+                ranges = [faiss.IDSelectorRange(0, 0)]
+            module_sel = ranges[0]
+            for other in ranges[1:]:
+                module_sel = faiss.IDSelectorOr(module_sel, other)
+            keep.extend(ranges)
+            keep.append(module_sel)
+            selector = module_sel
+        else:
+            selector = None
+
+        if doctypes:
+            ids = self.doctype_ids(doctypes)
+            doctype_sel = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+            keep.extend([ids, doctype_sel])
+            selector = doctype_sel if selector is None else faiss.IDSelectorAnd(selector, doctype_sel)
+            keep.append(selector)
+
+        return selector, keep
+
+    def search_params(self, selector):
+        kind = index_type_of(self.index)
+        if kind in ("ivf_flat", "ivf_pq"):
+            ivf = faiss.extract_index_ivf(self.index)
+            # Filtered queries probe wider so restrictive filters still fill k
+            return faiss.SearchParametersIVF(sel=selector, nprobe=min(ivf.nlist, ivf.nprobe * 4))
+        if kind == "hnsw":
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=faiss.downcast_index(self.index).hnsw.efSearch)
+        return faiss.SearchParameters(sel=selector)
+
+    def search(self, qvec, k, modules=None, doctypes=None):
+        selector, keep = self.selector(modules, doctypes)
+        if selector is None:
+            return self.index.search(qvec, k)
+
+        result = self.index.search(qvec, k, params=self.search_params(selector))
+        del keep
+        return result
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    index_type = "auto"
+    if args and args[-1] in INDEX_TYPES:
+        index_type = args.pop()
+
+    index, rows = build_global_index(args or None, index_type)
+    modules = sorted({row["module"] for row in rows})
+    print(f"✅ Global index built: {index.ntotal} vectors ({index_type_of(index)}) across {', '.join(modules)}")
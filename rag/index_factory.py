@@ -0,0 +1,180 @@
+"""
+FAISS index construction for module vector stores.
+
+`auto` picks by collection size: an exact flat scan for small modules,
+IVF-Flat once a scan gets expensive, and IVF-PQ when full-precision
+vectors no longer fit comfortably in memory. HNSW is available on request;
+it answers fastest but cannot remove vectors, so incremental updates fall
+back to a rebuild for it.
+"""
+
+import os
+import math
+
+import faiss
+import numpy as np
+
+from config import EMBED_VERSION
+
+INDEX_TYPES = ("auto", "flat", "ivf_flat", "ivf_pq", "hnsw")
+
+FLAT_MAX = 10_000
+IVF_FLAT_MAX = 250_000
+
+# Training points per IVF list, per FAISS's own guidance (39..256)
+TRAIN_PER_LIST = 64
+PQ_TRAIN_MIN = 256 * 39
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+
+
+def choose_index_type(n):
+    if n <= FLAT_MAX:
+        return "flat"
+    if n <= IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def nlist_for(n):
+    """~4·sqrt(n) lists, with enough vectors to train every centroid."""
+    nlist = int(4 * math.sqrt(n))
+    return max(1, min(nlist, n // TRAIN_PER_LIST or 1))
+
+
+def pq_subquantizers(d):
+    """Largest divisor of d giving sub-vectors of at least 8 dims."""
+    for m in range(d // 8, 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def training_sample(vectors, size, seed=0):
+    if len(vectors) <= size:
+        return vectors
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=size, replace=False)
+    return np.ascontiguousarray(vectors[np.sort(rows)])
+
+
+def create_index(vectors, index_type="auto", seed=0, ids=None):
+    """
+    Builds, trains and fills an index of the given type over float32 vectors.
+    Training uses a random sample of the vectors being indexed.
+
+    With `ids`, the index is wrapped in an IndexIDMap2 so vectors are
+    addressed by stable chunk id and can be removed or replaced later.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+
+    if index_type == "auto":
+        index_type = choose_index_type(n)
+
+    if index_type == "ivf_pq" and n < PQ_TRAIN_MIN:
+        # Too few vectors to train 256 codewords per sub-quantizer
+        index_type = "ivf_flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d)
+
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist_for(n)
+        quantizer = faiss.IndexFlatL2(d)
+
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_subquantizers(d), 8)
+
+        index.train(training_sample(vectors, max(nlist * TRAIN_PER_LIST, PQ_TRAIN_MIN), seed))
+        index.nprobe = max(1, nlist // 8)
+
+        # Keeps the quantizer alive as long as the index (SWIG ownership)
+        index.own_fields = True
+        quantizer.this.disown()
+
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+
+    else:
+        raise ValueError(f"Unknown index type: {index_type} (expected one of {INDEX_TYPES})")
+
+    if ids is None:
+        index.add(vectors)
+        return index
+
+    id_map = faiss.IndexIDMap2(index)
+    id_map.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    return id_map
+
+
+def supports_removal(index):
+    """HNSW graphs cannot drop vectors; everything else here can."""
+    return index_type_of(index) != "hnsw"
+
+
+def index_ids(index):
+    """Stored ids of an IndexIDMap(2), or None for a positional index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map).astype(np.int64)
+    return None
+
+
+def index_type_of(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def index_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def version_path(index_path):
+    return index_path + ".version"
+
+
+def save_index(index, path, version=EMBED_VERSION):
+    """
+    Writes the index with a sidecar naming the embedding version it was
+    built with. Write then rename: a resident Retriever hot-reloads on the
+    new file and must never observe a half-written one.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(version_path(path), "w", encoding="utf-8") as f:
+        f.write(version)
+    faiss.write_index(index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def index_version(path):
+    """Embedding version an index was built with; None when it has no sidecar."""
+    try:
+        with open(version_path(path), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def check_index_version(path, version=EMBED_VERSION):
+    """Refuses an index whose vectors do not match what queries are embedded with."""
+    built_with = index_version(path)
+    if built_with is not None and built_with != version:
+        raise ValueError(
+            f"{path} was embedded with {built_with}, queries use {version}; "
+            f"rebuild it with rag/vector_store.py or rag/global_index.py"
+        )
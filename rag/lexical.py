@@ -0,0 +1,288 @@
+"""
+BM25 inverted index over a module's chunks, for exact identifier queries.
+
+Terms come from an identifier-aware tokenizer: `make_gl_entries` indexes
+as itself plus `make`, `gl`, `entries`; `RepostItemValuation` also as
+`repost_item_valuation`, the scrubbed doctype name. Postings are CSR
+arrays (term -> chunk positions and term frequencies) in the same `.col`
+format as the analyzer tables, so loading is an mmap plus a vocabulary
+decode. A second CSR maps symbol names (definition names and doctypes)
+straight to their chunks, which answers "make_gl_entries"-style queries
+without scoring or embedding anything.
+"""
+
+import os
+import re
+import sys
+import math
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Analyzer.store import MappedFile, write_arrays
+
+DATA_DIR = "data"
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Standard reciprocal-rank-fusion constant
+RRF_K = 60
+
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from",
+    "how", "in", "is", "it", "of", "on", "or", "the", "this", "that", "to",
+    "what", "when", "where", "which", "why", "with",
+))
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# One (optionally dotted) identifier, or a Title Case doctype name
+_SYMBOL_QUERY = re.compile(r"^(?:[A-Za-z_]\w*\.)*(?P<name>[A-Za-z_]\w*|[A-Z]\w*(?: [A-Z]\w*)+)$")
+_HEADER_NAME = re.compile(r"^\w+ (?P<name>\S+) in ")
+
+
+def identifier_parts(word):
+    """snake_case / CamelCase / digit boundaries, lowercased."""
+    return [p.lower() for piece in word.split("_") for p in _CAMEL.findall(piece)]
+
+
+def identifier_terms(word):
+    """A word's index terms: the identifier itself, its snake form and its parts."""
+    parts = identifier_parts(word)
+    if not parts:
+        return []
+
+    terms = [word.lower().strip("_")]
+    if len(parts) > 1:
+        snake = "_".join(parts)
+        if snake != terms[0]:
+            terms.append(snake)
+        terms.extend(parts)
+    return [t for t in terms if len(t) > 1 and t not in STOPWORDS]
+
+
+def tokenize(text):
+    terms = []
+    for word in _WORD.findall(text):
+        terms.extend(identifier_terms(word))
+    return terms
+
+
+def symbol_key(name):
+    """Canonical symbol: `Repost Item Valuation`, `RepostItemValuation` -> `repost_item_valuation`."""
+    return "_".join(identifier_parts(name.replace(" ", "_").replace("-", "_")))
+
+
+def chunk_symbols(chunk):
+    """Names a chunk answers to exactly: its definition name and its doctype."""
+    name = chunk.get("name")
+    if not name:
+        match = _HEADER_NAME.match(chunk["text"])
+        name = match["name"] if match else ""
+
+    symbols = set()
+    if name:
+        symbols.add(symbol_key(name.rsplit(".", 1)[-1]))
+    if chunk.get("doctype") and chunk.get("kind") in ("class", "doctype"):
+        symbols.add(symbol_key(chunk["doctype"]))
+    symbols.discard("")
+    return symbols
+
+
+def lexical_path(module, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{module}_lexical.col")
+
+
+def _csr(rows, n):
+    """rows[i] is a list of (doc, value); returns indptr, docs, values."""
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    docs = np.fromiter((d for r in rows for d, _ in r), dtype=np.int32, count=int(indptr[-1]))
+    values = np.fromiter((v for r in rows for _, v in r), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, docs, values
+
+
+class LexicalIndex:
+    """BM25 postings plus a symbol table, addressed by chunk position."""
+
+    def __init__(self, terms, arrays, source=None):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = arrays["indptr"]
+        self.docs = arrays["docs"]
+        self.tfs = arrays["tfs"]
+        self.doc_len = arrays["doc_len"]
+        self.sym_indptr = arrays["sym_indptr"]
+        self.sym_docs = arrays["sym_docs"]
+        self._source = source
+
+        self.count = len(self.doc_len)
+        self.avgdl = float(self.doc_len.mean()) if self.count else 0.0
+        # Normalised length term of the BM25 denominator, once per chunk
+        self._norm = (BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / (self.avgdl or 1))).astype(np.float32)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        postings = {}
+        symbols = {}
+        doc_len = []
+
+        for pos, chunk in enumerate(chunks):
+            terms = tokenize(chunk["text"])
+            doc_len.append(len(terms))
+
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((pos, tf))
+
+            for symbol in chunk_symbols(chunk):
+                symbols.setdefault(symbol, []).append((pos, 1))
+
+        vocab = sorted(postings.keys() | symbols.keys())
+        indptr, docs, tfs = _csr([postings.get(t, ()) for t in vocab], len(vocab))
+        sym_indptr, sym_docs, _ = _csr([symbols.get(t, ()) for t in vocab], len(vocab))
+
+        return cls(vocab, {
+            "indptr": indptr, "docs": docs, "tfs": tfs,
+            "doc_len": np.asarray(doc_len, dtype=np.int32),
+            "sym_indptr": sym_indptr, "sym_docs": sym_docs,
+        })
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+
+    def save(self, path):
+        # Stored as int32 like every other .col segment
+        write_arrays(path, self.terms, {
+            "indptr": self.indptr, "docs": self.docs, "tfs": self.tfs,
+            "doc_len": self.doc_len,
+            "sym_indptr": self.sym_indptr, "sym_docs": self.sym_docs,
+        })
+
+    @classmethod
+    def load(cls, path):
+        source = MappedFile(path)
+        names = ("indptr", "docs", "tfs", "doc_len", "sym_indptr", "sym_docs")
+        return cls(source.strings(), {name: source.array(name) for name in names}, source=source)
+
+    def close(self):
+        """Unmaps a loaded index; one built in memory has nothing to release."""
+        if self._source is not None:
+            self._source.close()
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def symbol(self, query, k=None):
+        """
+        Up to k chunk positions defining exactly the queried symbol, best
+        BM25 match first, or [] when the query is not a single identifier
+        or doctype name. Common names (`validate`) are defined in hundreds
+        of chunks, so the ranking decides which few are returned.
+        """
+        match = _SYMBOL_QUERY.match(query.strip().strip("`?").removesuffix("()").strip())
+        if not match:
+            return []
+
+        i = self.term_ids.get(symbol_key(match["name"]), -1)
+        if i < 0:
+            return []
+
+        docs = self.sym_docs[self.sym_indptr[i]:self.sym_indptr[i + 1]]
+        if len(docs) > 1:
+            scores = self.scores(query)[docs]
+            docs = docs[np.lexsort((docs, -scores))]
+        return docs[:k].tolist()
+
+    def scores(self, query):
+        """BM25 score of every chunk for the query."""
+        scores = np.zeros(self.count, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            i = self.term_ids.get(term, -1)
+            if i < 0:
+                continue
+            start, end = self.indptr[i], self.indptr[i + 1]
+            if start == end:
+                continue
+
+            docs = self.docs[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log(1 + (self.count - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + self._norm[docs])
+
+        return scores
+
+    def search(self, query, k=5):
+        """Top-k (position, score) pairs with a positive BM25 score."""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.lexsort((matched, -scores[matched]))]
+        return [(int(i), float(scores[i])) for i in order]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Fuses ranked lists of chunk positions: score(d) = sum 1 / (k + rank).
+    Returns [(position, score)] best first; ties keep first-seen order.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, pos in enumerate(ranking):
+            fused[pos] = fused.get(pos, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+def load_lexical(module, chunks, chunks_path, data_dir=DATA_DIR):
+    """
+    Opens the saved index when it matches the chunk file, else builds one
+    in memory from the chunks already loaded.
+    """
+    path = lexical_path(module, data_dir)
+    try:
+        if os.stat(path).st_mtime_ns >= os.stat(chunks_path).st_mtime_ns:
+            index = LexicalIndex.load(path)
+            if index.count == len(chunks):
+                return index
+            index.close()
+    except (OSError, ValueError, KeyError):
+        pass
+    return LexicalIndex.from_chunks(chunks)
+
+
+def build_lexical(module, data_dir=DATA_DIR):
+    from rag.chunker import load_chunks
+
+    index = LexicalIndex.from_chunks(load_chunks(module, data_dir))
+    path = lexical_path(module, data_dir)
+    index.save(path)
+    return index, path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python rag/lexical.py <module> [query]")
+        print(" Example: python rag/lexical.py accounts make_gl_entries")
+        sys.exit(1)
+
+    module = sys.argv[1]
+    index, path = build_lexical(module)
+    print(f"✅ Lexical index built for module: {module} ({len(index.terms)} terms, {len(index.docs)} postings) -> {path}")
+
+    if len(sys.argv) > 2:
+        query = " ".join(sys.argv[2:])
+        started = time.perf_counter()
+        hits = index.symbol(query) or [pos for pos, _ in index.search(query)]
+        elapsed = time.perf_counter() - started
+        print(f"🔍 {len(hits)} hits for {query!r} ({elapsed * 1e6:.0f} µs): {hits[:10]}")
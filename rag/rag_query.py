@@ -1,17 +1,125 @@
-from rag.retriever import search
+import asyncio
+from collections import namedtuple
+
+from config import CONTEXT_POOL_K
 from llm.safe_generate import safe_generate
+from llm.router import get_router
+from rag.answer_cache import get_answer_cache
+from rag.context import context_budget, pack_context
+from rag.retriever import get_retriever
 
-def answer(question, module):
-    context = "\n".join(search(question, module))
 
-    prompt = f"""
+def build_prompt(question, module, context, history=()):
+    conversation = ""
+    if history:
+        turns = "\n".join(f"{m['role']}: {m['content']}" for m in history)
+        conversation = f"\n## Conversation so far\n{turns}\n"
+
+    return f"""
 You are an expert on the ERPNext {module} module.
 
 ## Context
 {context}
-
+{conversation}
 ## Question
 {question}
 """
 
-    return safe_generate(prompt)
+
+def retrieval_query(question, history=()):
+    """
+    Follow-ups ("and for purchase invoices?") retrieve nothing useful on
+    their own, so the previous question is searched along with them. The
+    exact-symbol lookup still sees the bare question (see lookup).
+    """
+    previous = [m["content"] for m in history if m["role"] == "user"][-1:]
+    return "\n".join(previous + [question])
+
+
+Prepared = namedtuple("Prepared", "prompt cached remember context")
+
+
+def lookup(query, module, k=CONTEXT_POOL_K, symbol_query=None):
+    """
+    Retrieved hits, the generation (file stamp) of the index that served
+    them, and whether the query was embedded (exact-symbol queries are not).
+    """
+    retriever = get_retriever()
+    hits, timings = retriever.search_with_timings(query, module, k, symbol_query=symbol_query)
+    return hits, retriever.get(module).stamp, "embed" in timings
+
+
+def question_vector(question):
+    # Same cached embedding the retriever used for the query
+    return get_retriever().embed_fn(question)
+
+
+def prepare(question, module, model, history=(), cache=None):
+    """
+    Retrieval, context packing and answer-cache lookup.
+
+    Returns Prepared(prompt, cached answer or None, remember, context):
+    remember(reply, model) stores a freshly generated answer in the cache
+    under the model that produced it (a fallback provider's answer is not
+    served as the primary's) and context is the PackedContext that went
+    into the prompt.
+    """
+    hits, generation, embedded = lookup(retrieval_query(question, history), module, symbol_query=question)
+
+    turns = [m["content"] for m in history]
+    context = pack_context(hits, context_budget(model, question, *turns))
+    prompt = build_prompt(question, module, context.text, history)
+
+    # Answers shaped by earlier turns are not reusable by other sessions
+    if cache is None or history:
+        return Prepared(prompt, None, lambda reply, answered_by=None: None, context)
+
+    key = cache.key(module, question, context.hits, model)
+    # Similar-question lookups reuse the query embedding; never add one just for them
+    vector = question_vector(question) if cache.similarity and embedded else None
+    cached = cache.get(key, generation, vector)
+
+    def remember(reply, answered_by=None):
+        answer_key = cache.key(module, question, context.hits, answered_by or model)
+        cache.put(answer_key, generation, reply, vector)
+
+    return Prepared(prompt, cached, remember, context)
+
+
+def answer(question, module):
+    prompt, cached, remember, _ = prepare(question, module, get_router().model, cache=get_answer_cache())
+    if cached is not None:
+        return cached
+
+    answered_by = {}
+    reply = safe_generate(prompt, answered_by)
+    remember(reply, answered_by.get("model"))
+    return reply
+
+
+async def answer_async(question, module, client, history=(), cache=None):
+    # Retrieval blocks on FAISS and the query embedding, so it runs off the event loop
+    prompt, cached, remember, _ = await asyncio.to_thread(prepare, question, module, client.model, history, cache)
+    if cached is not None:
+        return cached
+
+    answered_by = {}
+    reply = await client.generate(prompt, answered_by)
+    remember(reply, answered_by.get("model"))
+    return reply
+
+
+async def stream_answer(question, module, client, history=(), cache=None):
+    """Async generator of answer tokens, streamed from the LLM as produced."""
+    prompt, cached, remember, _ = await asyncio.to_thread(prepare, question, module, client.model, history, cache)
+    if cached is not None:
+        yield cached
+        return
+
+    tokens, answered_by = [], {}
+    async for token in client.stream(prompt, answered_by):
+        tokens.append(token)
+        yield token
+
+    # Only complete answers are cached; an abandoned stream never gets here
+    remember("".join(tokens), answered_by.get("model"))
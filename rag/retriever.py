@@ -1,19 +1,297 @@
+import os
+import time
+import threading
+
 import faiss
-import json
 import numpy as np
 from llm.ollama_embed import embed
+from rag.chunker import chunk_path, read_chunk_file
+from rag.embedding_cache import cached, get_cache
+from rag.index_factory import check_index_version, index_ids
+from rag.lexical import RRF_K, load_lexical, reciprocal_rank_fusion
+
+DATA_DIR = "data"
+VECTOR_DIR = "vector_db"
+
+SEARCH_MODES = ("hybrid", "vector", "lexical")
+
+# Each ranking contributes this many candidates per requested hit to the fusion
+FUSION_DEPTH = 4
+
+
+def _stamp(*paths):
+    """Identity of the files a module was loaded from; changes on rewrite."""
+    stamp = []
+    for path in paths:
+        st = os.stat(path)
+        stamp.append((st.st_mtime_ns, st.st_size, st.st_ino))
+    return tuple(stamp)
+
+
+def read_index(path):
+    """
+    Memory-maps the index where FAISS supports it, so the OS page cache
+    shares one copy between every worker process serving the same module.
+    """
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+class ModuleIndex:
+    """A module's FAISS index and chunk table, loaded once and kept resident."""
+
+    def __init__(self, module, index_path, chunks_path):
+        self.module = module
+        self.stamp = _stamp(index_path, chunks_path)
+        check_index_version(index_path)
+        self.index = read_index(index_path)
+        self.chunks = read_chunk_file(chunks_path)
+
+        if self.index.ntotal != len(self.chunks):
+            raise ValueError(
+                f"Index/chunk mismatch for {module}: "
+                f"{self.index.ntotal} vectors vs {len(self.chunks)} chunks"
+            )
+
+        # Id-addressed indexes return stable chunk ids; legacy flat indexes
+        # return positions into the chunk list
+        stored = index_ids(self.index)
+        self.positions = None
+        if stored is not None:
+            self.positions = {chunk["id"]: pos for pos, chunk in enumerate(self.chunks)}
+            if set(stored.tolist()) != self.positions.keys():
+                raise ValueError(f"Index/chunk id mismatch for {module}")
+
+        self.lexical = load_lexical(module, self.chunks, chunks_path, os.path.dirname(chunks_path))
+
+    def position(self, i):
+        """Chunk-list position of a FAISS result (a stable id or a position)."""
+        return self.positions[int(i)] if self.positions is not None else int(i)
+
+    def chunk(self, i):
+        return self.chunks[self.position(i)]
+
+    def close(self):
+        self.lexical.close()
+
+
+class Retriever:
+    """
+    Long-lived retriever shared by every request in a process.
+
+    Each module's index and chunk table is loaded on first use and reused
+    afterwards. Before each query the files are stat'ed, and a module is
+    hot-reloaded when rag/vector_store.py or rag/chunker.py has rewritten
+    them. While the pair is mid-rewrite (sizes disagree) the previously
+    loaded copy keeps serving.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, vector_dir=VECTOR_DIR, embed_fn=None):
+        self.data_dir = data_dir
+        self.vector_dir = vector_dir
+        # Repeated questions reuse their query embedding from the shared cache
+        self.embed_fn = embed_fn or cached(embed, get_cache())
+        self._modules = {}
+        # key -> (stamp, error) of a file pair that failed to load, so it
+        # is not re-read on every query until the files change again
+        self._failed = {}
+        self._lock = threading.Lock()
+
+    def paths(self, module):
+        return (
+            os.path.join(self.vector_dir, f"{module}.index"),
+            chunk_path(module, self.data_dir),
+        )
+
+    def _load(self, key, paths, loader):
+        loaded = self._modules.get(key)
+
+        try:
+            stamp = _stamp(*paths)
+        except FileNotFoundError:
+            if loaded:
+                return loaded
+            raise FileNotFoundError(f"No vector index built for module: {key}")
+
+        if loaded and loaded.stamp == stamp:
+            return loaded
+
+        with self._lock:
+            loaded = self._modules.get(key)
+            if loaded and loaded.stamp == stamp:
+                return loaded
+
+            failed = self._failed.get(key)
+            if failed and failed[0] == stamp:
+                if loaded:
+                    return loaded
+                raise failed[1]
+
+            try:
+                fresh = loader(key, *paths)
+            except ValueError as e:
+                self._failed[key] = (stamp, e)
+                if loaded:
+                    return loaded
+                raise
+
+            self._failed.pop(key, None)
+            # The replaced copy is not closed here: searches already running
+            # may still read it, and it is released once the last one drops it
+            self._modules[key] = fresh
+            return fresh
+
+    def get(self, module):
+        return self._load(module, self.paths(module), ModuleIndex)
+
+    def get_global(self):
+        from rag.global_index import GLOBAL_NAME, GlobalIndex, global_paths
+        return self._load(GLOBAL_NAME, global_paths(self.data_dir, self.vector_dir), GlobalIndex)
+
+    def warm(self, modules):
+        for module in modules:
+            self.get(module)
+
+    def invalidate(self, module=None):
+        with self._lock:
+            if module is None:
+                self._modules.clear()
+                self._failed.clear()
+            else:
+                self._modules.pop(module, None)
+                self._failed.pop(module, None)
+
+    def close(self):
+        """Releases every loaded entry's files; for process shutdown, when no search is running."""
+        with self._lock:
+            entries = list(self._modules.values())
+            self._modules.clear()
+            self._failed.clear()
+
+        for entry in entries:
+            close = getattr(entry, "close", None)
+            if close is not None:
+                close()
+
+    def search_with_timings(self, query, module, k=5, mode="hybrid", symbol_query=None):
+        """
+        Returns (hits, timings). Each hit is the chunk dict plus its rank
+        and score; timings are per-stage seconds.
+
+        mode "vector" is dense search only (score is the L2 distance),
+        "lexical" is BM25 only, and "hybrid" fuses both rankings with
+        reciprocal-rank fusion (score is the fused score). Queries naming
+        an exact symbol (`make_gl_entries`, `Repost Item Valuation`) are
+        answered from the lexical symbol table without an embedding call.
+        Each hit's score_kind ("distance", "similarity" or "rank") tells
+        rag/context.py which way its score points.
+
+        symbol_query, when given, is matched against the symbol table
+        instead of query (e.g. a follow-up question without the earlier
+        turn that query was widened with).
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        timings = {}
+
+        started = time.perf_counter()
+        entry = self.get(module)
+        timings["load"] = time.perf_counter() - started
+
+        if mode == "vector":
+            ranked = self._vector(entry, query, k, timings)
+            score_kind = "distance"
+        else:
+            started = time.perf_counter()
+            symbols = entry.lexical.symbol(symbol_query or query, k)
+            exact = bool(symbols) or mode == "lexical"
+            lexical = entry.lexical.search(query, k + len(symbols) if exact else k * FUSION_DEPTH)
+
+            if exact:
+                # Exact definitions first, then the best BM25 matches
+                scores = dict(lexical)
+                ranked = [(pos, scores.get(pos, 0.0)) for pos in symbols]
+                ranked += [(pos, score) for pos, score in lexical if pos not in set(symbols)]
+                ranked = ranked[:k]
+                score_kind = "similarity"
+            timings["lexical"] = time.perf_counter() - started
+
+            if not exact:
+                vector = self._vector(entry, query, k * FUSION_DEPTH, timings)
+
+                started = time.perf_counter()
+                ranked = reciprocal_rank_fusion(
+                    [[pos for pos, _ in vector], [pos for pos, _ in lexical]], RRF_K
+                )[:k]
+                score_kind = "rank"
+                timings["fuse"] = time.perf_counter() - started
+
+        return self._hydrate(ranked, entry.chunks.__getitem__, score_kind, timings), timings
+
+    def _dense(self, query, search, k, timings):
+        """Embeds query and runs search(qvec, k): [(FAISS id, L2 distance)] best first."""
+        started = time.perf_counter()
+        qvec = np.array([self.embed_fn(query)]).astype("float32")
+        timings["embed"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        distances, indices = search(qvec, k)
+        timings["search"] = time.perf_counter() - started
+
+        return [(int(i), float(distance)) for i, distance in zip(indices[0], distances[0]) if i >= 0]
+
+    def _vector(self, entry, query, k, timings):
+        """Dense search: [(position, L2 distance)] best first."""
+        return [(entry.position(i), distance)
+                for i, distance in self._dense(query, entry.index.search, k, timings)]
+
+    def _hydrate(self, ranked, row, score_kind, timings):
+        """Hits for [(key, score)] best first; row(key) gives the chunk dict."""
+        started = time.perf_counter()
+        hits = [dict(row(key), rank=rank, score=score, score_kind=score_kind)
+                for rank, (key, score) in enumerate(ranked)]
+        timings["hydrate"] = time.perf_counter() - started
+        return hits
+
+    def search(self, query, module, k=5, mode="hybrid"):
+        hits, _ = self.search_with_timings(query, module, k, mode)
+        return [hit["text"] for hit in hits]
+
+    def search_global_with_timings(self, query, k=5, modules=None, doctypes=None):
+        """
+        One filtered search over the combined index built by
+        rag/global_index.py, covering any subset of modules/doctypes.
+        """
+        timings = {}
+
+        started = time.perf_counter()
+        entry = self.get_global()
+        timings["load"] = time.perf_counter() - started
+
+        ranked = self._dense(query, lambda qvec, k: entry.search(qvec, k, modules, doctypes), k, timings)
+        return self._hydrate(ranked, entry.table.row, "distance", timings), timings
+
+    def search_global(self, query, k=5, modules=None, doctypes=None):
+        hits, _ = self.search_global_with_timings(query, k, modules, doctypes)
+        return [hit["text"] for hit in hits]
+
+
+_default_retriever = None
+_default_lock = threading.Lock()
 
-def search(query, module, k=5):
-    index = faiss.read_index(f"vector_db/{module}.index")
 
-    with open(f"data/{module}_chunks.json", "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+def get_retriever():
+    global _default_retriever
 
-    qvec = np.array([embed(query)]).astype("float32")
-    _, indices = index.search(qvec, k)
+    if _default_retriever is None:
+        with _default_lock:
+            if _default_retriever is None:
+                _default_retriever = Retriever()
+    return _default_retriever
 
-    results = []
-    for i in indices[0]:
-        results.append(chunks[i]["text"])
 
-    return results
+def search(query, module, k=5, mode="hybrid"):
+    return get_retriever().search(query, module, k, mode)
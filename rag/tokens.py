@@ -0,0 +1,6 @@
+def estimate_tokens(text):
+    """
+    Fast prompt-token estimate: ~4 characters per token, the usual ratio
+    for BPE tokenizers on English and code. Cheap enough to call per chunk.
+    """
+    return (len(text) + 3) // 4
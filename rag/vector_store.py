@@ -1,4 +1,3 @@
-import json
 import sys
 import os
 import faiss
@@ -7,35 +6,102 @@ import numpy as np
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from llm.ollama_embed import embed
+from rag.chunker import diff_chunks, load_chunks
+from rag.embedder import EmbeddingPipeline
+from rag.embedding_cache import get_cache
+from config import EMBED_VERSION
+from rag.index_factory import (INDEX_TYPES, create_index, index_ids, index_type_of, index_version, save_index,
+                               supports_removal)
 
 
 DATA_DIR = "data"
 VECTOR_DIR = "vector_db"
 
-def build_index(module):
-    chunk_file = f"{DATA_DIR}/{module}_chunks.json"
 
-    with open(chunk_file, "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+def index_path_for(module):
+    return f"{VECTOR_DIR}/{module}.index"
 
-    vectors = []
-    for chunk in chunks:
-        vectors.append(embed(chunk["text"]))
 
-    vectors = np.array(vectors).astype("float32")
+def _embed(texts):
+    cache = get_cache()
+    pipeline = EmbeddingPipeline(cache=cache)
+    vectors = pipeline.embed_all(texts)
 
-    index = faiss.IndexFlatL2(vectors.shape[1])
-    index.add(vectors)
+    stats = pipeline.stats
+    print(f"Embedded {stats['texts']} chunks in {stats['seconds']:.1f}s "
+          f"({stats['requests']} requests, {stats['retries']} retries, "
+          f"{cache.hits} cache hits, {cache.misses} misses)")
+    return vectors
 
-    os.makedirs(VECTOR_DIR, exist_ok=True)
-    faiss.write_index(index, f"{VECTOR_DIR}/{module}.index")
 
-    print(f"✅ Vector index built for module: {module}")
+def build_index(module, index_type="auto"):
+    chunks = load_chunks(module, DATA_DIR)
+
+    vectors = _embed(chunk["text"] for chunk in chunks)
+
+    # Chunks from rag/chunker.py carry stable ids; older files are positional
+    ids = [chunk["id"] for chunk in chunks] if chunks and "id" in chunks[0] else None
+    index = create_index(vectors, index_type, ids=ids)
+
+    save_index(index, index_path_for(module))
+
+    print(f"✅ Vector index built for module: {module} ({index_type_of(index)}, {index.ntotal} vectors)")
+    return index
+
+
+def update_index(module):
+    """
+    Applies the difference between the chunks in the existing index and the
+    current data/<module>_chunks.jsonl: removed chunk ids are dropped, new
+    ones embedded and added. Unchanged chunks are not touched.
+
+    Falls back to a full build when there is no id-addressed index yet, the
+    index type cannot remove vectors (HNSW), or the index was embedded with
+    another model or endpoint (EMBED_VERSION).
+    """
+    path = index_path_for(module)
+    chunks = load_chunks(module, DATA_DIR)
+
+    if not os.path.exists(path) or not chunks or "id" not in chunks[0]:
+        return build_index(module)
+
+    index = faiss.read_index(path)
+
+    if index_version(path) != EMBED_VERSION:
+        print(f"Index for {module} was embedded with {index_version(path) or 'an older version'}; rebuilding")
+        return build_index(module, index_type_of(index))
+
+    stored = index_ids(index)
+
+    if stored is None or not supports_removal(index):
+        print(f"Index for {module} is not id-addressable or removable; rebuilding")
+        return build_index(module, index_type_of(index))
+
+    added, removed, unchanged = diff_chunks([{"id": int(i)} for i in stored], chunks)
+
+    if removed:
+        index.remove_ids(np.asarray(removed, dtype=np.int64))
+    if added:
+        vectors = _embed(chunk["text"] for chunk in added)
+        index.add_with_ids(vectors, np.asarray([c["id"] for c in added], dtype=np.int64))
+
+    save_index(index, path)
+
+    print(f"✅ Vector index updated for module: {module} "
+          f"(+{len(added)} / -{len(removed)}, {unchanged} unchanged)")
+    return index
+
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python module_vector_store.py <module>")
+    args = sys.argv[1:]
+    update = "--update" in args
+    args = [a for a in args if a != "--update"]
+
+    if not args or (len(args) > 1 and args[1] not in INDEX_TYPES):
+        print("Usage: python rag/vector_store.py <module> [" + "|".join(INDEX_TYPES) + "] [--update]")
         sys.exit(1)
 
-    build_index(sys.argv[1])
+    if update:
+        update_index(args[0])
+    else:
+        build_index(args[0], args[1] if len(args) > 1 else "auto")
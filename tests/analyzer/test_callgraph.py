@@ -0,0 +1,124 @@
+import os
+
+from Analyzer.analyzer import analyze_source
+from Analyzer.callgraph import CallGraph, build_callgraph, callgraph_path, load_callgraph
+from Analyzer.store import save_table, table_path
+from Analyzer.relationships import analyze_relationships, find_orphans
+
+
+def write_package(root):
+    pkg = root / "shop"
+    (pkg / "doctype" / "sales_order").mkdir(parents=True)
+    for directory in (pkg, pkg / "doctype", pkg / "doctype" / "sales_order"):
+        (directory / "__init__.py").write_text("")
+
+    (pkg / "controller.py").write_text(
+        "class BaseController:\n"
+        "    def validate(self):\n"
+        "        pass\n"
+    )
+    (pkg / "doctype" / "sales_order" / "sales_order.py").write_text(
+        "import frappe\n"
+        "from shop.controller import BaseController\n"
+        "\n"
+        "class SalesOrder(BaseController):\n"
+        "    def on_submit(self):\n"
+        "        self.validate()\n"
+        "        helper()\n"
+        "\n"
+        "def helper():\n"
+        "    def inner():\n"
+        "        frappe.throw('x')\n"
+        "    inner()\n"
+        "\n"
+        "def submit_order(name):\n"
+        "    frappe.get_doc('Sales Order', name).on_submit()\n"
+    )
+    return pkg
+
+
+def analyze_package(pkg):
+    data = {"functions": [], "classes": [], "calls": []}
+    for path in sorted(pkg.rglob("*.py")):
+        result = analyze_source(path.read_text(), str(path))
+        for kind in data:
+            data[kind].extend(result[kind])
+    return data
+
+
+def test_calls_are_attributed_to_innermost_function(tmp_path):
+    data = analyze_package(write_package(tmp_path))
+    by_callee = {c["callee"]: c["caller_qname"] for c in data["calls"]}
+
+    module = "shop.doctype.sales_order.sales_order"
+    assert by_callee["throw"] == f"{module}.helper.inner"
+    assert by_callee["inner"] == f"{module}.helper"
+    assert by_callee["helper"] == f"{module}.SalesOrder.on_submit"
+
+
+def test_qualified_names_and_resolution(tmp_path):
+    data = analyze_package(write_package(tmp_path))
+    module = "shop.doctype.sales_order.sales_order"
+
+    assert f"{module}.SalesOrder.on_submit" in {f["qualname"] for f in data["functions"]}
+
+    graph = build_callgraph(data["functions"], data["classes"], data["calls"])
+
+    # self.validate() resolves through the imported base class
+    assert "shop.controller.BaseController.validate" in graph.callees_of(f"{module}.SalesOrder.on_submit")
+    # frappe.get_doc("Sales Order", ...).on_submit() resolves to the controller
+    assert graph.callees_of(f"{module}.submit_order") == [
+        "frappe.get_doc", f"{module}.SalesOrder.on_submit"
+    ]
+    assert graph.callers_of(f"{module}.helper") == [f"{module}.SalesOrder.on_submit"]
+
+    doctype_calls = [c for c in data["calls"] if c.get("doctype")]
+    assert doctype_calls[0]["doctype"] == "Sales Order"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    graph = CallGraph.from_edges([("a", "b"), ("a", "c"), ("c", "b")], nodes=["d"])
+    path = str(tmp_path / "callgraph.col")
+    graph.save(path)
+
+    loaded = CallGraph.load(path)
+    assert loaded.callees_of("a") == ["b", "c"]
+    assert loaded.callers_of("b") == ["a", "c"]
+    assert loaded.callees_of("d") == []
+    assert loaded.callers_of("missing") == []
+
+
+def test_relationships_use_the_call_graph():
+    adjacency = analyze_relationships(["a", "b", "c"], [("b", "c"), ("a", "c"), ("a", "b"), ("a", "c")])
+
+    assert isinstance(adjacency, CallGraph)
+    assert dict(adjacency) == {"a": ["b", "c"], "b": ["c"]}
+    assert adjacency.callers_of("c") == ["a", "b"]
+    assert find_orphans(["a", "b", "c"], adjacency) == ["c"]
+
+
+def test_unresolved_attribute_calls_stay_out_of_the_graph():
+    code = "def collect(rows):\n    out = []\n    out.append(rows.get('x'))\n    helper()\n"
+    data = analyze_source(code, "shop/utils.py")
+
+    assert {c["callee"] for c in data["calls"]} == {"append", "get", "helper"}
+    graph = build_callgraph(data["functions"], data["classes"], data["calls"])
+    assert graph.callees_of("utils.collect") == ["helper"]
+    assert not any(name.startswith("?") for name in graph.names)
+
+
+def test_stale_callgraph_is_rebuilt(tmp_path):
+    folder = str(tmp_path)
+    calls = [{"caller_qname": "a", "callee_qname": "b"}]
+    save_table("shop", "functions", [{"qualname": "a"}, {"qualname": "b"}], folder)
+    save_table("shop", "classes", [], folder)
+    save_table("shop", "calls", calls, folder)
+    assert load_callgraph("shop", folder).callees_of("a") == ["b"]
+
+    path = callgraph_path("shop", folder)
+    st = os.stat(path)
+    save_table("shop", "calls", calls + [{"caller_qname": "a", "callee_qname": "c"}], folder)
+    os.utime(table_path("shop", "calls", folder) + ".col", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    assert load_callgraph("shop", folder).callees_of("a") == ["b", "c"]
+    assert CallGraph.load(path).callees_of("a") == ["b", "c"]
@@ -0,0 +1,62 @@
+import os
+
+import Analyzer.indexer as indexer
+from Analyzer.indexer import build_index
+
+
+def write_module(root):
+    pkg = root / "pkg"
+    pkg.mkdir()
+    (pkg / "a.py").write_text("def alpha():\n    beta()\n\n\ndef beta():\n    pass\n")
+    (pkg / "b.py").write_text("class Gamma:\n    def delta(self):\n        pass\n")
+    return pkg
+
+
+def test_first_run_parses_every_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer, "CACHE_FOLDER", str(tmp_path / "cache"))
+    pkg = write_module(tmp_path)
+
+    data, stats = build_index(str(pkg), "pkg", workers=1)
+
+    assert stats["parsed"] == 2
+    assert {fn["name"] for fn in data["functions"]} == {"alpha", "beta", "delta"}
+    assert [c["name"] for c in data["classes"]] == ["Gamma"]
+    assert [c["callee"] for c in data["calls"]] == ["beta"]
+
+
+def test_rerun_only_reparses_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer, "CACHE_FOLDER", str(tmp_path / "cache"))
+    pkg = write_module(tmp_path)
+    build_index(str(pkg), "pkg", workers=1)
+
+    (pkg / "a.py").write_text("def alpha_renamed():\n    pass\n")
+    data, stats = build_index(str(pkg), "pkg", workers=1)
+
+    assert stats["parsed"] == 1
+    assert stats["reused"] == 1
+    assert {fn["name"] for fn in data["functions"]} == {"alpha_renamed", "delta"}
+
+
+def test_touched_file_with_same_content_is_not_reparsed(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer, "CACHE_FOLDER", str(tmp_path / "cache"))
+    pkg = write_module(tmp_path)
+    build_index(str(pkg), "pkg", workers=1)
+
+    st = os.stat(pkg / "b.py")
+    os.utime(pkg / "b.py", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    _, stats = build_index(str(pkg), "pkg", workers=1)
+
+    assert stats["parsed"] == 0
+    assert stats["reused"] == 2
+
+
+def test_deleted_files_drop_out_of_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexer, "CACHE_FOLDER", str(tmp_path / "cache"))
+    pkg = write_module(tmp_path)
+    build_index(str(pkg), "pkg", workers=1)
+
+    (pkg / "b.py").unlink()
+    data, stats = build_index(str(pkg), "pkg", workers=1)
+
+    assert stats["removed"] == 1
+    assert data["classes"] == []
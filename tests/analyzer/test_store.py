@@ -0,0 +1,77 @@
+import json
+import os
+
+from Analyzer.store import ColumnarTable, load_table, open_table, save_table, write_table
+
+SCHEMA = [("name", "str"), ("file", "str"), ("line", "int32")]
+
+FUNCTIONS = [
+    {"name": "make_gl_entries", "file": "erpnext/accounts/general_ledger.py", "line": 31},
+    {"name": "validate", "file": "erpnext/accounts/general_ledger.py", "line": 120},
+    {"name": "validate", "file": "erpnext/stock/stock_ledger.py", "line": 7},
+]
+
+
+def test_round_trip_preserves_records(tmp_path):
+    path = str(tmp_path / "functions.col")
+    write_table(path, FUNCTIONS, SCHEMA)
+
+    with ColumnarTable(path) as table:
+        assert len(table) == 3
+        assert list(table) == FUNCTIONS
+        assert table[-1] == FUNCTIONS[-1]
+        assert table.column("line") == [31, 120, 7]
+
+
+def test_strings_are_interned(tmp_path):
+    path = str(tmp_path / "functions.col")
+    write_table(path, FUNCTIONS, SCHEMA)
+
+    with ColumnarTable(path) as table:
+        # 2 distinct names + 2 distinct files
+        assert table.string_count == 4
+        assert table.codes("file").tolist() == [1, 1, 3]
+        assert table.string(table.string_id("validate")) == "validate"
+
+
+def test_empty_table(tmp_path):
+    path = str(tmp_path / "calls.col")
+    write_table(path, [], [("caller", "str"), ("callee", "str")])
+
+    with ColumnarTable(path) as table:
+        assert len(table) == 0
+        assert list(table) == []
+
+
+def test_load_table_prefers_fresh_columnar_file(tmp_path):
+    with open(tmp_path / "accounts_functions.json", "w") as f:
+        json.dump(FUNCTIONS[:1], f)
+
+    assert load_table("accounts", "functions", str(tmp_path)) == FUNCTIONS[:1]
+
+    save_table("accounts", "functions", FUNCTIONS, str(tmp_path))
+    table = load_table("accounts", "functions", str(tmp_path))
+    assert isinstance(table, ColumnarTable)
+    assert len(table) == 3
+    assert table[0]["qualname"] == ""
+    assert table[0]["end_line"] == -1
+    table.close()
+
+    # A newer JSON file wins over a stale columnar one
+    json_path = tmp_path / "accounts_functions.json"
+    st = os.stat(tmp_path / "accounts_functions.col")
+    os.utime(json_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_table("accounts", "functions", str(tmp_path)) == FUNCTIONS[:1]
+
+
+def test_open_table_closes_the_columnar_file(tmp_path):
+    save_table("accounts", "functions", FUNCTIONS, str(tmp_path))
+    with open_table("accounts", "functions", str(tmp_path)) as table:
+        assert len(table) == 3
+    assert table._file.closed
+
+    os.remove(tmp_path / "accounts_functions.col")
+    with open(tmp_path / "accounts_functions.json", "w") as f:
+        json.dump(FUNCTIONS[:1], f)
+    with open_table("accounts", "functions", str(tmp_path)) as table:
+        assert table == FUNCTIONS[:1]
@@ -0,0 +1,236 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect, Request
+
+import api
+import llm.async_client as async_client
+import rag.rag_query as rag_query
+from llm.async_client import AsyncLLMClient
+from llm.router import Router
+from rag.answer_cache import AnswerCache
+
+
+def ollama_reply(tokens, calls=None):
+    def handler(request):
+        if calls is not None:
+            calls.append(request)
+        lines = [json.dumps({"message": {"content": t}, "done": False}) for t in tokens]
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+    return handler
+
+
+@pytest.fixture
+def client(monkeypatch):
+    prompts, symbol_queries = [], []
+
+    def fake_lookup(query, module, k=5, symbol_query=None):
+        prompts.append((query, module))
+        symbol_queries.append(symbol_query)
+        return [{"id": 7, "text": f"Function make_gl_entries in {module}/general_ledger.py"}], (1, 2, 3), True
+
+    monkeypatch.setattr(rag_query, "lookup", fake_lookup)
+
+    with TestClient(api.app) as test_client:
+        api.app.state.llm_calls = []
+        api.app.state.llm = AsyncLLMClient(Router(route=["ollama"]), transport=httpx.MockTransport(
+            ollama_reply(["Entries ", "are ", "posted."], api.app.state.llm_calls)))
+        api.app.state.answers = AnswerCache(similarity=0)
+        api.app.state.symbol_queries = symbol_queries
+        yield test_client, prompts
+
+
+def test_ask_returns_full_answer(client):
+    test_client, prompts = client
+
+    response = test_client.post("/ask", json={"question": "How are GL entries made?", "module": "accounts"})
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "Entries are posted."
+    assert prompts == [("How are GL entries made?", "accounts")]
+
+
+def test_follow_up_questions_share_a_session(client):
+    test_client, prompts = client
+
+    first = test_client.post("/ask", json={"question": "How are GL entries made?", "module": "accounts"})
+    session_id = first.headers["X-Session-Id"]
+    assert first.json()["session_id"] == session_id
+
+    test_client.post("/ask", json={"question": "And on cancel?", "module": "accounts", "session_id": session_id})
+    other = test_client.post("/ask", json={"question": "What is a Bin?", "module": "stock"})
+
+    # The follow-up is retrieved together with the previous question; other sessions are untouched
+    assert prompts[1] == ("How are GL entries made?\nAnd on cancel?", "accounts")
+    # Symbols are still looked up in the bare follow-up
+    assert api.app.state.symbol_queries[1] == "And on cancel?"
+    assert prompts[2] == ("What is a Bin?", "stock")
+    assert other.headers["X-Session-Id"] != session_id
+    assert len(api.app.state.conversations.history(session_id)) == 4
+
+
+def test_stream_emits_server_sent_events(client):
+    test_client, _ = client
+
+    with test_client.stream("POST", "/stream", json={"question": "q", "module": "accounts"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [e for e in body.split("\n\n") if e]
+    assert [json.loads(e[len("data: "):])["token"] for e in events[:-1]] == ["Entries ", "are ", "posted."]
+    assert events[-1].startswith("event: done")
+    assert test_client.get("/health").json()["free_slots"] == api.API_MAX_CONCURRENT
+
+
+def test_stream_slot_is_released_when_the_client_is_gone_before_streaming(client):
+    test_client, _ = client
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    async def run():
+        request = Request({"type": "http", "headers": []}, receive)
+        response = await api.stream(api.Question(question="q", module="accounts"), request)
+        assert api.app.state.in_flight == 1
+
+        # The body generator is never iterated
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+    asyncio.run(run())
+    assert test_client.get("/health").json()["free_slots"] == api.API_MAX_CONCURRENT
+
+
+def test_saturated_worker_answers_503(client, monkeypatch):
+    test_client, _ = client
+    monkeypatch.setattr(api, "API_QUEUE_TIMEOUT", 0.01)
+    api.app.state.slots = asyncio.Semaphore(0)
+
+    response = test_client.post("/ask", json={"question": "q", "module": "accounts"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_empty_question_is_rejected(client):
+    test_client, _ = client
+    assert test_client.post("/ask", json={"question": " ", "module": "accounts"}).status_code == 400
+
+
+def test_repeated_question_is_answered_from_cache(client):
+    test_client, _ = client
+
+    for question in ("How are GL entries made?", "how are GL entries made"):
+        response = test_client.post("/ask", json={"question": question, "module": "accounts"})
+        assert response.json()["answer"] == "Entries are posted."
+
+    with test_client.stream("POST", "/stream", json={"question": "How are GL entries made?", "module": "accounts"}) as r:
+        body = "".join(r.iter_text())
+
+    assert '"token": "Entries are posted."' in body
+    assert len(api.app.state.llm_calls) == 1
+    assert api.app.state.answers.stats["exact_hits"] == 2
+
+
+def test_fallback_answers_are_not_cached_as_the_primary_model(client, monkeypatch):
+    test_client, _ = client
+    monkeypatch.setattr(async_client, "OPENAI_API_KEY", None)
+    api.app.state.llm.router = Router(route=["openai", "ollama"], backoff=0)
+
+    for _ in range(2):
+        response = test_client.post("/ask", json={"question": "How are GL entries made?", "module": "accounts"})
+        assert response.json()["answer"] == "Entries are posted."
+
+    # Stored under the model that answered, so lookups for the primary keep missing
+    assert [key[-1] for key in api.app.state.answers._entries] == ["ollama:llama3"]
+    assert len(api.app.state.llm_calls) == 2
+
+
+def test_exact_symbol_questions_are_not_embedded_for_the_cache(client, monkeypatch):
+    test_client, prompts = client
+    embedded = []
+    api.app.state.answers = AnswerCache(similarity=0.97)
+    monkeypatch.setattr(rag_query, "question_vector", lambda q: embedded.append(q) or [1.0, 0.0])
+
+    def symbol_lookup(query, module, k=5, symbol_query=None):
+        prompts.append((query, module))
+        return [{"id": 7, "text": "def make_gl_entries(...)"}], (1, 2, 3), query != "make_gl_entries"
+
+    monkeypatch.setattr(rag_query, "lookup", symbol_lookup)
+
+    test_client.post("/ask", json={"question": "make_gl_entries", "module": "accounts"})
+    test_client.post("/ask", json={"question": "How are GL entries made?", "module": "accounts"})
+
+    assert embedded == ["How are GL entries made?"]
+
+
+def test_conversation_store_is_called_off_the_event_loop(client):
+    test_client, _ = client
+    store = api.app.state.conversations
+    on_loop = []
+
+    def checked(name, result):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(name)
+        except RuntimeError:
+            pass
+        return result
+
+    class Recording:
+        def history(self, session_id):
+            return checked("history", store.history(session_id))
+
+        def append(self, session_id, role, content):
+            return checked("append", store.append(session_id, role, content))
+
+        @property
+        def stats(self):
+            return checked("stats", store.stats)
+
+    api.app.state.conversations = Recording()
+    try:
+        test_client.post("/ask", json={"question": "q", "module": "accounts"})
+        with test_client.stream("POST", "/stream", json={"question": "q", "module": "accounts"}) as r:
+            "".join(r.iter_text())
+        test_client.get("/health")
+    finally:
+        api.app.state.conversations = store
+
+    assert on_loop == []
+    assert store.stats["sessions"] == 2
+
+
+def test_unknown_and_malformed_modules(client, monkeypatch):
+    test_client, _ = client
+
+    def missing(query, module, k=5, symbol_query=None):
+        raise FileNotFoundError(f"No vector index built for module: {module}")
+
+    monkeypatch.setattr(rag_query, "lookup", missing)
+
+    assert test_client.post("/ask", json={"question": "q", "module": "hr"}).status_code == 404
+    assert test_client.post("/ask", json={"question": "q", "module": "../secrets"}).status_code == 422
+    assert test_client.post("/stream", json={"question": "q", "module": "Accounts/x"}).status_code == 422
+
+
+def test_stream_reports_unexpected_errors_as_events(client, monkeypatch):
+    test_client, _ = client
+
+    def broken(query, module, k=5, symbol_query=None):
+        raise ValueError("Index/chunk mismatch for accounts")
+
+    monkeypatch.setattr(rag_query, "lookup", broken)
+
+    with test_client.stream("POST", "/stream", json={"question": "q", "module": "accounts"}) as response:
+        body = "".join(response.iter_text())
+
+    assert body.startswith("event: error")
+    assert "Index/chunk mismatch" in body
+    assert test_client.get("/health").json()["free_slots"] == api.API_MAX_CONCURRENT
@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm.async_client as async_client
+from llm.async_client import AsyncLLMClient, LLMError
+from llm.router import Router
+
+
+def ollama_stream(tokens):
+    lines = [json.dumps({"message": {"content": t}, "done": False}) for t in tokens]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+    return "\n".join(lines) + "\n"
+
+
+def openai_stream(tokens):
+    events = [f"data: {json.dumps({'choices': [{'delta': {'content': t}}]})}\n\n" for t in tokens]
+    return "".join(events) + "data: [DONE]\n\n"
+
+
+def client_for(handler, *route):
+    router = Router(route=list(route), retries=1, backoff=0)
+    return AsyncLLMClient(router, transport=httpx.MockTransport(handler))
+
+
+def test_ollama_tokens_are_streamed():
+    seen = {}
+
+    def handler(request):
+        seen["body"] = json.loads(request.content)
+        return httpx.Response(200, text=ollama_stream(["GL ", "entries ", "post"]))
+
+    async def run():
+        async with client_for(handler, "ollama") as client:
+            return [t async for t in client.stream("how?")]
+
+    assert asyncio.run(run()) == ["GL ", "entries ", "post"]
+    assert seen["body"]["stream"] is True
+    assert seen["body"]["messages"][0]["role"] == "system"
+
+
+def test_openai_compatible_sse(monkeypatch):
+    monkeypatch.setattr(async_client, "GROQ_API_KEY", "test-key")
+
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer test-key"
+        assert request.url.host == "api.groq.com"
+        return httpx.Response(200, text=openai_stream(["make_", "gl_", "entries"]))
+
+    async def run():
+        async with client_for(handler, "groq") as client:
+            return await client.generate("which function?")
+
+    assert asyncio.run(run()) == "make_gl_entries"
+
+
+def test_errors_surface_as_llm_error(monkeypatch):
+    monkeypatch.setattr(async_client, "OPENAI_API_KEY", None)
+
+    async def run(provider, handler):
+        async with client_for(handler, provider) as client:
+            return await client.generate("q")
+
+    with pytest.raises(LLMError, match="OPENAI_API_KEY"):
+        asyncio.run(run("openai", lambda r: httpx.Response(200)))
+
+    with pytest.raises(LLMError, match="HTTP 500"):
+        asyncio.run(run("ollama", lambda r: httpx.Response(500, text="model not loaded")))
+
+
+def test_fails_over_through_the_router_and_records_stats(monkeypatch):
+    monkeypatch.setattr(async_client, "OPENAI_API_KEY", None)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        if len(calls) == 1:
+            return httpx.Response(503, text="busy")
+        return httpx.Response(200, text=ollama_stream(["Bin ", "qty"]))
+
+    async def run():
+        async with client_for(handler, "openai", "ollama") as client:
+            answered_by = {}
+            reply = await client.generate("q", answered_by)
+            return reply, answered_by, client.router.stats
+
+    reply, answered_by, stats = asyncio.run(run())
+
+    # openai has no key and is skipped; ollama's first attempt fails and is retried
+    assert reply == "Bin qty"
+    assert answered_by["model"] == "ollama:llama3"
+    assert len(calls) == 2
+    assert stats["openai"]["failures"] == 1 and stats["openai"]["calls"] == 0
+    assert stats["ollama"]["failures"] == 1 and stats["ollama"]["calls"] == 1
+    assert stats["ollama"]["completion_tokens"] == 2
+
+
+def test_leaving_the_stream_closes_the_upstream_response():
+    closed = []
+
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(1000):
+                yield (json.dumps({"message": {"content": f"t{i}"}, "done": False}) + "\n").encode()
+
+        async def aclose(self):
+            closed.append(True)
+
+    async def run():
+        async with client_for(lambda r: httpx.Response(200, stream=Body()), "ollama") as client:
+            stream = client.stream("q")
+            tokens = [await stream.__anext__() for _ in range(3)]
+            await stream.aclose()
+            return tokens
+
+    assert asyncio.run(run()) == ["t0", "t1", "t2"]
+    assert closed == [True]
@@ -0,0 +1,83 @@
+import sys
+import time
+import types
+
+import pytest
+
+import llm.stub_llm as stub_llm
+from llm.router import LLMRouterError, ProviderUnavailable, RateLimiter, Router
+
+
+def fake_module(replies):
+    """Provider module whose complete() pops replies; exceptions are raised."""
+    calls = []
+
+    def complete(prompt):
+        calls.append(prompt)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply, {"prompt_tokens": 3, "completion_tokens": 2}
+
+    return types.SimpleNamespace(MODEL="fake", complete=complete, calls=calls)
+
+
+def router_with(modules, retries=1):
+    router = Router(route=list(modules), retries=retries, backoff=0)
+    for provider in router.providers:
+        provider._module = modules[provider.name]
+    return router
+
+
+def test_retries_then_fails_over_to_next_provider():
+    openai = fake_module([RuntimeError("502"), RuntimeError("502")])
+    groq = fake_module([ProviderUnavailable("GROQ_API_KEY is not set")])
+    ollama = fake_module(["from ollama"])
+    router = router_with({"openai": openai, "groq": groq, "ollama": ollama})
+
+    answered_by = {}
+    assert router.generate("q", answered_by) == "from ollama"
+    assert answered_by == {"model": "ollama:fake"}
+    assert len(openai.calls) == 2  # first attempt + one retry
+    assert len(groq.calls) == 1  # unavailable: skipped without retrying
+    assert router.stats["openai"]["failures"] == 2
+    assert router.stats["ollama"]["calls"] == 1
+    assert router.stats["ollama"]["prompt_tokens"] == 3
+    assert router.stats["ollama"]["completion_tokens"] == 2
+
+
+def test_all_providers_failing_raises():
+    router = router_with({"openai": fake_module([RuntimeError("down")] * 2)})
+
+    with pytest.raises(LLMRouterError, match="openai: down"):
+        router.generate("q")
+
+
+def test_providers_are_imported_lazily():
+    sys.modules.pop("llm.groq_llm", None)
+    router = Router(route=["stub", "groq"])
+
+    assert "llm.groq_llm" not in sys.modules
+    assert router.model == "stub:stub"
+
+
+def test_stub_provider_is_deterministic_and_counts_tokens(monkeypatch):
+    monkeypatch.setattr(stub_llm, "STUB_LLM_LATENCY", 0)
+    monkeypatch.setattr(stub_llm, "STUB_LLM_TOKEN_LATENCY", 0)
+    router = Router(route=["stub"])
+
+    first = router.generate("## Question\nHow is stock reposted?")
+    assert first == router.generate("## Question\nHow is stock reposted?")
+    assert first.endswith("How is stock reposted?")
+    assert router.stats["stub"]["calls"] == 2
+    assert router.stats["stub"]["completion_tokens"] > 0
+
+
+def test_rate_limiter_spaces_calls_after_burst():
+    limiter = RateLimiter(rate=50, burst=1)
+
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+
+    assert time.monotonic() - started >= 3 / 50 * 0.9
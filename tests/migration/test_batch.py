@@ -0,0 +1,112 @@
+import json
+import time
+import threading
+
+import migrate.batch as batch
+from migrate.batch import BatchMigrator
+
+
+class FakeEngine:
+    """Returns canned Go code; files containing `fail` raise."""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def migrate_file(self, python_file):
+        with self._lock:
+            self.calls.append(python_file)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            with open(python_file, encoding="utf-8") as f:
+                code = f.read()
+            if "fail" in code:
+                raise ValueError("Generated Go code too short")
+            return f"package main\n\n// from {python_file}\nfunc main() {{\n}}\n"
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_package(root):
+    pkg = root / "accounts"
+    (pkg / "doctype" / "gl_entry").mkdir(parents=True)
+    (pkg / "__init__.py").write_text("")
+    (pkg / "utils.py").write_text("def get_balance_on():\n    return 0\n")
+    (pkg / "general_ledger.py").write_text("def make_gl_entries():\n    pass\n")
+    (pkg / "doctype" / "gl_entry" / "gl_entry.py").write_text("class GLEntry:\n    pass\n")
+    return pkg
+
+
+def test_batch_mirrors_package_layout(tmp_path):
+    pkg = make_package(tmp_path / "src")
+    out = tmp_path / "out"
+
+    report = BatchMigrator(FakeEngine(), workers=2, out_dir=out).run(str(pkg))
+
+    assert report["files"] == 3 and report["migrated"] == 3 and report["failed"] == 0
+    assert (out / "accounts" / "utils.go").exists()
+    assert (out / "accounts" / "doctype" / "gl_entry" / "gl_entry.go").exists()
+    # Empty __init__.py has nothing to migrate
+    assert not (out / "accounts" / "__init__.go").exists()
+
+    manifest = json.loads((out / "manifest.json").read_text())
+    assert manifest["files"]["accounts/utils.py"]["status"] == "ok"
+    assert json.loads((out / "report.json").read_text())["migrated"] == 3
+
+
+def test_rerun_skips_unchanged_files(tmp_path, monkeypatch):
+    pkg = make_package(tmp_path / "src")
+    out = tmp_path / "out"
+    BatchMigrator(FakeEngine(), out_dir=out).run(str(pkg))
+
+    engine = FakeEngine()
+    report = BatchMigrator(engine, out_dir=out).run(str(pkg))
+    assert report["skipped"] == 3 and engine.calls == []
+
+    (pkg / "utils.py").write_text("def get_balance_on():\n    return 1\n")
+    engine = FakeEngine()
+    report = BatchMigrator(engine, out_dir=out).run(str(pkg))
+    assert report["migrated"] == 1 and engine.calls == [str(pkg / "utils.py")]
+
+    # A new prompt version invalidates every file
+    monkeypatch.setattr(batch, "PROMPT_VERSION", batch.PROMPT_VERSION + 1)
+    engine = FakeEngine()
+    report = BatchMigrator(engine, out_dir=out).run(str(pkg))
+    assert report["migrated"] == 3
+
+
+def test_failures_are_recorded_and_retried(tmp_path):
+    pkg = make_package(tmp_path / "src")
+    (pkg / "broken.py").write_text("fail = True\n")
+    out = tmp_path / "out"
+
+    report = BatchMigrator(FakeEngine(), out_dir=out).run(str(pkg))
+    assert report["failed"] == 1
+    assert report["failures"][0]["file"] == "accounts/broken.py"
+
+    manifest = json.loads((out / "manifest.json").read_text())
+    assert manifest["files"]["accounts/broken.py"]["status"] == "failed"
+
+    (pkg / "broken.py").write_text("ok = True\n")
+    engine = FakeEngine()
+    report = BatchMigrator(engine, out_dir=out).run(str(pkg))
+    assert report["failed"] == 0 and engine.calls == [str(pkg / "broken.py")]
+
+
+def test_files_migrate_concurrently(tmp_path):
+    pkg = tmp_path / "pkg"
+    pkg.mkdir()
+    for i in range(8):
+        (pkg / f"m{i}.py").write_text(f"x = {i}\n")
+
+    engine = FakeEngine(delay=0.05)
+    report = BatchMigrator(engine, workers=4, out_dir=tmp_path / "out").run(str(pkg))
+
+    assert report["migrated"] == 8
+    assert 1 < engine.max_in_flight <= 4
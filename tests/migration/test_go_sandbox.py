@@ -0,0 +1,76 @@
+import shutil
+
+import pytest
+
+from config import GO_BINARY
+from migrate.go_migrator import GoMigrationEngine
+from migrate.go_sandbox import GoSandbox, library_package
+
+pytestmark = pytest.mark.skipif(shutil.which(GO_BINARY) is None, reason="Go toolchain not installed")
+
+HELLO = 'package main\n\nimport "fmt"\n\nfunc main() {\n\tfmt.Println(2 + 3)\n}\n'
+
+BROKEN = 'package main\n\nimport "fmt"\n\nfunc main() {\n\tfmt.Println(2 + three)\n}\n'
+
+
+@pytest.fixture
+def sandbox(tmp_path):
+    return GoSandbox(cache_dir=str(tmp_path / "builds"), workers=4)
+
+
+def test_build_results_are_cached_by_code(sandbox):
+    first = sandbox.check(HELLO)
+    assert first.ok and first.binary and not first.cached
+
+    second = sandbox.check(HELLO)
+    assert second.ok and second.cached
+    assert sandbox.stats == {"builds": 1, "cache_hits": 1}
+
+    # A fresh sandbox over the same cache directory reuses the binary too
+    again = GoSandbox(cache_dir=sandbox.cache_dir).check(HELLO)
+    assert again.cached and again.binary == first.binary
+
+
+def test_compile_errors_are_fed_to_the_fixer(sandbox):
+    seen = []
+
+    def fix(code, errors):
+        seen.append(errors)
+        return code.replace("three", "3")
+
+    fixed = sandbox.compile_and_fix(BROKEN, fix, rounds=2)
+
+    assert fixed.result.ok and fixed.rounds == 1
+    assert "undefined: three" in seen[0]
+
+
+def test_fix_rounds_are_bounded(sandbox):
+    fixed = sandbox.compile_and_fix(BROKEN, lambda code, errors: code, rounds=2)
+    assert not fixed.result.ok and fixed.result.stage == "build" and fixed.rounds == 2
+
+
+def test_vet_findings_fail_the_check(sandbox):
+    result = sandbox.check('package main\n\nimport "fmt"\n\nfunc main() {\n\tfmt.Printf("%d\\n", "x")\n}\n')
+    assert not result.ok and result.stage == "vet"
+
+
+def test_library_files_are_type_checked(sandbox):
+    code = "package main\n\nfunc Sum(xs ...int) int {\n\tt := 0\n\tfor _, x := range xs {\n\t\tt += x\n\t}\n\treturn t\n}\n"
+    assert library_package(code).startswith("package migrated")
+    # Variadic parameters are valid Go; the compiler is the judge now
+    GoMigrationEngine()._validate_go(code)
+
+    result = sandbox.check(code)
+    assert result.ok and result.binary is None
+
+
+def test_differential_runs_in_parallel(sandbox):
+    cases = [
+        ("print(2 + 3)", HELLO),
+        ("print(6)", HELLO),
+        ("print(5)", BROKEN),
+    ]
+    results = sandbox.differential(cases)
+
+    assert [r.match for r in results] == [True, False, False]
+    assert "build failed" in results[2].error
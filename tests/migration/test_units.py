@@ -0,0 +1,153 @@
+import threading
+from graphlib import TopologicalSorter
+
+import pytest
+
+from migrate.units import (UnitCache, UnitMigrationError, UnitMigrator, assemble_go, break_cycles,
+                           split_go, split_units)
+
+SOURCE = '''"""Ledger helpers."""
+import frappe
+
+PRECISION = 2
+
+
+class Ledger:
+    """A ledger."""
+    currency = "INR"
+
+    def post(self, amount):
+        return round_amount(amount) + self.balance()
+
+    def balance(self):
+        return 0
+
+
+def round_amount(amount):
+    return round(amount, PRECISION)
+
+
+def is_even(n):
+    return n == 0 or is_odd(n - 1)
+
+
+def is_odd(n):
+    return n != 0 and is_even(n - 1)
+'''
+
+
+def units_by_short_name(units):
+    return {unit.short_name: unit for unit in units}
+
+
+def test_split_units_and_dependencies(tmp_path):
+    path = str(tmp_path / "ledger.py")
+    units = units_by_short_name(split_units(SOURCE, path))
+
+    assert {u.kind for u in units.values()} == {"module", "class", "method", "function"}
+    assert "PRECISION = 2" in units["<module>"].source
+    assert "import frappe" not in units["<module>"].source
+
+    # Class unit is the header only; methods are their own units
+    assert 'currency = "INR"' in units["Ledger"].source
+    assert "def post" not in units["Ledger"].source
+    assert units["post"].source.startswith("def post(self, amount):")
+
+    post_deps = {d.rsplit(".", 1)[-1] for d in units["post"].deps}
+    assert post_deps == {"round_amount", "balance", "Ledger", "<module>"}
+
+
+def test_nested_classes_are_units_of_their_own(tmp_path):
+    source = (
+        "class Ledger:\n"
+        "    class Meta:\n"
+        "        ordering = 'posting_date'\n"
+        "\n"
+        "        def key(self):\n"
+        "            return self.ordering\n"
+        "\n"
+        "    def post(self):\n"
+        "        return 1\n"
+    )
+    units = units_by_short_name(split_units(source, str(tmp_path / "ledger.py")))
+
+    assert "class Meta" not in units["Ledger"].source
+    assert units["Meta"].kind == "class"
+    assert units["Meta"].signature == "class Ledger.Meta"
+    assert "ordering = 'posting_date'" in units["Meta"].source
+    assert units["Meta"].deps == {units["Ledger"].name}
+    assert units["key"].owner == units["Meta"].name
+    assert units["key"].source.startswith("def key(self):")
+
+
+def test_topological_order_breaks_cycles(tmp_path):
+    units = split_units(SOURCE, str(tmp_path / "ledger.py"))
+    deps, broken = break_cycles(units)
+
+    order = [name.rsplit(".", 1)[-1] for name in TopologicalSorter(deps).static_order()]
+    assert order.index("round_amount") < order.index("post")
+    assert order.index("balance") < order.index("post")
+    assert order.index("Ledger") < order.index("balance")
+    assert len(broken) == 1
+
+
+def test_go_assembly_merges_imports():
+    parts = [
+        split_go('package main\n\nimport "fmt"\n\nfunc A() {\n\tfmt.Println(1)\n}'),
+        split_go('import (\n\t"fmt"\n\t"math"\n)\n\nfunc B() float64 {\n\treturn math.Pi\n}'),
+    ]
+    go = assemble_go(parts)
+
+    assert go.count("package main") == 1
+    assert go.count('"fmt"') == 1 and '"math"' in go
+    assert go.index("func A()") < go.index("func B()")
+
+
+class FakeLLM:
+    """Answers each unit prompt with a Go declaration named after the unit."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        name = prompt.split("Unit: ", 1)[1].split(" ", 1)[0].rsplit(".", 1)[-1].strip("<>")
+        if name in self.fail:
+            return "func broken() {"
+        return f'import "fmt"\n\nfunc {name}() {{\n\tfmt.Println("{name}")\n}}'
+
+
+def test_prompts_carry_dependency_signatures_only(tmp_path):
+    path = tmp_path / "ledger.py"
+    path.write_text(SOURCE)
+    llm = FakeLLM()
+
+    go = UnitMigrator(llm, workers=2, cache=UnitCache(tmp_path / "units")).migrate_file(str(path))
+
+    assert go.startswith("package main") and go.count('"fmt"') == 1
+    assert go.index("func Ledger()") < go.index("func post()") < go.index("func is_odd()")
+
+    post_prompt = next(p for p in llm.prompts if ".Ledger.post (method)" in p)
+    # The dependency was migrated first, so its Go signature is in the prompt, not its body
+    assert "func round_amount()" in post_prompt
+    assert "round(amount, PRECISION)" not in post_prompt
+
+
+def test_only_failed_units_are_retried(tmp_path):
+    path = tmp_path / "ledger.py"
+    path.write_text(SOURCE)
+    cache = UnitCache(tmp_path / "units")
+
+    failing = FakeLLM(fail={"balance"})
+    with pytest.raises(UnitMigrationError) as error:
+        UnitMigrator(failing, retries=1, cache=cache).migrate_file(str(path))
+    assert [name.rsplit(".", 1)[-1] for name in error.value.failures] == ["balance"]
+    # One try plus one retry for the invalid unit
+    assert sum(".Ledger.balance (method)" in p for p in failing.prompts) == 2
+
+    retry = FakeLLM()
+    UnitMigrator(retry, cache=cache).migrate_file(str(path))
+    assert len(retry.prompts) == 1 and ".Ledger.balance (method)" in retry.prompts[0]
@@ -0,0 +1,83 @@
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
+
+
+def stub_vector(text, dim=8):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255.0 for b in digest[:dim]]
+
+
+class StubEmbedServer(ThreadingHTTPServer):
+    """
+    Local stand-in for Ollama's /api/embed: deterministic vectors, an
+    optional per-request delay, and a number of leading requests to fail.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0, fail_first=0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay = delay
+        self.fail_first = fail_first
+        self.requests = 0
+        self.texts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+        with server.lock:
+            server.requests += 1
+            fail = server.requests <= server.fail_first
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            time.sleep(server.delay)
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            texts = body["input"]
+            with server.lock:
+                server.texts += len(texts)
+
+            payload = json.dumps({"embeddings": [stub_vector(t) for t in texts]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@contextmanager
+def stub_embed_server(**kwargs):
+    server = StubEmbedServer(**kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,69 @@
+import numpy as np
+
+from rag.answer_cache import AnswerCache, normalize_question
+
+HITS = [{"id": 11, "text": "make_gl_entries"}, {"id": 12, "text": "merge_similar_entries"}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_exact_key_ignores_case_and_punctuation():
+    assert normalize_question("  How is GL Entry created?? ") == "how is gl entry created"
+
+    cache = AnswerCache(similarity=0)
+    cache.put(cache.key("accounts", "How is GL entry created?", HITS, "m"), "g1", "via make_gl_entries")
+
+    assert cache.get(cache.key("accounts", "how is gl entry created", HITS, "m"), "g1") == "via make_gl_entries"
+    # Different context, model or module is a different answer
+    assert cache.get(cache.key("accounts", "how is gl entry created", HITS[:1], "m"), "g1") is None
+    assert cache.get(cache.key("accounts", "how is gl entry created", HITS, "other"), "g1") is None
+    assert cache.get(cache.key("stock", "how is gl entry created", HITS, "m"), "g1") is None
+    assert cache.stats["exact_hits"] == 1 and cache.stats["misses"] == 3
+    assert cache.stats["hit_rate"] == 0.25
+
+
+def test_similar_question_reuses_answer_above_threshold():
+    cache = AnswerCache(similarity=0.95)
+    cache.put(cache.key("accounts", "how is gl entry created", HITS, "m"), "g1", "answer", vector=[1.0, 0.0, 0.0])
+
+    near = np.array([0.99, 0.05, 0.0])
+    far = np.array([0.5, 0.8, 0.0])
+    assert cache.get(cache.key("accounts", "how are gl entries made", HITS[:1], "m"), "g1", near) == "answer"
+    assert cache.get(cache.key("accounts", "what is a bin", HITS, "m"), "g1", far) is None
+    assert cache.get(cache.key("accounts", "how are gl entries made", HITS, "other"), "g1", near) is None
+    assert cache.stats["similar_hits"] == 1
+
+
+def test_index_rebuild_invalidates_module():
+    cache = AnswerCache(similarity=0)
+    accounts = cache.key("accounts", "q", HITS, "m")
+    stock = cache.key("stock", "q", HITS, "m")
+    cache.put(accounts, "g1", "a")
+    cache.put(stock, "s1", "s")
+
+    assert cache.get(accounts, "g2") is None
+    assert cache.get(stock, "s1") == "s"
+    assert cache.stats["invalidations"] == 1
+
+
+def test_ttl_and_lru_eviction():
+    clock = Clock()
+    cache = AnswerCache(ttl=10, max_entries=2, similarity=0, clock=clock)
+    keys = [cache.key("accounts", f"q{i}", HITS, "m") for i in range(3)]
+
+    cache.put(keys[0], "g", "a0")
+    cache.put(keys[1], "g", "a1")
+    cache.get(keys[0], "g")
+    cache.put(keys[2], "g", "a2")
+
+    assert cache.get(keys[1], "g") is None
+    assert cache.stats["evictions"] == 1
+
+    clock.now += 11
+    assert cache.get(keys[0], "g") is None
@@ -0,0 +1,134 @@
+import json
+import textwrap
+
+import rag.chunker as chunker
+from rag.chunker import FileChunker, build_chunks, chunk_path, load_chunks
+from rag.embedding_cache import text_hash
+from rag.tokens import estimate_tokens
+
+LONG_FUNCTION = "def repost(sle):\n" + "".join(
+    f"    qty_{i} = sle.get('actual_qty') * {i}\n    if qty_{i} > 0:\n        total += qty_{i}\n"
+    for i in range(60)
+)
+
+CONTROLLER = textwrap.dedent('''\
+    """Stock controller helpers."""
+
+    class StockEntry(StockController):
+        """Moves stock between warehouses."""
+
+        purpose = "Material Transfer"
+
+        def validate(self):
+            self.set_qty()
+
+        def on_submit(self):
+            self.update_stock_ledger()
+''')
+
+
+def write_doctype(tmp_path):
+    folder = tmp_path / "erpnext" / "stock" / "doctype" / "stock_entry"
+    folder.mkdir(parents=True)
+    (tmp_path / "erpnext" / "__init__.py").write_text("")
+    (tmp_path / "erpnext" / "stock" / "__init__.py").write_text("")
+    (folder / "stock_entry.py").write_text(CONTROLLER)
+    (folder / "stock_entry.json").write_text(json.dumps({
+        "name": "Stock Entry",
+        "module": "Stock",
+        "fields": [
+            {"fieldname": "purpose", "fieldtype": "Select", "label": "Purpose"},
+            {"fieldname": "items", "fieldtype": "Table", "label": "Items", "options": "Stock Entry Detail"},
+            {"fieldtype": "Section Break"},
+        ],
+    }))
+    return folder / "stock_entry.py"
+
+
+def test_long_function_is_split_on_statement_boundaries():
+    budget = 128
+    chunks = FileChunker("erpnext/stock/repost.py", "stock", budget).run(LONG_FUNCTION)
+
+    assert len(chunks) > 1
+    assert all(c["tokens"] <= budget for c in chunks)
+    assert [c["part"] for c in chunks] == list(range(1, len(chunks) + 1))
+
+    # Every part repeats the signature and never ends on an open `if`
+    for c in chunks:
+        body = c["text"].split("\n", 1)[1]
+        assert body.startswith("def repost(sle):")
+        assert "    if qty_" not in body.split("\n")[-1]
+
+    # Parts cover the function without gaps or overlap
+    assert chunks[0]["line"] == 1
+    assert chunks[-1]["end_line"] == LONG_FUNCTION.count("\n")
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt["line"] == prev["end_line"] + 1
+
+    assert len({c["id"] for c in chunks}) == len(chunks)
+
+
+def test_short_function_keeps_its_body():
+    code = "def get_previous_sle(args):\n    return frappe.db.get_value('Stock Ledger Entry', args)\n"
+    [chunk] = FileChunker("erpnext/stock/stock_ledger.py", "stock").run(code)
+
+    assert chunk["kind"] == "function"
+    assert chunk["line"] == 1 and chunk["end_line"] == 2
+    assert "frappe.db.get_value" in chunk["text"]
+    assert "part" not in chunk
+
+
+def test_shifted_lines_keep_ids_and_cache_keys():
+    before = FileChunker("erpnext/stock/stock_entry.py", "stock").run(CONTROLLER)
+    docstring, rest = CONTROLLER.split("\n", 1)
+    after = FileChunker("erpnext/stock/stock_entry.py", "stock").run(f"{docstring}\nimport frappe\n{rest}")
+
+    assert [c["line"] + 1 for c in before[1:]] == [c["line"] for c in after[1:]]
+    assert [c["id"] for c in before] == [c["id"] for c in after]
+    # The embedding cache is keyed by the text, so no chunk is re-embedded
+    assert [text_hash(c["text"]) for c in before] == [text_hash(c["text"]) for c in after]
+
+
+def test_class_header_and_doctype_fields(tmp_path):
+    path = write_doctype(tmp_path)
+    chunks = FileChunker(str(path), "stock").run(CONTROLLER)
+    by_kind = {}
+    for c in chunks:
+        by_kind.setdefault(c["kind"], []).append(c)
+
+    assert by_kind["module"][0]["text"].endswith("Stock controller helpers.")
+
+    [header] = by_kind["class"]
+    assert header["name"].endswith("stock_entry.StockEntry")
+    assert 'purpose = "Material Transfer"' in header["text"]
+    assert "def validate(self):" in header["text"]
+    assert "self.set_qty()" not in header["text"]
+
+    assert [m["name"].rsplit(".", 1)[1] for m in by_kind["method"]] == ["validate", "on_submit"]
+    assert all(c["doctype"] == "stock_entry" for c in chunks)
+
+    [fields] = by_kind["doctype"]
+    assert "purpose (Select) - Purpose" in fields["text"]
+    assert "items (Table) - Items -> Stock Entry Detail" in fields["text"]
+    assert "Section Break" not in fields["text"]
+
+
+def test_build_streams_jsonl(tmp_path, monkeypatch):
+    path = write_doctype(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(chunker, "module_files", lambda module: [str(path)])
+
+    out = build_chunks("stock", workers=1)
+
+    assert out == chunk_path("stock") == "data/stock_chunks.jsonl"
+    lines = (tmp_path / "data" / "stock_chunks.jsonl").read_text().splitlines()
+    chunks = load_chunks("stock")
+    assert len(lines) == len(chunks) > 0
+    assert all(estimate_tokens(c["text"]) == c["tokens"] for c in chunks)
+
+
+def test_load_chunks_falls_back_to_legacy_json(tmp_path):
+    legacy = [{"text": "Function a in x.py at line 1"}]
+    (tmp_path / "buying_chunks.json").write_text(json.dumps(legacy))
+
+    assert load_chunks("buying", str(tmp_path)) == legacy
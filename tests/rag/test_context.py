@@ -0,0 +1,87 @@
+from rag.context import context_budget, pack_context
+from rag.tokens import estimate_tokens
+
+
+def hit(name, line, end, body, rank, score, file="erpnext/stock/stock_ledger.py", part=None, parts=None, **extra):
+    suffix = f" (part {part}/{parts})" if part else ""
+    chunk = {
+        "id": hash((name, line)) & 0xFFFF,
+        "text": f"Function {name}{suffix}\n{body}",
+        "file": file, "name": name, "kind": "function", "line": line, "end_line": end,
+        "rank": rank, "score": score,
+    }
+    if part:
+        chunk.update(part=part, parts=parts)
+    chunk.update(extra)
+    return chunk
+
+
+def test_duplicates_and_contained_spans_are_dropped():
+    outer = hit("repost", 10, 40, "def repost():\n    pass", 0, 1.0)
+    hits = [outer, dict(outer, rank=1), hit("inner", 12, 20, "def inner():\n    pass", 2, 0.9)]
+
+    packed = pack_context(hits, 1000)
+
+    assert packed.texts == ["Function repost in erpnext/stock/stock_ledger.py at lines 10-40\n"
+                            "def repost():\n    pass"]
+
+
+def test_adjacent_parts_merge_without_repeating_signature():
+    first = hit("process_sle", 817, 850, "def process_sle(self, sle):\n    a = 1", 0, 1.0, part=1, parts=2)
+    second = hit("process_sle", 851, 880, "def process_sle(self, sle):\n    ...\n    b = 2", 1, 0.9, part=2, parts=2)
+    other = hit("get_previous_sle", 1200, 1210, "def get_previous_sle(args):\n    pass", 2, 0.8)
+
+    packed = pack_context([second, other, first], 1000)
+
+    assert len(packed.blocks) == 2
+    merged = packed.texts[0]
+    assert merged.startswith("process_sle in erpnext/stock/stock_ledger.py at lines 817-880")
+    assert merged.count("def process_sle") == 1
+    assert merged.index("a = 1") < merged.index("b = 2")
+    assert [h["rank"] for h in packed.hits] == [0, 1, 2]
+
+
+def test_class_headers_do_not_swallow_methods():
+    header = hit("StockEntry", 1, 300, "class StockEntry(StockController):", 0, 1.0, kind="class")
+    method = hit("StockEntry.validate", 20, 40, "def validate(self):\n    pass", 1, 0.9)
+
+    assert len(pack_context([header, method], 1000).blocks) == 2
+
+
+def test_budget_and_adaptive_k():
+    hits = [hit(f"f{i}", i * 100, i * 100 + 10, "x = 1\n" * 40, i, score)
+            for i, score in enumerate([1.0, 0.9, 0.8, 0.7, 0.3, 0.2])]
+    per_chunk = pack_context(hits[:1], 10_000).tokens
+
+    # Scores below half the top one are cut once min_k is reached
+    assert len(pack_context(hits, 10_000, min_k=3).blocks) == 4
+    assert len(pack_context(hits, 10_000, min_k=5, max_k=6).blocks) == 5
+    assert len(pack_context(hits, 10_000, min_k=1, max_k=2).blocks) == 2
+
+    packed = pack_context(hits, per_chunk * 2 + 5)
+    assert len(packed.blocks) == 2
+    assert packed.tokens <= per_chunk * 2 + 5
+
+    # A single oversized chunk is truncated rather than dropped
+    packed = pack_context(hits, per_chunk // 2)
+    assert len(packed.blocks) == 1 and packed.tokens <= per_chunk // 2
+
+
+def test_adaptive_k_follows_the_score_kind():
+    def pool(scores, kind):
+        return [hit(f"f{i}", i * 100, i * 100 + 10, "x = 1", i, score, score_kind=kind)
+                for i, score in enumerate(scores)]
+
+    # L2 distances: lower is better, so the cut is at twice the top distance
+    distances = pool([0.4, 0.5, 0.6, 0.7, 0.9, 1.2], "distance")
+    assert len(pack_context(distances, 10_000, min_k=3, max_k=6).blocks) == 4
+
+    # Fused ranks have no absolute scale: relevance is relative to the pool's range
+    fused = pool([0.0328, 0.0320, 0.0310, 0.0250, 0.0164, 0.0160], "rank")
+    assert len(pack_context(fused, 10_000, min_k=3, max_k=6).blocks) == 4
+
+
+def test_budget_depends_on_model_and_prompt():
+    assert context_budget("openai:gpt-4o-mini") > context_budget("ollama:llama3")
+    assert context_budget("ollama:llama3", "q" * 400) == context_budget("ollama:llama3") - 100
+    assert context_budget("stub:unknown") == context_budget("ollama:llama3")
@@ -0,0 +1,93 @@
+import pytest
+
+from rag.conversation import ConversationStore, SQLiteConversationStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(**kwargs):
+        if request.param == "memory":
+            store = ConversationStore(**kwargs)
+        else:
+            store = SQLiteConversationStore(str(tmp_path / "conversations.sqlite"), **kwargs)
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        if hasattr(store, "close"):
+            store.close()
+
+
+def test_sessions_are_isolated(make_store):
+    store = make_store()
+    store.append("a", "user", "How are GL entries made?")
+    store.append("b", "user", "What does get_previous_sle return?")
+
+    assert store.history("a") == [{"role": "user", "content": "How are GL entries made?"}]
+    assert [m["content"] for m in store.history("b")] == ["What does get_previous_sle return?"]
+    assert store.history("unknown") == []
+
+
+def test_token_budget_drops_oldest_turns(make_store):
+    store = make_store(token_budget=10)
+    for i in range(5):
+        store.append("a", "user", f"question {i} " + "x" * 8)  # 5 tokens each
+
+    assert [m["content"][:10] for m in store.history("a")] == ["question 3", "question 4"]
+
+    # A single oversized message is still kept
+    store.append("a", "assistant", "y" * 400)
+    assert len(store.history("a")) == 1
+
+
+def test_idle_sessions_expire(make_store):
+    clock = Clock()
+    store = make_store(ttl=60, clock=clock)
+    store.append("a", "user", "q1")
+    clock.now += 30
+    store.append("b", "user", "q2")
+
+    clock.now += 45
+    assert store.history("a") == []
+    assert len(store.history("b")) == 1
+    assert store.stats["expired"] == 1
+
+
+def test_least_recently_used_sessions_are_evicted(make_store):
+    clock = Clock()
+    store = make_store(max_sessions=2, clock=clock)
+    for session in ("a", "b"):
+        clock.now += 1
+        store.append(session, "user", session)
+
+    clock.now += 1
+    store.history("a")  # touch a, so b is now least recently used
+    clock.now += 1
+    store.append("c", "user", "c")
+
+    assert len(store) == 2
+    assert store.history("b") == []
+    assert store.history("a") and store.history("c")
+    assert store.stats["evicted"] == 1
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "conversations.sqlite")
+    first, second = SQLiteConversationStore(path), SQLiteConversationStore(path)
+
+    first.append("a", "user", "How is stock reposted?")
+
+    assert second.history("a") == [{"role": "user", "content": "How is stock reposted?"}]
+    first.close()
+    second.close()
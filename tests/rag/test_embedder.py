@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from rag.embedder import EmbeddingError, EmbeddingPipeline
+from tests.rag.embed_server import stub_embed_server, stub_vector
+
+
+def texts(n):
+    return [f"Function f{i} in accounts/utils.py" for i in range(n)]
+
+
+def test_vectors_are_batched_and_kept_in_order():
+    with stub_embed_server() as server:
+        pipeline = EmbeddingPipeline(url=server.url, batch_size=8, concurrency=3, progress=False)
+        vectors = pipeline.embed_all(texts(50))
+
+    assert vectors.dtype == np.float32
+    assert vectors.shape == (50, 8)
+    assert np.allclose(vectors[37], stub_vector(texts(50)[37]))
+    assert server.requests == 7
+
+
+def test_requests_run_concurrently_within_window():
+    with stub_embed_server(delay=0.05) as server:
+        pipeline = EmbeddingPipeline(url=server.url, batch_size=4, concurrency=4, progress=False)
+        pipeline.embed_all(texts(64))
+
+    assert 1 < server.max_in_flight <= 4
+
+
+def test_failed_batches_are_retried():
+    with stub_embed_server(fail_first=2) as server:
+        pipeline = EmbeddingPipeline(url=server.url, batch_size=100, concurrency=1,
+                                     backoff=0.001, progress=False)
+        vectors = pipeline.embed_all(texts(10))
+
+    assert vectors.shape == (10, 8)
+    assert pipeline.stats["retries"] == 2
+
+
+def test_gives_up_after_retries():
+    with stub_embed_server(fail_first=100) as server:
+        pipeline = EmbeddingPipeline(url=server.url, retries=1, backoff=0.001, progress=False)
+
+        with pytest.raises(EmbeddingError):
+            pipeline.embed_all(texts(3))
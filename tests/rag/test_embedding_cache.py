@@ -0,0 +1,88 @@
+import numpy as np
+
+from rag.embedder import EmbeddingPipeline
+from rag.embedding_cache import EmbeddingCache, cached, text_hash
+from tests.rag.embed_server import stub_embed_server
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), model="m")
+    cache.put("make_gl_entries", np.arange(4, dtype=np.float32))
+
+    assert np.array_equal(cache.get("make_gl_entries"), np.arange(4))
+    assert cache.get("get_previous_sle") is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_entries_are_scoped_by_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path, model="a").put("text", [1.0, 2.0])
+
+    assert EmbeddingCache(path, model="b").get("text") is None
+    assert EmbeddingCache(path, model="a").get("text") is not None
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), model="m", max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    # Both last used days ago, so the hit on "a" refreshes it
+    cache._db.execute("UPDATE embeddings SET last_used = 1")
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_incremental_reindex_only_embeds_changed_texts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), model="m")
+    texts = [f"Function f{i}" for i in range(200)]
+
+    with stub_embed_server() as server:
+        pipeline = EmbeddingPipeline(url=server.url, model="m", progress=False, cache=cache)
+        first = pipeline.embed_all(texts)
+
+        changed = list(texts)
+        changed[10] = "Function f10 renamed"
+        changed[150] = "Function f150 renamed"
+        second = pipeline.embed_all(changed)
+
+    assert server.texts == 202
+    assert np.array_equal(first[0], second[0])
+    assert not np.array_equal(first[10], second[10])
+
+
+def test_cached_query_embedding():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [0.5, 0.5]
+
+    embed_cached = cached(embed, EmbeddingCache(":memory:", model="m"))
+    embed_cached("how is GL entry created?")
+    embed_cached("how is GL entry created?")
+
+    assert calls == ["how is GL entry created?"]
+
+
+def test_recent_hits_do_not_write(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), model="m")
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache._db.execute("UPDATE embeddings SET last_used = 0 WHERE hash = ?", (text_hash("b"),))
+    cache._db.commit()
+
+    def last_used():
+        return dict(cache._db.execute("SELECT hash, last_used FROM embeddings").fetchall())
+
+    before = last_used()
+    cache.get_many(["a", "b"])
+    after = last_used()
+
+    # Only the day-old row is refreshed; a fresh hit stays a read
+    assert after[text_hash("a")] == before[text_hash("a")]
+    assert after[text_hash("b")] > 0
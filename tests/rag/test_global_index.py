@@ -0,0 +1,104 @@
+import json
+
+import numpy as np
+
+from rag.global_index import build_global_index, chunk_metadata
+from rag.retriever import Retriever
+
+
+def fake_embed(text):
+    vec = np.zeros(8, dtype="float32")
+    for i, ch in enumerate(text.encode()):
+        vec[i % 8] += ch / 100.0
+    return vec
+
+
+class FakePipeline:
+    def embed_all(self, texts):
+        return np.stack([fake_embed(t) for t in texts])
+
+
+CHUNKS = {
+    "accounts": [
+        ("make_gl_entries", "erpnext/accounts/general_ledger.py"),
+        ("validate", "erpnext/accounts/doctype/sales_invoice/sales_invoice.py"),
+    ],
+    "buying": [
+        ("make_gl_entries", "erpnext/buying/utils.py"),
+        ("validate", "erpnext/buying/doctype/purchase_order/purchase_order.py"),
+    ],
+    "stock": [
+        ("make_gl_entries", "erpnext/stock/stock_ledger.py"),
+    ],
+}
+
+
+def build(tmp_path):
+    data_dir, vector_dir = tmp_path / "data", tmp_path / "vector_db"
+    data_dir.mkdir()
+    for module, entries in CHUNKS.items():
+        chunks = [{"text": f"Function {name} in {path} at line {i + 1}", "file": path, "module": module}
+                  for i, (name, path) in enumerate(entries)]
+        (data_dir / f"{module}_chunks.json").write_text(json.dumps(chunks))
+
+    build_global_index(data_dir=str(data_dir), vector_dir=str(vector_dir), pipeline=FakePipeline())
+    return Retriever(str(data_dir), str(vector_dir), embed_fn=fake_embed)
+
+
+def test_metadata_is_derived_from_legacy_chunks():
+    row = chunk_metadata({
+        "text": "Function validate in erpnext/accounts/doctype/sales_invoice/sales_invoice.py at line 12",
+        "file": "erpnext/accounts/doctype/sales_invoice/sales_invoice.py",
+    }, "accounts")
+
+    assert row["name"] == "validate"
+    assert row["line"] == 12
+    assert row["doctype"] == "sales_invoice"
+
+
+def test_unfiltered_search_spans_all_modules(tmp_path):
+    retriever = build(tmp_path)
+    hits, _ = retriever.search_global_with_timings("make_gl_entries", k=10)
+
+    assert {hit["module"] for hit in hits} == {"accounts", "buying", "stock"}
+
+
+def test_module_filter_uses_one_search(tmp_path):
+    retriever = build(tmp_path)
+    hits, _ = retriever.search_global_with_timings("make_gl_entries", k=10, modules=["accounts", "stock"])
+
+    assert len(hits) == 3
+    assert {hit["module"] for hit in hits} == {"accounts", "stock"}
+
+
+def test_doctype_filter(tmp_path):
+    retriever = build(tmp_path)
+    hits, _ = retriever.search_global_with_timings("validate", k=10, doctypes=["Purchase Order"])
+
+    assert [hit["file"] for hit in hits] == ["erpnext/buying/doctype/purchase_order/purchase_order.py"]
+
+
+def test_combined_filters_and_unknown_module(tmp_path):
+    retriever = build(tmp_path)
+
+    assert retriever.search_global("validate", k=10, modules=["accounts"], doctypes=["Purchase Order"]) == []
+    assert retriever.search_global("validate", k=10, modules=["hr"]) == []
+
+
+def test_replaced_entry_stays_readable_after_reload(tmp_path):
+    retriever = build(tmp_path)
+    old = retriever.get_global()
+    first = old.table.row(0)
+
+    build_global_index(data_dir=str(tmp_path / "data"), vector_dir=str(tmp_path / "vector_db"),
+                       pipeline=FakePipeline())
+    fresh = retriever.get_global()
+
+    # A search that took the old entry before the reload can still finish
+    assert fresh is not old
+    assert old.table.row(0) == first
+    assert old.search(np.array([fake_embed("validate")]), 2)[1].shape == (1, 2)
+    assert len(retriever.search_global("validate", k=10)) == 5
+
+    retriever.close()
+    assert fresh.table._file.closed
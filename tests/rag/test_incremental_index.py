@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import pytest
+
+import rag.vector_store as vector_store
+from rag.chunker import chunk_id, diff_chunks
+from rag.index_factory import index_ids, version_path
+from rag.retriever import Retriever
+
+
+def fake_vector(text):
+    vec = np.zeros(8, dtype="float32")
+    for i, ch in enumerate(text.encode()):
+        vec[i % 8] += ch / 100.0
+    return vec
+
+
+def make_chunk(name, body="v1"):
+    text = f"Function {name} ({body})"
+    return {"id": chunk_id(name, text), "text": text,
+            "file": "erpnext/stock/x.py", "module": "stock", "name": name}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(vector_store, "VECTOR_DIR", str(tmp_path / "vector_db"))
+    (tmp_path / "data").mkdir()
+
+    embedded = []
+
+    def fake_embed(texts):
+        texts = list(texts)
+        embedded.extend(texts)
+        return np.stack([fake_vector(t) for t in texts])
+
+    monkeypatch.setattr(vector_store, "_embed", fake_embed)
+
+    def write(chunks):
+        (tmp_path / "data" / "stock_chunks.json").write_text(json.dumps(chunks))
+
+    return tmp_path, write, embedded
+
+
+def test_chunk_ids_are_stable_and_content_addressed():
+    assert make_chunk("get_previous_sle")["id"] == make_chunk("get_previous_sle")["id"]
+    assert make_chunk("get_previous_sle")["id"] != make_chunk("get_previous_sle", "v2")["id"]
+    assert 0 <= make_chunk("a")["id"] < 2 ** 63
+
+
+def test_diff_chunks():
+    old = [make_chunk("a"), make_chunk("b"), make_chunk("c")]
+    new = [make_chunk("a"), make_chunk("b", "v2"), make_chunk("d")]
+
+    added, removed, unchanged = diff_chunks(old, new)
+
+    assert [c["name"] for c in added] == ["b", "d"]
+    assert sorted(removed) == sorted([old[1]["id"], old[2]["id"]])
+    assert unchanged == 1
+
+
+def test_update_only_embeds_changed_chunks(store):
+    tmp_path, write, embedded = store
+    chunks = [make_chunk(f"fn_{i}") for i in range(100)]
+    write(chunks)
+    vector_store.build_index("stock", "flat")
+    embedded.clear()
+
+    chunks[3] = make_chunk("fn_3", "v2")
+    del chunks[50]
+    write(chunks)
+    index = vector_store.update_index("stock")
+
+    assert embedded == ["Function fn_3 (v2)"]
+    assert index.ntotal == 99
+    assert set(index_ids(index).tolist()) == {c["id"] for c in chunks}
+
+
+def test_retriever_hydrates_by_id_after_update(store):
+    tmp_path, write, _ = store
+    chunks = [make_chunk(f"fn_{i}") for i in range(10)]
+    write(chunks)
+    vector_store.build_index("stock", "flat")
+
+    chunks = chunks[5:] + [make_chunk("make_gl_entries")]
+    write(chunks)
+    vector_store.update_index("stock")
+
+    retriever = Retriever(str(tmp_path / "data"), str(tmp_path / "vector_db"), embed_fn=fake_vector)
+    assert retriever.search("Function make_gl_entries (v1)", "stock", k=1) == ["Function make_gl_entries (v1)"]
+
+
+def test_index_from_another_embedding_version_is_rebuilt(store):
+    tmp_path, write, embedded = store
+    chunks = [make_chunk(f"fn_{i}") for i in range(10)]
+    write(chunks)
+    vector_store.build_index("stock", "flat")
+
+    path = vector_store.index_path_for("stock")
+    with open(version_path(path), "w") as f:
+        f.write("nomic-embed-text@/api/embeddings")
+
+    retriever = Retriever(str(tmp_path / "data"), str(tmp_path / "vector_db"), embed_fn=fake_vector)
+    with pytest.raises(ValueError, match="rebuild"):
+        retriever.get("stock")
+
+    embedded.clear()
+    vector_store.update_index("stock")
+
+    # Every chunk is re-embedded, not just the changed ones
+    assert len(embedded) == 10
+    assert retriever.search("Function fn_3 (v1)", "stock", k=1) == ["Function fn_3 (v1)"]
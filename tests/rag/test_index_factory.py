@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from rag.index_factory import choose_index_type, create_index, index_type_of
+
+
+def vectors(n, d=16, seed=0):
+    return np.random.default_rng(seed).random((n, d), dtype=np.float32)
+
+
+def test_auto_type_follows_collection_size():
+    assert choose_index_type(500) == "flat"
+    assert choose_index_type(50_000) == "ivf_flat"
+    assert choose_index_type(1_000_000) == "ivf_pq"
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_every_type_finds_stored_vectors(index_type):
+    data = vectors(2_000)
+    index = create_index(data, index_type)
+
+    _, ids = index.search(data[:20], 1)
+
+    assert index.ntotal == 2_000
+    assert index_type_of(index) == index_type
+    assert (ids[:, 0] == np.arange(20)).mean() >= 0.9
+
+
+def test_pq_falls_back_when_too_small_to_train():
+    index = create_index(vectors(500), "ivf_pq")
+    assert index_type_of(index) == "ivf_flat"
+
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(ValueError):
+        create_index(vectors(10), "annoy")
@@ -0,0 +1,110 @@
+import json
+
+import numpy as np
+
+from rag.lexical import (LexicalIndex, identifier_terms, lexical_path,
+                         reciprocal_rank_fusion, symbol_key, tokenize)
+from tests.rag.test_retriever import write_module
+
+CHUNKS = [
+    {"text": "Function make_gl_entries in general_ledger.py\ndef make_gl_entries(gl_map, cancel=False):\n    merge_similar_entries(gl_map)",
+     "name": "erpnext.accounts.general_ledger.make_gl_entries", "kind": "function"},
+    {"text": "Function merge_similar_entries in general_ledger.py\ndef merge_similar_entries(gl_map):\n    return gl_map",
+     "name": "erpnext.accounts.general_ledger.merge_similar_entries", "kind": "function"},
+    {"text": "Class RepostItemValuation in repost_item_valuation.py\nclass RepostItemValuation(Document):",
+     "name": "erpnext.stock.doctype.repost_item_valuation.repost_item_valuation.RepostItemValuation",
+     "kind": "class", "doctype": "repost_item_valuation"},
+    {"text": "Function get_previous_sle in stock_ledger.py\ndef get_previous_sle(args):\n    return get_stock_ledger_entries(args)",
+     "name": "erpnext.stock.stock_ledger.get_previous_sle", "kind": "function"},
+]
+
+
+def test_identifier_aware_tokenizer():
+    assert identifier_terms("make_gl_entries") == ["make_gl_entries", "make", "gl", "entries"]
+    assert identifier_terms("RepostItemValuation") == [
+        "repostitemvaluation", "repost_item_valuation", "repost", "item", "valuation"]
+    assert tokenize("How does the GLEntry work?") == ["glentry", "gl_entry", "gl", "entry", "work"]
+    assert symbol_key("Repost Item Valuation") == symbol_key("RepostItemValuation") == "repost_item_valuation"
+
+
+def test_bm25_ranks_identifier_parts():
+    index = LexicalIndex.from_chunks(CHUNKS)
+
+    [(top, _), *_] = index.search("similar entries merging", k=2)
+    assert top == 1
+    assert index.search("nothing matches here") == []
+
+
+def test_exact_symbol_lookup():
+    index = LexicalIndex.from_chunks(CHUNKS)
+
+    assert index.symbol("make_gl_entries") == [0]
+    assert index.symbol("`get_previous_sle()`") == [3]
+    assert index.symbol("erpnext.accounts.general_ledger.make_gl_entries") == [0]
+    assert index.symbol("Repost Item Valuation") == [2]
+    assert index.symbol("how are gl entries made") == []
+    # Lower-case phrases are questions, not doctype names
+    assert index.symbol("repost item valuation") == []
+
+
+def test_common_symbols_are_ranked_and_capped():
+    chunks = [
+        {"text": f"Method validate\ndef validate(self):\n    {body}", "name": f"erpnext.x.Doc{i}.validate",
+         "kind": "method"}
+        for i, body in enumerate(["pass", "self.validate_items()\n    validate_qty(self)", "return"])
+    ]
+    index = LexicalIndex.from_chunks(chunks)
+
+    assert index.symbol("validate") == [1, 0, 2]
+    assert index.symbol("validate", k=1) == [1]
+
+
+def test_loaded_index_is_closed(tmp_path):
+    path = str(tmp_path / "accounts_lexical.col")
+    LexicalIndex.from_chunks(CHUNKS).save(path)
+
+    loaded = LexicalIndex.load(path)
+    loaded.close()
+    assert loaded._source._file.closed
+    LexicalIndex.from_chunks(CHUNKS).close()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = LexicalIndex.from_chunks(CHUNKS)
+    path = str(tmp_path / "accounts_lexical.col")
+    index.save(path)
+
+    loaded = LexicalIndex.load(path)
+    assert loaded.terms == index.terms
+    assert loaded.symbol("make_gl_entries") == [0]
+    np.testing.assert_allclose(loaded.scores("gl_map entries"), index.scores("gl_map entries"))
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+
+    assert [pos for pos, _ in fused] == [1, 3, 2]
+    assert fused[0][1] == 1 / 61 + 1 / 62
+
+
+def test_exact_symbol_query_skips_embedding(tmp_path):
+    texts = [c["text"] for c in CHUNKS]
+    retriever = write_module(tmp_path, "accounts", texts)
+    (tmp_path / "data" / "accounts_chunks.json").write_text(json.dumps(CHUNKS))
+    LexicalIndex.from_chunks(CHUNKS).save(lexical_path("accounts", str(tmp_path / "data")))
+
+    def no_embed(text):
+        raise AssertionError("embedding called for an exact symbol query")
+
+    retriever.embed_fn = no_embed
+    hits, timings = retriever.search_with_timings("get_previous_sle", "accounts", k=2)
+
+    assert hits[0]["name"].endswith("get_previous_sle")
+    assert "embed" not in timings
+
+    # A follow-up widened with the previous question still takes the symbol path
+    query = "How is the previous stock ledger entry fetched?\nget_previous_sle"
+    hits, timings = retriever.search_with_timings(query, "accounts", k=2, symbol_query="get_previous_sle")
+
+    assert hits[0]["name"].endswith("get_previous_sle")
+    assert "embed" not in timings
@@ -0,0 +1,91 @@
+import json
+import os
+
+import faiss
+import numpy as np
+
+import rag.retriever as retriever_module
+from rag.retriever import Retriever
+
+
+def fake_embed(text):
+    vec = np.zeros(4, dtype="float32")
+    vec[len(text) % 4] = 1.0
+    return vec
+
+
+def write_module(tmp_path, module, texts):
+    data_dir, vector_dir = tmp_path / "data", tmp_path / "vector_db"
+    data_dir.mkdir(exist_ok=True)
+    vector_dir.mkdir(exist_ok=True)
+
+    index = faiss.IndexFlatL2(4)
+    index.add(np.stack([fake_embed(t) for t in texts]))
+    faiss.write_index(index, str(vector_dir / f"{module}.index.tmp"))
+    os.replace(vector_dir / f"{module}.index.tmp", vector_dir / f"{module}.index")
+
+    chunks = [{"text": t, "file": f"{t}.py", "module": module} for t in texts]
+    (data_dir / f"{module}_chunks.json").write_text(json.dumps(chunks))
+
+    return Retriever(str(data_dir), str(vector_dir), embed_fn=fake_embed)
+
+
+def test_module_is_loaded_once(tmp_path):
+    retriever = write_module(tmp_path, "buying", ["a", "bb", "ccc"])
+
+    first = retriever.get("buying")
+    retriever.search("xx", "buying", k=1)
+
+    assert retriever.get("buying") is first
+
+
+def test_search_returns_hits_and_stage_timings(tmp_path):
+    retriever = write_module(tmp_path, "buying", ["a", "bb", "ccc"])
+
+    hits, timings = retriever.search_with_timings("yy", "buying", k=5, mode="vector")
+
+    assert hits[0]["text"] == "bb"
+    assert len(hits) == 3
+    assert set(timings) == {"load", "embed", "search", "hydrate"}
+
+    hits, timings = retriever.search_with_timings("yy", "buying", k=5)
+
+    assert hits[0]["text"] == "bb"
+    assert set(timings) == {"load", "lexical", "embed", "search", "fuse", "hydrate"}
+
+
+def test_rewritten_index_is_hot_reloaded(tmp_path):
+    retriever = write_module(tmp_path, "buying", ["a", "bb"])
+    first = retriever.get("buying")
+
+    write_module(tmp_path, "buying", ["a", "bb", "ccc", "dddd"])
+
+    assert retriever.get("buying") is not first
+    assert retriever.search("zzz", "buying", k=1) == ["ccc"]
+
+
+def test_mismatched_rewrite_keeps_serving_old_copy(tmp_path, monkeypatch):
+    retriever = write_module(tmp_path, "buying", ["a", "bb"])
+    first = retriever.get("buying")
+
+    loads = []
+
+    def counting_loader(*args):
+        loads.append(args[0])
+        return module_index(*args)
+
+    module_index = retriever_module.ModuleIndex
+    monkeypatch.setattr(retriever_module, "ModuleIndex", counting_loader)
+
+    # Chunk file rewritten, index not yet rebuilt
+    chunks = [{"text": t, "file": "x.py", "module": "buying"} for t in ("a", "bb", "ccc")]
+    (tmp_path / "data" / "buying_chunks.json").write_text(json.dumps(chunks))
+
+    assert retriever.get("buying") is first
+    # The mismatched pair is not re-read until the files change again
+    assert retriever.get("buying") is first
+    assert loads == ["buying"]
+
+    write_module(tmp_path, "buying", ["a", "bb", "ccc"])
+    assert retriever.get("buying") is not first
+    assert loads == ["buying", "buying"]
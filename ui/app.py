@@ -1,16 +1,18 @@
 import streamlit as st
 import sys
 import os
-import json
 import subprocess
 import shutil
 
 # Enable imports from root directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from rag.retriever import search
+from rag.rag_query import prepare
 from llm.safe_generate import safe_generate
+from llm.router import get_router
 from migrate.python_to_go import convert_python_to_go
+from migrate.go_sandbox import GoToolchainError, get_sandbox
+from Analyzer.store import open_table, ColumnarTable
 
 STYLING = """
 <style>
@@ -72,23 +74,15 @@ def render_rag_page():
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            # Step 1: Retrieval
+            # Step 1: Retrieval + context packing
             with st.status("Retrieving context...", expanded=True) as status:
-                context_chunks = search(prompt, selected_module)
-                status.update(label="Context Retrieved", state="complete", expanded=False)
+                full_prompt, _, _, context = prepare(prompt, selected_module, get_router().model)
+                context_chunks = context.texts
+                status.update(label=f"Context Retrieved ({len(context_chunks)} blocks, ~{context.tokens} tokens)",
+                              state="complete", expanded=False)
             
             # Step 2: Generation
             with st.spinner("Generating answer..."):
-                context_str = "\n".join(context_chunks)
-                full_prompt = f"""
-You are an expert on the ERPNext {selected_module} module.
-
-## Context
-{context_str}
-
-## Question
-{prompt}
-"""
                 response = safe_generate(full_prompt)
                 st.markdown(response)
 
@@ -177,50 +171,34 @@ def render_migration_page():
                 st.success("Analysis Complete!")
                 
                 # Load Results
-                func_file = f"output/{module_name}_functions.json"
-                if os.path.exists(func_file):
-                    with open(func_file, "r") as f:
-                        data = json.load(f)
-                    st.metric("Functions Found", len(data))
-                    st.dataframe(data)
+                try:
+                    with open_table(module_name, "functions") as data:
+                        st.metric("Functions Found", len(data))
+                        st.dataframe(data.to_columns() if isinstance(data, ColumnarTable) else data)
+                except FileNotFoundError:
+                    pass
 
 def verify_execution(py_code, go_code):
     st.divider()
     st.write("### Execution Verification")
-    
-    # 1. Run Python
-    try:
-        py_res = subprocess.run(
-            [sys.executable, "-c", py_code], 
-            capture_output=True, text=True, timeout=5
-        )
-        st.code(py_res.stdout, language="text", line_numbers=True)
-    except Exception as e:
-        st.error(f"Python Execution Failed: {e}")
-        return
 
-    # 2. Run Go
+    # Each check builds in its own temp module (no shared temp.go) and
+    # identical code reuses the cached build
     try:
-        with open("temp.go", "w", encoding="utf-8") as f:
-            f.write(go_code)
-        
-        go_res = subprocess.run(
-            ["go", "run", "temp.go"],
-            capture_output=True, text=True, timeout=5
-        )
-        st.code(go_res.stdout, language="text", line_numbers=True)
-    except Exception as e:
+        diff = get_sandbox().compare(py_code, go_code)
+    except GoToolchainError as e:
         st.error(f"Go Execution Failed: {e}")
         return
-    finally:
-        if os.path.exists("temp.go"):
-            try:
-                os.remove("temp.go")
-            except:
-                pass
 
-    # 3. Compare
-    if py_res.stdout.strip() == go_res.stdout.strip():
+    if diff.python_output is not None:
+        st.code(diff.python_output, language="text", line_numbers=True)
+    if diff.error:
+        st.error(diff.error)
+        return
+    st.code(diff.go_output, language="text", line_numbers=True)
+
+    # Compare
+    if diff.match:
         st.success("Outputs Match Perfectly!")
     else:
         st.error("Outputs Do Not Match")